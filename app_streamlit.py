@@ -10,13 +10,12 @@ from pathlib import Path
 # =============================
 # IMPORTS PROJET
 # =============================
-from utils.data import load_all_parquets
+from utils.analytics import AnalyticsSession, viewport_bbox
 from utils.charts import (
+    create_bar_chart,
     create_geo_map,
-    population_by_city,
-    create_histogram,
     create_scatter_plot,
-    create_heatmap,
+    create_corr_heatmap,
 )
 from utils.chatbot import DataChatbot
 
@@ -32,13 +31,18 @@ st.set_page_config(
 # =============================
 # CHARGEMENT DES DONNÉES
 # =============================
-@st.cache_data(show_spinner=True)
-def load_data():
-    data_path = Path("data/processed")
-    return load_all_parquets(data_path)
+# Une connexion DuckDB partagée par toutes les sessions du serveur :
+# dataset et agrégats ne sont recalculés que si un Parquet change
+@st.cache_resource
+def get_session():
+    return AnalyticsSession(Path("data/processed"))
+
+# Points max envoyés au nuage de points
+SCATTER_MAX_POINTS = 20_000
 
 try:
-    df = load_data()
+    session = get_session()
+    session.refresh()
 except Exception as e:
     st.error(f"❌ Erreur lors du chargement des données : {e}")
     st.stop()
@@ -50,7 +54,7 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 
 if "chatbot" not in st.session_state:
-    st.session_state.chatbot = DataChatbot(df)
+    st.session_state.chatbot = DataChatbot(session.select())
 
 
 # =============================
@@ -68,8 +72,8 @@ st.sidebar.header("🔍 Filtres")
 
 # --- Filtre Ville ---
 city_choices = ["Toutes"]
-if "city" in df.columns:
-    city_choices += sorted(df["city"].dropna().unique())
+if "city" in session.columns:
+    city_choices += session.cities()
 
 city = st.sidebar.selectbox("Ville", city_choices)
 
@@ -85,12 +89,34 @@ min_score = st.sidebar.slider(
 # =============================
 # APPLICATION DES FILTRES
 # =============================
-df_filtered = df.copy()
-
-if city != "Toutes":
-    df_filtered = df_filtered[df_filtered["city"] == city]
+# Filtres appliqués par DuckDB (agrégats pré-calculés quand c'est possible)
+filters = {"city": city} if city != "Toutes" else {}
+summary = session.summary(filters, min_score)
 
-df_filtered = df_filtered[df_filtered["score"] >= min_score]
+# =============================
+# SIDEBAR — EMPRISE DE LA CARTE
+# =============================
+# Streamlit ne renvoie pas la vue affichée : l'emprise lue se choisit ici.
+# Par défaut, toute l'étendue des adresses (DOM-TOM compris) est envoyée,
+# agrégée par cellules au-delà de MAP_MAX_POINTS, et la carte se déplace
+# librement dans le navigateur.
+st.sidebar.header("🗺️ Carte")
+map_view = st.sidebar.radio("Emprise", ["Toutes les adresses", "Autour d'une ville", "Coordonnées"])
+# Zoom initial et taille des cellules d'agrégation
+map_zoom = st.sidebar.slider("Zoom de la carte", 3, 14, 5)
+
+map_center = session.map_center(filters, min_score)
+map_bbox = None
+if map_view == "Autour d'une ville" and "city" in session.columns:
+    map_city = st.sidebar.selectbox("Ville au centre de la carte", session.cities())
+    map_center = session.map_center({"city": map_city}, min_score)
+    map_bbox = viewport_bbox(map_center, map_zoom)
+elif map_view == "Coordonnées":
+    map_center = (
+        st.sidebar.number_input("Latitude du centre", -90.0, 90.0, float(map_center[0]), format="%.5f"),
+        st.sidebar.number_input("Longitude du centre", -180.0, 180.0, float(map_center[1]), format="%.5f"),
+    )
+    map_bbox = viewport_bbox(map_center, map_zoom)
 
 # =============================
 # MÉTRIQUES
@@ -100,23 +126,20 @@ st.header("📊 Vue d’ensemble")
 c1, c2, c3, c4 = st.columns(4)
 
 with c1:
-    st.metric("Lignes", f"{len(df_filtered):,}")
+    st.metric("Lignes", f"{summary['rows']:,}")
 
 with c2:
-    st.metric("Colonnes", len(df_filtered.columns))
+    st.metric("Colonnes", len(session.columns))
 
 with c3:
-    if "population" in df_filtered.columns:
+    if "population" in session.columns:
         st.metric(
             "Population moyenne",
-            f"{df_filtered['population'].mean():,.0f}"
+            f"{summary['population_mean']:,.0f}"
         )
 
 with c4:
-    st.metric(
-        "Villes uniques",
-        df_filtered["city"].nunique() if "city" in df_filtered.columns else 0
-    )
+    st.metric("Villes uniques", summary["cities"])
 
 # =============================
 # VISUALISATIONS
@@ -130,22 +153,45 @@ tab1, tab2, tab3 = st.tabs(
 # --- CARTE ---
 with tab1:
     st.subheader("Carte des adresses géocodées")
-    fig = create_geo_map(df_filtered)
+    # Seuls les points de l'emprise choisie sont lus ; au-delà de
+    # MAP_MAX_POINTS, ils sont agrégés par cellule de grille
+    map_data = session.map_points(filters, min_score, bbox=map_bbox, zoom=map_zoom)
+    if "count" in map_data.columns:
+        st.caption(
+            f"{len(map_data):,} cellules agrégées "
+            "(choisir une zone et zoomer dans la barre latérale pour voir les adresses)"
+        )
+    fig = create_geo_map(map_data, zoom=map_zoom, center=map_center)
     st.plotly_chart(fig, use_container_width=True)
 
+    # Index spatial (grille) : requête de proximité en quelques millisecondes
+    st.subheader("📍 Adresses proches d'un point")
+    p1, p2, p3 = st.columns(3)
+    near_lat = p1.number_input("Latitude", value=float(map_center[0]), format="%.5f")
+    near_lon = p2.number_input("Longitude", value=float(map_center[1]), format="%.5f")
+    near_k = p3.slider("Nombre d'adresses", 1, 100, 10)
+    st.dataframe(
+        session.nearest(
+            near_lat, near_lon, k=near_k,
+            columns=["address", "city", "commune", "score", "latitude", "longitude"],
+        ),
+        use_container_width=True,
+    )
+
 # --- ANALYSES ---
 with tab2:
     st.subheader("Analyses dynamiques")
 
-    numeric_cols = df_filtered.select_dtypes(include="number").columns.tolist()
+    numeric_cols = session.numeric_columns
 
     col1, col2 = st.columns(2)
 
     with col1:
         x_col = st.selectbox("Colonne X", numeric_cols)
-        fig = create_histogram(
-            df_filtered,
+        fig = create_bar_chart(
+            session.histogram(x_col, filters, min_score),
             x=x_col,
+            y="count",
             title=f"Distribution de {x_col}",
         )
         st.plotly_chart(fig, use_container_width=True)
@@ -153,22 +199,30 @@ with tab2:
     with col2:
         y_col = st.selectbox("Colonne Y", numeric_cols)
         fig = create_scatter_plot(
-            df_filtered,
+            session.select(
+                list(dict.fromkeys([x_col, y_col, "city"])), filters, min_score,
+                sample=SCATTER_MAX_POINTS,
+            ),
             x=x_col,
             y=y_col,
-            color="city" if "city" in df_filtered.columns else None,
+            color="city" if "city" in session.columns else None,
             title=f"{y_col} en fonction de {x_col}",
         )
         st.plotly_chart(fig, use_container_width=True)
 
     st.subheader("Population moyenne par ville")
-    fig = population_by_city(df_filtered)
+    fig = create_bar_chart(
+        session.population_by_city(filters, min_score),
+        x="city",
+        y="population",
+        title="Population moyenne par ville",
+    )
     st.plotly_chart(fig, use_container_width=True)
 
 # --- CORRÉLATIONS ---
 with tab3:
     st.subheader("Matrice de corrélation")
-    fig = create_heatmap(df_filtered)
+    fig = create_corr_heatmap(session.correlation_matrix(filters, min_score))
     st.plotly_chart(fig, use_container_width=True)
 
 # =============================
@@ -177,7 +231,10 @@ with tab3:
 st.header("🗃️ Données")
 
 with st.expander("Afficher les 100 premières lignes"):
-    st.dataframe(df_filtered.head(100), use_container_width=True)
+    st.dataframe(
+        session.select(filters=filters, min_score=min_score, limit=100),
+        use_container_width=True,
+    )
 
 # =============================
 # CHATBOT
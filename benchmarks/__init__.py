@@ -0,0 +1,3 @@
+"""Benchmarks hors ligne du pipeline GEO (serveur simulé + données synthétiques)."""
+from .server import MockGeoServer
+from .synthetic import BENCHMARK_SIZES, generate_addresses, generate_enriched_dataset
@@ -0,0 +1,291 @@
+"""
+Benchmarks hors ligne du pipeline GEO.
+
+Chaque étape (enrichissement, transformation, qualité, stockage) est mesurée
+séparément sur des données synthétiques ; les résultats sont ajoutés à un
+historique JSONL avec le commit courant pour repérer les régressions.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from pipeline.config import ADRESSE_CONFIG, COMMUNE_CONFIG, BASE_DIR
+from pipeline.enricher import GeoEnricher, GEOCODING_MODES
+from pipeline.fetchers import AdresseFetcher, CommuneFetcher
+from pipeline.metrics import PipelineMetrics
+from pipeline.models import GeocodingRecord, GeocodingResult
+from pipeline.quality import QualityAnalyzer
+from pipeline.storage import save_parquet
+from pipeline.transformer import DataTransformer
+
+from .server import MockGeoServer
+from .synthetic import BENCHMARK_SIZES, generate_addresses, generate_enriched_dataset
+
+RESULTS_PATH = Path(__file__).parent / "results" / "history.jsonl"
+
+# Nombre max d'adresses géocodées via HTTP par mesure (le reste du pipeline
+# est mesuré sur la taille complète)
+ENRICH_MAX = 10_000
+
+# Écart relatif au run précédent considéré comme une régression
+REGRESSION_THRESHOLD = 0.20
+# En dessous de cet écart absolu (s), la variation est du bruit de mesure
+REGRESSION_MIN_SECONDS = 0.01
+
+
+@contextlib.contextmanager
+def quiet():
+    """Masque les affichages (print, barres tqdm) pendant une mesure."""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+# ==========================================================
+# Mesures par étape
+# ==========================================================
+
+def bench_enrichment(
+    timer: PipelineMetrics,
+    addresses: list[str],
+    mode: str,
+    server: MockGeoServer,
+    rate_limited: bool = True
+) -> dict:
+    """Géocodage + communes contre le serveur local, sans cache (débit des APIConfig livrées)."""
+    enricher = GeoEnricher(
+        mode=mode,
+        geocoder=AdresseFetcher(config=server.config(ADRESSE_CONFIG, rate_limited)),
+        commune_fetcher=CommuneFetcher(config=server.config(COMMUNE_CONFIG, rate_limited)),
+    )
+    with enricher, timer.stage(f"enrichment_{mode}", rows_in=len(addresses)) as stage:
+        stage["rows_out"] = len(enricher.enrich_batch(addresses))
+        return enricher.get_stats()
+
+
+def bench_records(timer: PipelineMetrics, n: int):
+    """Coût de construction d'un résultat de géocodage par adresse : pydantic vs slots."""
+    fields = dict(
+        label="10 Rue de Rivoli 75004 Paris", latitude=48.85, longitude=2.35,
+        score=0.9, city="Paris", postcode="75004", citycode="75104",
+    )
+    for name, record_type in (("records_pydantic", GeocodingResult), ("records_slotted", GeocodingRecord)):
+        with timer.stage(name, rows_in=n):
+            for i in range(n):
+                record_type(query=str(i), **fields)
+
+
+def bench_transformation(timer: PipelineMetrics, df, lazy: bool = False, n_jobs: int = 1):
+    """Chaîne de transformations de run_pipeline_geo (plan DuckDB si `lazy`, pool si `n_jobs` > 1)."""
+    name = "transformation_lazy" if lazy else "transformation_parallel" if n_jobs != 1 else "transformation"
+    with timer.stage(name, rows_in=len(df)) as stage:
+        df_clean = (
+            DataTransformer(df, lazy=lazy, n_jobs=n_jobs)
+            .remove_duplicates(subset=["address"])
+            .handle_missing_values(numeric_strategy='median', text_strategy='unknown')
+            .normalize_text_columns(["city", "commune"])
+            .get_result()
+        )
+        stage["rows_out"] = len(df_clean)
+    return df_clean
+
+
+def bench_quality(timer: PipelineMetrics, df):
+    with timer.stage("quality", rows_in=len(df)):
+        return QualityAnalyzer(df).analyze()
+
+
+def bench_storage(timer: PipelineMetrics, df) -> int:
+    """Écriture Parquet dans un dossier temporaire ; retourne la taille (octets)."""
+    with tempfile.TemporaryDirectory() as folder:
+        with timer.stage("storage", rows_in=len(df)):
+            path = save_parquet(df, "bench_dataset", folder=Path(folder))
+        return path.stat().st_size
+
+
+# ==========================================================
+# Orchestration
+# ==========================================================
+
+def run_benchmarks(
+    sizes: list[str],
+    modes: list[str],
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    enrich_max: int = ENRICH_MAX,
+    seed: int = 42,
+    rate_limited: bool = True
+) -> dict:
+    """Lance les mesures pour chaque taille et retourne un enregistrement d'historique."""
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "latency_ms": latency * 1000,
+            "error_rate": error_rate,
+            "enrich_max": enrich_max,
+            "seed": seed,
+            "rate_limited": rate_limited,
+        },
+        "results": {},
+    }
+
+    with MockGeoServer(latency=latency, error_rate=error_rate, seed=seed) as server:
+        for size in sizes:
+            n = BENCHMARK_SIZES[size]
+            timer = PipelineMetrics()
+            print(f"\n⏱️ Benchmark {size} ({n} lignes)")
+
+            addresses = generate_addresses(min(n, enrich_max), seed)
+            http = {}
+            for mode in modes:
+                with quiet():
+                    stats = bench_enrichment(timer, addresses, mode, server, rate_limited)
+                http[mode] = {
+                    "geocoder": stats["geocoder_stats"]["latency_ms"],
+                    "commune": stats["commune_stats"]["latency_ms"],
+                }
+
+            bench_records(timer, n)
+
+            df = generate_enriched_dataset(n, seed)
+            df_clean = bench_transformation(timer, df)
+            bench_transformation(timer, df, lazy=True)
+            bench_transformation(timer, df, n_jobs=-1)
+            bench_quality(timer, df_clean)
+            with quiet():
+                size_bytes = bench_storage(timer, df_clean)
+
+            record["results"][size] = {
+                "rows": n,
+                "stages": timer.to_dict(),
+                "http_latency_ms": http,
+                "parquet_bytes": size_bytes,
+            }
+            for name, stage in record["results"][size]["stages"].items():
+                print(f"   {name:<22} {stage['wall_seconds']:>8.3f}s  {stage['rows_per_second']:>12.1f} lignes/s")
+
+        record["server_requests"] = server.requests
+
+    return record
+
+
+# ==========================================================
+# Historique / régressions
+# ==========================================================
+
+def git_commit() -> str | None:
+    """Hash court du commit courant (None hors dépôt git)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: Path = RESULTS_PATH) -> list[dict]:
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_result(record: dict, path: Path = RESULTS_PATH) -> Path:
+    """Ajoute un run à l'historique (une ligne JSON par run)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return path
+
+
+def find_regressions(
+    record: dict,
+    previous: dict,
+    threshold: float = REGRESSION_THRESHOLD
+) -> list[str]:
+    """Étapes dont le temps mur dépasse celui du run précédent de plus de `threshold`."""
+    regressions = []
+    for size, result in record["results"].items():
+        before = previous.get("results", {}).get(size, {}).get("stages", {})
+        for name, stage in result["stages"].items():
+            old = before.get(name, {}).get("wall_seconds")
+            new = stage["wall_seconds"]
+            if old and new > old * (1 + threshold) and new - old > REGRESSION_MIN_SECONDS:
+                regressions.append(
+                    f"{size}/{name}: {old:.3f}s → {new:.3f}s (+{(new / old - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+# ==========================================================
+# Ligne de commande : python -m benchmarks
+# ==========================================================
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks hors ligne du pipeline GEO (serveur BAN/geo.api simulé)."
+    )
+    parser.add_argument(
+        "--sizes", nargs="+", choices=list(BENCHMARK_SIZES), default=["1k"],
+        help="Tailles de dataset mesurées"
+    )
+    parser.add_argument(
+        "--modes", nargs="+", choices=GEOCODING_MODES, default=["bulk"],
+        help="Modes de géocodage mesurés"
+    )
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latence simulée par requête")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Part de réponses 503 simulées")
+    parser.add_argument("--enrich-max", type=int, default=ENRICH_MAX, help="Adresses géocodées max par mesure")
+    parser.add_argument("--seed", type=int, default=42, help="Graine des données synthétiques")
+    parser.add_argument(
+        "--no-rate-limit", action="store_true",
+        help="Ignore le débit des APIConfig (coût client seul, non représentatif de la production)"
+    )
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH, help="Historique JSONL des résultats")
+    parser.add_argument("--no-save", action="store_true", help="N'ajoute pas le run à l'historique")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    history = load_history(args.output)
+    record = run_benchmarks(
+        args.sizes,
+        args.modes,
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        enrich_max=args.enrich_max,
+        seed=args.seed,
+        rate_limited=not args.no_rate_limit,
+    )
+
+    if not args.no_save:
+        print(f"\n💾 Résultats: {append_result(record, args.output)}")
+
+    # Seuls des runs aux paramètres identiques sont comparables
+    comparable = [r for r in history if r.get("params") == record["params"]]
+    if comparable:
+        regressions = find_regressions(record, comparable[-1])
+        if regressions:
+            print(f"\n⚠️ Régressions par rapport à {comparable[-1].get('commit')}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Serveur HTTP local imitant l'API Adresse (BAN) et geo.api.gouv.fr.
+
+Les réponses sont déterministes (dérivées de l'adresse) ; la latence et le
+taux d'erreurs 503 sont configurables pour reproduire un réseau réel.
+"""
+import csv
+import io
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import replace
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .synthetic import COMMUNES, UNKNOWN_STREET
+
+COMMUNES_BY_CODE = {c.citycode: c for c in COMMUNES}
+
+
+def geocode(query: str) -> dict | None:
+    """Résultat BAN simulé d'une adresse (None si non géocodable)."""
+    query = " ".join(query.split())
+    if not query or UNKNOWN_STREET in query.lower():
+        return None
+
+    # La commune est reconnue par son nom, sinon tirée de l'empreinte de l'adresse
+    digest = zlib.crc32(query.encode("utf-8"))
+    commune = next(
+        (c for c in COMMUNES if c.nom.lower() in query.lower()),
+        COMMUNES[digest % len(COMMUNES)]
+    )
+    return {
+        "label": query,
+        "score": round(0.5 + (digest % 5000) / 10000, 4),
+        "latitude": commune.latitude + (digest % 1000 - 500) / 50000,
+        "longitude": commune.longitude + (digest // 1000 % 1000 - 500) / 50000,
+        "postcode": commune.postcode,
+        "city": commune.nom,
+        "citycode": commune.citycode,
+    }
+
+
+def commune_payload(commune) -> dict:
+    """Commune au format de geo.api.gouv.fr."""
+    return {
+        "code": commune.citycode,
+        "nom": commune.nom,
+        "population": commune.population,
+        "codeDepartement": commune.code_departement,
+        "codeRegion": commune.code_region,
+    }
+
+
+class GeoRequestHandler(BaseHTTPRequestHandler):
+    """Routes : /search/, /search/csv/, /communes et /communes/{code}."""
+
+    protocol_version = "HTTP/1.1"
+    # En-têtes et corps sont écrits séparément : sans TCP_NODELAY, Nagle
+    # ajouterait ~40 ms à chaque réponse en keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass  # pas de journal par requête pendant un benchmark
+
+    # ==========================================================
+    # Réponses
+    # ==========================================================
+
+    def _simulate_network(self) -> bool:
+        """Applique la latence ; retourne False si une erreur 503 a été envoyée."""
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        server.requests += 1
+        if server.error_rate and server.rng.random() < server.error_rate:
+            self._send(503, b"Service Unavailable", "text/plain")
+            return False
+        return True
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data, status: int = 200):
+        self._send(status, json.dumps(data).encode("utf-8"), "application/json")
+
+    # ==========================================================
+    # Routes
+    # ==========================================================
+
+    def do_GET(self):
+        if not self._simulate_network():
+            return
+
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path.rstrip("/") == "/search":
+            self._search(params.get("q", ""))
+        elif url.path.rstrip("/") == "/communes":
+            dep = params.get("codeDepartement")
+            self._send_json([
+                commune_payload(c) for c in COMMUNES if c.code_departement == dep
+            ])
+        elif url.path.startswith("/communes/"):
+            commune = COMMUNES_BY_CODE.get(url.path.rsplit("/", 1)[-1])
+            if commune is None:
+                self._send_json({"message": "Commune non trouvée"}, status=404)
+            else:
+                self._send_json(commune_payload(commune))
+        else:
+            self._send_json({"message": "Not found"}, status=404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self._simulate_network():
+            return
+
+        if urlparse(self.path).path.rstrip("/") != "/search/csv":
+            self._send_json({"message": "Not found"}, status=404)
+            return
+
+        self._search_csv(body)
+
+    def _search(self, query: str):
+        result = geocode(query)
+        features = []
+        if result is not None:
+            features.append({
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [result["longitude"], result["latitude"]],
+                },
+                "properties": {k: v for k, v in result.items() if k not in ("latitude", "longitude")},
+            })
+        self._send_json({"type": "FeatureCollection", "features": features})
+
+    def _search_csv(self, body: bytes):
+        # Lecture du multipart/form-data via le parseur MIME de la bibliothèque standard
+        message = BytesParser().parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body
+        )
+        upload = next(
+            (part.get_payload(decode=True) for part in message.get_payload()
+             if part.get_param("name", header="content-disposition") == "data"),
+            b""
+        )
+
+        reader = csv.DictReader(io.StringIO(upload.decode("utf-8-sig")))
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow([
+            "id", "q", "latitude", "longitude", "result_label", "result_score",
+            "result_postcode", "result_city", "result_citycode",
+        ])
+        for row in reader:
+            result = geocode(row.get("q", "")) or {}
+            writer.writerow([
+                row.get("id"), row.get("q"),
+                result.get("latitude", ""), result.get("longitude", ""),
+                result.get("label", ""), result.get("score", ""),
+                result.get("postcode", ""), result.get("city", ""),
+                result.get("citycode", ""),
+            ])
+
+        self._send(200, output.getvalue().encode("utf-8"), "text/csv; charset=utf-8")
+
+
+class MockGeoServer:
+    """
+    Serveur de benchmark lancé dans un thread, utilisable en contexte :
+
+        with MockGeoServer(latency=0.005, error_rate=0.01) as server:
+            fetcher = AdresseFetcher(config=server.config(ADRESSE_CONFIG))
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 42):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), GeoRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.error_rate = error_rate
+        self.httpd.rng = random.Random(seed)
+        self.httpd.requests = 0
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    def config(self, base_config, rate_limited: bool = True):
+        """
+        Copie d'une APIConfig pointant vers ce serveur. Le débit reste celui
+        de la configuration livrée, sauf avec `rate_limited=False` (mesure
+        du seul coût client).
+        """
+        config = replace(base_config, base_url=self.url, http2=False)
+        return config if rate_limited else replace(config, rate_limit=0)
+
+    def start(self) -> "MockGeoServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,121 @@
+"""Générateurs de données synthétiques (adresses et datasets enrichis)."""
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from pipeline.storage import apply_geo_dtypes
+
+
+@dataclass(frozen=True)
+class SyntheticCommune:
+    """Commune fictive servie par le serveur de benchmark."""
+    citycode: str
+    nom: str
+    postcode: str
+    code_departement: str
+    code_region: str
+    population: int
+    latitude: float
+    longitude: float
+
+
+# Communes de référence (codes INSEE réels, données simplifiées)
+COMMUNES = [
+    SyntheticCommune("75056", "Paris", "75001", "75", "11", 2133111, 48.8566, 2.3522),
+    SyntheticCommune("69123", "Lyon", "69001", "69", "84", 522250, 45.7640, 4.8357),
+    SyntheticCommune("13055", "Marseille", "13001", "13", "93", 873076, 43.2965, 5.3698),
+    SyntheticCommune("31555", "Toulouse", "31000", "31", "76", 504078, 43.6047, 1.4442),
+    SyntheticCommune("06088", "Nice", "06000", "06", "93", 348085, 43.7102, 7.2620),
+    SyntheticCommune("44109", "Nantes", "44000", "44", "52", 325070, 47.2184, -1.5536),
+    SyntheticCommune("67482", "Strasbourg", "67000", "67", "44", 291313, 48.5734, 7.7521),
+    SyntheticCommune("34172", "Montpellier", "34000", "34", "76", 302454, 43.6108, 3.8767),
+    SyntheticCommune("33063", "Bordeaux", "33000", "33", "75", 261804, 44.8378, -0.5792),
+    SyntheticCommune("59350", "Lille", "59000", "59", "32", 236710, 50.6292, 3.0573),
+    SyntheticCommune("35238", "Rennes", "35000", "35", "53", 227830, 48.1173, -1.6778),
+    SyntheticCommune("51454", "Reims", "51100", "51", "44", 178330, 49.2583, 4.0317),
+    SyntheticCommune("2A004", "Ajaccio", "20000", "2A", "94", 73003, 41.9192, 8.7386),
+    SyntheticCommune("97411", "Saint-Denis", "97400", "974", "04", 153810, -20.8823, 55.4504),
+]
+
+STREETS = [
+    "rue de la Paix", "avenue de la République", "boulevard Victor Hugo",
+    "place de l'Église", "rue Jean Jaurès", "allée des Tilleuls",
+    "chemin du Moulin", "rue Pasteur", "avenue du Général de Gaulle",
+    "impasse des Lilas", "quai de la Loire", "rue Nationale",
+]
+
+# Libellé qu'aucun géocodeur ne reconnaît (adresses en échec)
+UNKNOWN_STREET = "voie inconnue"
+
+# Tailles de référence des benchmarks
+BENCHMARK_SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def generate_addresses(
+    n: int,
+    seed: int = 42,
+    unknown_rate: float = 0.02,
+    duplicate_rate: float = 0.05
+) -> list[str]:
+    """
+    Génère `n` adresses reproductibles (même graine, même liste).
+    Une part `unknown_rate` est non géocodable, une part `duplicate_rate`
+    répète une adresse déjà tirée.
+    """
+    rng = np.random.default_rng(seed)
+    # Chaque tirage est un identifiant unique décomposé en (numéro, voie, commune) :
+    # hors doublons volontaires, aucune adresse ne se répète
+    ids = rng.permutation(n)
+    ids, communes = np.divmod(ids, len(COMMUNES))
+    numbers, streets = np.divmod(ids, len(STREETS))
+    draws = rng.random(n)
+
+    addresses = []
+    for i in range(n):
+        commune = COMMUNES[communes[i]]
+        street = STREETS[streets[i]]
+
+        if draws[i] < unknown_rate:
+            street = UNKNOWN_STREET
+        elif draws[i] < unknown_rate + duplicate_rate and addresses:
+            addresses.append(addresses[int(draws[i] * 1e6) % len(addresses)])
+            continue
+
+        addresses.append(f"{numbers[i] + 1} {street} {commune.postcode} {commune.nom}")
+
+    return addresses
+
+
+def generate_enriched_dataset(n: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Génère directement un dataset au format EnrichedAddress (types de
+    to_geo_frame), pour mesurer transformation, qualité et stockage sans
+    passer par le géocodage.
+    """
+    rng = np.random.default_rng(seed)
+    addresses = generate_addresses(n, seed)
+    idx = rng.integers(0, len(COMMUNES), n)
+    unknown = np.array([UNKNOWN_STREET in a for a in addresses])
+
+    lat = np.array([c.latitude for c in COMMUNES])[idx] + rng.normal(0, 0.02, n)
+    lon = np.array([c.longitude for c in COMMUNES])[idx] + rng.normal(0, 0.02, n)
+    score = np.round(rng.uniform(0.3, 1.0, n), 4)
+
+    def masked(values):
+        return pd.Series(values).where(~unknown)
+
+    return apply_geo_dtypes(pd.DataFrame({
+        "address": addresses,
+        "latitude": masked(lat),
+        "longitude": masked(lon),
+        "score": np.where(unknown, 0.0, score),
+        "city": masked(np.array([c.nom for c in COMMUNES])[idx]),
+        "postcode": masked(np.array([c.postcode for c in COMMUNES])[idx]),
+        "citycode": masked(np.array([c.citycode for c in COMMUNES])[idx]),
+        "commune": masked(np.array([c.nom for c in COMMUNES])[idx]),
+        "population": masked(np.array([c.population for c in COMMUNES])[idx]),
+        "query": addresses,
+        "fetched_at": datetime.now(),
+    }))
@@ -1,6 +1,5 @@
-def main():
-    print("Hello from tp2-exploration!")
+from pipeline.main import main
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
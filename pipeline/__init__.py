@@ -1,8 +1,15 @@
 # pipeline/__init__.py
 from .config import *
 from .models import *
+from .batch import *
 from .fetchers import *
 from .enricher import *
 from .transformer import *
 from .quality import *
 from .storage import *
+from .store import *
+from .cache import *
+from .incremental import *
+from .streaming import *
+from .checkpoint import *
+from .metrics import *
@@ -0,0 +1,6 @@
+"""Point d'entrée : python -m pipeline."""
+import sys
+
+from .main import main
+
+sys.exit(main())
@@ -0,0 +1,107 @@
+"""Lot d'adresses enrichies stocké par colonnes (sans objet ni dict par ligne)."""
+from datetime import datetime
+from typing import Iterable
+
+import pandas as pd
+import pyarrow as pa
+
+from .models import EnrichedAddress
+from .storage import GEO_DATASET_SCHEMA, arrow_to_pandas
+
+# Champs d'EnrichedAddress sans valeur par défaut : jamais nuls
+REQUIRED_FIELDS = [
+    name for name, field in EnrichedAddress.model_fields.items() if field.is_required()
+]
+
+
+class EnrichedBatch:
+    """
+    Adresses enrichies rangées dans une liste par champ d'EnrichedAddress.
+    La validation (types du schéma GEO, champs obligatoires) est faite
+    colonne par colonne lors de la conversion en Arrow.
+    """
+
+    def __init__(self):
+        self.columns: dict[str, list] = {name: [] for name in GEO_DATASET_SCHEMA.names}
+
+    def __len__(self) -> int:
+        return len(self.columns["address"])
+
+    def append(
+        self,
+        address: str,
+        latitude: float,
+        longitude: float,
+        score: float,
+        city: str,
+        postcode: str,
+        citycode: str,
+        commune: str,
+        population: int,
+        query: str | None = None,
+        fetched_at: datetime | None = None
+    ):
+        """Ajoute une adresse enrichie (mêmes champs qu'EnrichedAddress)."""
+        columns = self.columns
+        columns["address"].append(address)
+        columns["latitude"].append(latitude)
+        columns["longitude"].append(longitude)
+        columns["score"].append(score)
+        columns["city"].append(city)
+        columns["postcode"].append(postcode)
+        columns["citycode"].append(citycode)
+        columns["commune"].append(commune)
+        columns["population"].append(population)
+        columns["query"].append(query)
+        columns["fetched_at"].append(fetched_at or datetime.now())
+
+    def extend(self, other: "EnrichedBatch") -> "EnrichedBatch":
+        for name, values in other.columns.items():
+            self.columns[name].extend(values)
+        return self
+
+    # ==========================================================
+    # Conversions
+    # ==========================================================
+
+    @classmethod
+    def from_models(cls, models: Iterable[EnrichedAddress]) -> "EnrichedBatch":
+        batch = cls()
+        for model in models:
+            for name, values in batch.columns.items():
+                values.append(getattr(model, name))
+        return batch
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table) -> "EnrichedBatch":
+        """Relit un lot écrit par to_arrow (colonnes absentes : valeurs nulles)."""
+        batch = cls()
+        for name in batch.columns:
+            if name in table.column_names:
+                batch.columns[name] = table[name].to_pylist()
+            else:
+                batch.columns[name] = [None] * table.num_rows
+        return batch
+
+    def to_arrow(self) -> pa.Table:
+        """Table Arrow au schéma GEO_DATASET_SCHEMA ; ValueError si un champ est invalide."""
+        arrays = []
+        for field in GEO_DATASET_SCHEMA:
+            try:
+                array = pa.array(self.columns[field.name], type=field.type)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(f"Champ {field.name} invalide : {e}") from e
+            if field.name in REQUIRED_FIELDS and array.null_count:
+                raise ValueError(f"Champ {field.name} obligatoire : {array.null_count} valeurs nulles")
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, schema=GEO_DATASET_SCHEMA)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame aux types de to_geo_frame (chaînes Arrow, catégories)."""
+        return arrow_to_pandas(self.to_arrow())
+
+    def to_models(self) -> list[EnrichedAddress]:
+        return [
+            EnrichedAddress(**dict(zip(self.columns, row)))
+            for row in zip(*self.columns.values())
+        ]
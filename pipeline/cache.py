@@ -0,0 +1,176 @@
+"""Cache persistant (SQLite) des résultats de géocodage."""
+import json
+import sqlite3
+import time
+import unicodedata
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+from .config import (
+    GEOCODING_CACHE_PATH,
+    GEOCODING_CACHE_TTL_DAYS,
+    GEOCODING_CACHE_MAX_ENTRIES,
+)
+from .models import GeocodingRecord, GeocodingResult
+
+
+def record_to_json(record: GeocodingRecord) -> str:
+    """Sérialise un résultat avec les clés de GeocodingResult.model_dump_json."""
+    return json.dumps(asdict(record), default=datetime.isoformat)
+
+
+def record_from_json(payload: str) -> GeocodingRecord:
+    values = json.loads(payload)
+    if values.get("fetched_at"):
+        values["fetched_at"] = datetime.fromisoformat(values["fetched_at"])
+    return GeocodingRecord(**values)
+
+
+def normalize_query(text: str) -> str:
+    """Normalise une adresse : casse, accents et espaces neutralisés."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(without_accents.casefold().split())
+
+
+class GeocodingCache:
+    """Cache des résultats de géocodage indexé par adresse normalisée."""
+
+    # Nombre d'écritures entre deux commits / contrôles de taille
+    COMMIT_EVERY = 500
+
+    def __init__(
+        self,
+        path: str | Path = GEOCODING_CACHE_PATH,
+        ttl_days: float = GEOCODING_CACHE_TTL_DAYS,
+        max_entries: int = GEOCODING_CACHE_MAX_ENTRIES
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self._pending_writes = 0
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocoding (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_geocoding_accessed ON geocoding (accessed_at)"
+        )
+        self.conn.commit()
+
+    # ==========================================================
+    # Lecture / écriture
+    # ==========================================================
+
+    def get(self, query: str) -> GeocodingRecord | None:
+        """Retourne le résultat en cache (None si absent ou expiré)."""
+        key = normalize_query(query)
+        row = self.conn.execute(
+            "SELECT result, created_at FROM geocoding WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        result, created_at = row
+        now = time.time()
+
+        if now - created_at > self.ttl_seconds:
+            self.conn.execute("DELETE FROM geocoding WHERE key = ?", (key,))
+            self._after_write()
+            return None
+
+        self.conn.execute(
+            "UPDATE geocoding SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        self._after_write()
+        return record_from_json(result)
+
+    def set(self, result: GeocodingRecord | GeocodingResult):
+        """Enregistre (ou remplace) le résultat d'une adresse."""
+        if isinstance(result, GeocodingResult):
+            result = GeocodingRecord.from_model(result)
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO geocoding (key, result, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?)",
+            (normalize_query(result.query), record_to_json(result), now, now)
+        )
+        self._after_write()
+
+    def _after_write(self):
+        """Commit groupé et éviction périodique."""
+        self._pending_writes += 1
+        if self._pending_writes >= self.COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Applique l'éviction et valide les écritures en attente."""
+        self.evict()
+        self.conn.commit()
+        self._pending_writes = 0
+
+    # ==========================================================
+    # Expiration / éviction
+    # ==========================================================
+
+    def purge_expired(self) -> int:
+        """Supprime les entrées dont le TTL est dépassé."""
+        cursor = self.conn.execute(
+            "DELETE FROM geocoding WHERE created_at < ?",
+            (time.time() - self.ttl_seconds,)
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def evict(self) -> int:
+        """Supprime les entrées les moins récemment lues au-delà de max_entries."""
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+
+        cursor = self.conn.execute(
+            "DELETE FROM geocoding WHERE key IN ("
+            "SELECT key FROM geocoding ORDER BY accessed_at, rowid LIMIT ?)",
+            (excess,)
+        )
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM geocoding").fetchone()[0]
+
+    # ==========================================================
+    # Fermeture
+    # ==========================================================
+
+    def close(self):
+        """Valide les écritures en attente et ferme la base."""
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_cache(use_cache: bool = True, cache_dir: str | Path | None = None) -> GeocodingCache | None:
+    """Ouvre le cache de géocodage (dans `cache_dir` si fourni, None si désactivé)."""
+    if not use_cache:
+        return None
+    if cache_dir is not None:
+        return GeocodingCache(Path(cache_dir) / GEOCODING_CACHE_PATH.name)
+    return GeocodingCache()
@@ -0,0 +1,94 @@
+"""Points de reprise de l'enrichissement GEO."""
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from .batch import EnrichedBatch
+from .config import CHECKPOINT_DIR
+from .models import EnrichedAddress
+
+
+class EnrichmentCheckpoint:
+    """
+    Sauvegarde périodique des adresses enrichies et de la position atteinte
+    dans la liste d'entrée, pour reprendre un run interrompu.
+    """
+
+    def __init__(self, run_id: str, directory: Path | None = None):
+        self.run_id = run_id
+        self.path = Path(directory or CHECKPOINT_DIR) / run_id
+        self.state_path = self.path / "state.json"
+        self.state = self._load_state()
+
+    @classmethod
+    def for_addresses(
+        cls,
+        addresses: list[str],
+        name: str = "geo_enriched",
+        directory: Path | None = None
+    ) -> "EnrichmentCheckpoint":
+        """Point de reprise identifié par le contenu de la liste d'adresses."""
+        digest = hashlib.sha1("\n".join(addresses).encode("utf-8")).hexdigest()[:12]
+        return cls(f"{name}_{digest}", directory)
+
+    # ==========================================================
+    # État
+    # ==========================================================
+
+    def _load_state(self) -> dict:
+        if self.state_path.exists():
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        return {"run_id": self.run_id, "offset": 0, "parts": []}
+
+    @property
+    def exists(self) -> bool:
+        return self.state_path.exists()
+
+    @property
+    def offset(self) -> int:
+        """Nombre d'adresses d'entrée déjà traitées."""
+        return self.state["offset"]
+
+    # ==========================================================
+    # Sauvegarde / chargement
+    # ==========================================================
+
+    def save(self, results: EnrichedBatch | list[EnrichedAddress], offset: int):
+        """Enregistre les résultats d'un lot puis la nouvelle position."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        if not isinstance(results, EnrichedBatch):
+            results = EnrichedBatch.from_models(results)
+
+        # Le lot est écrit avant l'état : un crash entre les deux laisse
+        # un fichier orphelin mais jamais un état qui pointe dans le vide
+        if results:
+            part = f"part_{len(self.state['parts']):05d}.parquet"
+            pq.write_table(results.to_arrow(), self.path / part)
+            self.state["parts"].append(part)
+
+        self.state["offset"] = offset
+        self.state["updated_at"] = datetime.now().isoformat()
+
+        tmp_path = self.state_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(self.state), encoding="utf-8")
+        os.replace(tmp_path, self.state_path)
+
+    def load_batch(self) -> EnrichedBatch:
+        """Recharge les adresses enrichies des lots déjà sauvegardés."""
+        batch = EnrichedBatch()
+        for part in self.state["parts"]:
+            batch.extend(EnrichedBatch.from_arrow(pq.read_table(self.path / part)))
+        return batch
+
+    def load_results(self) -> list[EnrichedAddress]:
+        return self.load_batch().to_models()
+
+    def clear(self):
+        """Supprime le point de reprise (run terminé ou redémarré)."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.state = {"run_id": self.run_id, "offset": 0, "parts": []}
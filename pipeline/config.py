@@ -13,8 +13,10 @@ DATA_DIR = BASE_DIR / "data"
 RAW_DIR = DATA_DIR / "raw"
 PROCESSED_DIR = DATA_DIR / "processed"
 REPORTS_DIR = DATA_DIR / "reports"
+CACHE_DIR = DATA_DIR / "cache"
+CHECKPOINT_DIR = RAW_DIR / "checkpoints"
 
-for dir_path in [RAW_DIR, PROCESSED_DIR, REPORTS_DIR]:
+for dir_path in [RAW_DIR, PROCESSED_DIR, REPORTS_DIR, CACHE_DIR, CHECKPOINT_DIR]:
     dir_path.mkdir(parents=True, exist_ok=True)
 
 
@@ -30,6 +32,14 @@ class APIConfig:
     timeout: int
     rate_limit: float  # secondes entre requêtes
     headers: dict | None = None
+    # Pool de connexions HTTP (keep-alive)
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0  # secondes
+    http2: bool = True              # utilisé seulement si le paquet h2 est installé
+    # Débit : rafale autorisée par le seau de jetons et requêtes simultanées (mode async)
+    burst: int = 1
+    max_concurrency: int = 10
 
     def __post_init__(self):
         self.headers = self.headers or {}
@@ -39,12 +49,16 @@ class APIConfig:
 #  APIs utilisées dans le TP
 # ==========================================================
 
+# Les deux APIs data.gouv.fr acceptent 50 requêtes/s par IP : on vise 40/s,
+# avec une rafale égale à la concurrence par défaut (pire première seconde : 50)
+
 # API Adresse — Base Adresse Nationale (géocodage)
 ADRESSE_CONFIG = APIConfig(
     name="API Adresse (BAN)",
     base_url="https://api-adresse.data.gouv.fr",
     timeout=10,
-    rate_limit=0.1
+    rate_limit=0.025,
+    burst=10
 )
 
 # API geo.api.gouv.fr — données communes
@@ -52,7 +66,8 @@ COMMUNE_CONFIG = APIConfig(
     name="Geo API Gouv - Communes",
     base_url="https://geo.api.gouv.fr",
     timeout=10,
-    rate_limit=0.1
+    rate_limit=0.025,
+    burst=10
 )
 
 # API Hub'Eau — Qualité de l'eau potable
@@ -69,6 +84,31 @@ EAU_CONFIG = APIConfig(
 
 MAX_ITEMS = 200          # Nombre max d'adresses 
 BATCH_SIZE = 20          # Taille des lots si besoin
+BULK_BATCH_SIZE = 5000   # Adresses par envoi CSV à /search/csv/ (mode bulk)
+BULK_TIMEOUT = 120       # Timeout (s) d'un envoi CSV
+COMMUNE_CACHE_SIZE = 10000  # Communes gardées en mémoire (cache LRU)
+STREAM_CHUNK_SIZE = 10000   # Adresses par lot en mode streaming
+CHECKPOINT_EVERY = 1000     # Adresses enrichies entre deux points de reprise
+PARALLEL_MIN_ROWS = 1_000_000  # En dessous, DataTransformer(n_jobs>1) reste dans le processus principal (voir README)
+RAW_FORMAT = "ndjson.zst"    # Dump brut : json, ndjson, ndjson.gz, ndjson.zst ou arrow
+RAW_CHUNK_ROWS = 100_000    # Lignes sérialisées à la fois dans un dump NDJSON
+
+
+# ==========================================================
+#  Dataset partitionné (sortie "store")
+# ==========================================================
+
+STORE_DIR = PROCESSED_DIR / "geo_store"   # un sous-dossier code_departement=XX par partition
+STORE_COMPACT_MIN_ROWS = 50_000           # en dessous, un fichier est fusionné lors du compactage
+
+
+# ==========================================================
+#  Cache persistant du géocodage
+# ==========================================================
+
+GEOCODING_CACHE_PATH = CACHE_DIR / "geocoding.sqlite"
+GEOCODING_CACHE_TTL_DAYS = 30            # durée de validité d'un résultat
+GEOCODING_CACHE_MAX_ENTRIES = 2_000_000  # au-delà, éviction des moins récemment lus
 
 
 # ==========================================================
@@ -80,3 +120,8 @@ QUALITY_THRESHOLDS = {
     "geocoding_score_min": 0.5,     # score BAN minimal acceptable
     "duplicates_max_pct": 5.0,      # max 5% doublons
 }
+
+# Détection des doublons en traitement par lots : "exact" (ensemble des empreintes)
+# ou "hll" (HyperLogLog, mémoire fixe, erreur relative QUALITY_SKETCH_ERROR)
+QUALITY_DUPLICATE_SKETCH = "exact"
+QUALITY_SKETCH_ERROR = 0.01
@@ -1,19 +1,46 @@
 """Module d'enrichissement croisé GEO."""
 
+from datetime import datetime
 from typing import List
 from tqdm import tqdm
 
+from .batch import EnrichedBatch
+from .cache import GeocodingCache
+from .checkpoint import EnrichmentCheckpoint
+from .config import BULK_BATCH_SIZE, CHECKPOINT_EVERY
 from .fetchers.adresse import AdresseFetcher
 from .fetchers.commune import CommuneFetcher
-from .models import GeocodingResult, EnrichedAddress
+from .models import GeocodingRecord, EnrichedAddress
+
+
+GEOCODING_MODES = ("sequential", "async", "bulk")
 
 
 class GeoEnricher:
     """Enrichit des adresses via géocodage + données communes."""
 
-    def __init__(self):
-        self.geocoder = AdresseFetcher()
-        self.commune_fetcher = CommuneFetcher()
+    def __init__(
+        self,
+        mode: str = "sequential",
+        concurrency: int | None = None,
+        batch_size: int | None = None,
+        prefetch_communes: bool = True,
+        cache: GeocodingCache | None = None,
+        geocoder: AdresseFetcher | None = None,
+        commune_fetcher: CommuneFetcher | None = None
+    ):
+        if mode not in GEOCODING_MODES:
+            raise ValueError(f"Mode de géocodage inconnu : {mode} (attendu : {GEOCODING_MODES})")
+
+        # sequential : une requête à la fois / async : requêtes concurrentes
+        # bulk : envoi CSV par lots de `batch_size` adresses
+        self.mode = mode
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        # Charge les communes en bloc (une requête par département)
+        self.prefetch_communes = prefetch_communes
+        self.geocoder = geocoder or AdresseFetcher(cache=cache)
+        self.commune_fetcher = commune_fetcher or CommuneFetcher()
         self.stats = {
             "total_addresses": 0,
             "geocoded": 0,
@@ -25,14 +52,74 @@ class GeoEnricher:
     # Géocodage + enrichissement
     # ==========================================================
 
-    def enrich_addresses(self, addresses: List[str]) -> List[EnrichedAddress]:
-        """Enrichit une liste d'adresses avec géocodage et infos communes."""
-        enriched_results = []
+    def enrich_addresses(
+        self,
+        addresses: List[str],
+        checkpoint: EnrichmentCheckpoint | None = None,
+        checkpoint_every: int = CHECKPOINT_EVERY
+    ) -> List[EnrichedAddress]:
+        """
+        Enrichit une liste d'adresses avec géocodage et infos communes.
+        Avec un checkpoint, les adresses sont traitées par lots de
+        `checkpoint_every` et le travail déjà sauvegardé est repris.
+        """
+        return self.enrich_batch(addresses, checkpoint, checkpoint_every).to_models()
+
+    def enrich_batch(
+        self,
+        addresses: List[str],
+        checkpoint: EnrichmentCheckpoint | None = None,
+        checkpoint_every: int = CHECKPOINT_EVERY
+    ) -> EnrichedBatch:
+        """
+        Comme enrich_addresses, mais le résultat reste rangé par colonnes
+        (pas de modèle pydantic ni de dict par adresse).
+        """
+        if checkpoint is None:
+            return self._enrich(addresses)
+
+        enriched_results = checkpoint.load_batch()
+        start = checkpoint.offset
+        if start:
+            self.stats["resumed_from"] = start
+            print(f"   ↩️ Reprise à l'adresse {start} ({len(enriched_results)} déjà enrichies)")
+
+        step = self._checkpoint_step(checkpoint_every)
+        for chunk_start in range(start, len(addresses), step):
+            chunk = addresses[chunk_start:chunk_start + step]
+            chunk_results = self._enrich(chunk)
+            checkpoint.save(chunk_results, chunk_start + len(chunk))
+            enriched_results.extend(chunk_results)
 
-        for address in tqdm(addresses, desc="Enrichissement GEO"):
-            self.stats["total_addresses"] += 1
+        return enriched_results
 
-            geo: GeocodingResult = self.geocoder.fetch_one(address)
+    def _checkpoint_step(self, checkpoint_every: int) -> int:
+        """
+        Adresses entre deux points de reprise. En mode bulk, le pas est
+        arrondi à un multiple de la taille des envois CSV : un point de
+        reprise ne coupe jamais un envoi en deux.
+        """
+        if self.mode != "bulk":
+            return checkpoint_every
+        batch_size = self.batch_size or BULK_BATCH_SIZE
+        return -(-checkpoint_every // batch_size) * batch_size
+
+    def _enrich(self, addresses: List[str]) -> EnrichedBatch:
+        """Géocode puis enrichit un lot d'adresses."""
+        enriched_results = EnrichedBatch()
+        geocoded = self._geocode(addresses)
+        # Un horodatage par lot plutôt qu'un datetime.now() par adresse
+        fetched_at = datetime.now()
+
+        # Les appels communes dépendent du nombre de communes distinctes,
+        # pas du nombre d'adresses
+        if self.prefetch_communes:
+            self.commune_fetcher.prefetch(
+                geo.citycode for geo in geocoded if geo and geo.is_valid
+            )
+
+        for geo in tqdm(geocoded, desc="Enrichissement GEO"):
+            self.stats["total_addresses"] += 1
 
             if not geo or not geo.is_valid:
                 self.stats["failed"] += 1
@@ -48,23 +135,52 @@ class GeoEnricher:
 
             # Fusion des données géocodées et commune
             enriched_results.append(
-                EnrichedAddress(
-                    address=geo.label,
-                    latitude=geo.latitude,
-                    longitude=geo.longitude,
-                    score=geo.score,
-                    city=geo.city,
-                    postcode=geo.postcode,
-                    citycode=geo.citycode,
-                    commune=commune.nom,
-                    population=commune.population,
-                )
+                address=geo.label,
+                latitude=geo.latitude,
+                longitude=geo.longitude,
+                score=geo.score,
+                city=geo.city,
+                postcode=geo.postcode,
+                citycode=geo.citycode,
+                commune=commune.nom,
+                population=commune.population,
+                query=geo.query,
+                fetched_at=fetched_at,
             )
 
             self.stats["enriched"] += 1
 
         return enriched_results
 
+    def _geocode(self, addresses: List[str]) -> List[GeocodingRecord]:
+        """Géocode les adresses selon le mode choisi (ordre conservé)."""
+        if self.mode == "async":
+            return self.geocoder._fetch_many_records(addresses, concurrency=self.concurrency)
+
+        if self.mode == "bulk":
+            return self.geocoder._fetch_bulk_records(addresses, chunk_size=self.batch_size)
+
+        fetched_at = datetime.now()
+        return [
+            self.geocoder._fetch_record(address, fetched_at)
+            for address in tqdm(addresses, desc="Géocodage")
+        ]
+
+    # ==========================================================
+    # Fermeture des clients HTTP
+    # ==========================================================
+
+    def close(self):
+        """Ferme les connexions HTTP des fetchers."""
+        self.geocoder.close()
+        self.commune_fetcher.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
     # ==========================================================
     # Statistiques
     # ==========================================================
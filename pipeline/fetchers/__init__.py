@@ -1,3 +1,4 @@
 # pipeline/fetchers/__init__.py
 from .adresse import AdresseFetcher
-from .commune import CommuneFetcher
\ No newline at end of file
+from .commune import CommuneFetcher
+from .ratelimit import TokenBucket
\ No newline at end of file
@@ -1,18 +1,89 @@
 """Fetcher pour l'API Adresse (Base Adresse Nationale)."""
 
+import asyncio
+import csv
+import io
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
 from typing import Generator
+
+import httpx
+from tenacity import RetryError
 from tqdm import tqdm
 
 from .base import BaseFetcher
-from ..config import ADRESSE_CONFIG
-from ..models import GeocodingResult
+from ..cache import GeocodingCache
+from ..config import APIConfig, ADRESSE_CONFIG, BULK_BATCH_SIZE, BULK_TIMEOUT
+from ..models import GeocodingRecord, GeocodingResult
+
+logger = logging.getLogger(__name__)
+
+# Colonnes demandées à /search/csv/ (les autres sont inutiles au pipeline)
+BULK_RESULT_COLUMNS = [
+    "latitude",
+    "longitude",
+    "result_label",
+    "result_score",
+    "result_postcode",
+    "result_city",
+    "result_citycode",
+]
 
 
 class AdresseFetcher(BaseFetcher):
     """Fetcher pour le géocodage des adresses via l'API Adresse."""
 
-    def __init__(self):
-        super().__init__(ADRESSE_CONFIG)
+    def __init__(
+        self,
+        transport: httpx.BaseTransport | None = None,
+        async_transport: httpx.AsyncBaseTransport | None = None,
+        cache: GeocodingCache | None = None,
+        config: APIConfig = ADRESSE_CONFIG
+    ):
+        super().__init__(
+            config,
+            transport=transport,
+            async_transport=async_transport
+        )
+        # Cache persistant optionnel (lecture et écriture à travers le cache)
+        self.cache = cache
+        self.stats.update({"cache_hits": 0, "cache_misses": 0})
+        # Boucle asyncio et client async gardés entre deux appels à fetch_many
+        # (enrichissement par lots avec points de reprise)
+        self._runner: asyncio.Runner | None = None
+        self._async_client: httpx.AsyncClient | None = None
+
+    def close(self):
+        """Ferme les clients HTTP (synchrone et asynchrone) et la boucle asyncio."""
+        super().close()
+        if self._runner is not None:
+            self._run_outside_loop(self._close_runner)
+
+    def _close_runner(self):
+        if self._async_client is not None:
+            self._runner.run(self._async_client.aclose())
+            self._async_client = None
+        self._runner.close()
+        self._runner = None
+
+    @staticmethod
+    def _run_outside_loop(func, *args):
+        """
+        Exécute `func` dans ce thread, ou dans un thread dédié si une boucle
+        asyncio y tourne déjà (Jupyter, serveur async) : le Runner ne peut
+        pas démarrer sa boucle dans un thread qui en exécute une autre.
+        L'appel reste bloquant dans les deux cas.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return func(*args)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(func, *args).result()
 
     # ==========================================================
     # Adresse unique
@@ -23,18 +94,66 @@ class AdresseFetcher(BaseFetcher):
         Récupère le géocodage d'une seule adresse.
         Retourne un objet GeocodingResult.
         """
+        return self._fetch_record(item).to_model()
+
+    def _fetch_record(
+        self,
+        item: str,
+        fetched_at: datetime | None = None
+    ) -> GeocodingRecord:
+        """fetch_one sans conversion pydantic (boucle d'enrichissement)."""
         if not item or not item.strip():
-            return GeocodingResult(query=item or "", score=0)
+            return GeocodingRecord(query=item or "", score=0)
+
+        cached = self._from_cache(item)
+        if cached:
+            return cached
+
+        return self._to_cache(self._search(item, fetched_at))
 
+    def _search(self, item: str, fetched_at: datetime | None = None) -> GeocodingRecord:
+        """Interroge /search/ (sans passer par le cache)."""
         # Requête API    
         data = self._make_request(
             endpoint="/search/",
             params={"q": item, "limit": 1}
         )
+        return self._parse_response(item, data, fetched_at or datetime.now())
 
-        if not data.get("features"):
+    def _from_cache(self, item: str) -> GeocodingRecord | None:
+        """Cherche l'adresse dans le cache persistant."""
+        if self.cache is None:
+            return None
+
+        cached = self.cache.get(item)
+        if cached is None:
+            self.stats["cache_misses"] += 1
+            return None
+
+        self.stats["cache_hits"] += 1
+        # La clé est normalisée : on restitue la requête telle que fournie
+        cached.query = item
+        return cached
+
+    def _to_cache(self, result: GeocodingRecord) -> GeocodingRecord:
+        """Enregistre un résultat dans le cache persistant."""
+        if self.cache is not None:
+            self.cache.set(result)
+        return result
+
+    def _parse_response(
+        self,
+        item: str,
+        data: dict | None,
+        fetched_at: datetime | None = None
+    ) -> GeocodingRecord:
+        """
+        Convertit la réponse JSON de /search/ en GeocodingRecord.
+        `fetched_at` est calculé une fois par lot par l'appelant.
+        """
+        if not data or not data.get("features"):
             # Aucun résultat trouvé
-            return GeocodingResult(query=item, score=0)
+            return GeocodingRecord(query=item, score=0)
 
         f = data["features"][0]
         props = f.get("properties", {})
@@ -42,8 +161,8 @@ class AdresseFetcher(BaseFetcher):
         # Mise à jour des statistiques
         self.stats["items_fetched"] += 1
 
-        # Retourne l'objet GeocodingResult
-        return GeocodingResult(
+        # Retourne l'objet GeocodingRecord
+        return GeocodingRecord(
             query=item,
             label=props.get("label"),
             latitude=lat,
@@ -52,6 +171,7 @@ class AdresseFetcher(BaseFetcher):
             postcode=props.get("postcode"),
             city=props.get("city"),
             citycode=props.get("citycode"),
+            fetched_at=fetched_at,
         )
 
     # ==========================================================
@@ -59,12 +179,15 @@ class AdresseFetcher(BaseFetcher):
     # ==========================================================
 
     def fetch_batch(self, addresses: list[str]) -> list[GeocodingResult]:
-        """Récupère un lot d'adresses en respectant le rate limit."""
+        """
+        Récupère un lot d'adresses en respectant le rate limit
+        (seules les requêtes HTTP consomment un jeton, pas les lectures en cache).
+        """
         results = []
+        fetched_at = datetime.now()
 
         for addr in addresses:
-            self._rate_limit()
-            result = self.fetch_one(addr)
+            result = self._fetch_record(addr, fetched_at).to_model()
             results.append(result)
 
         return results
@@ -80,13 +203,283 @@ class AdresseFetcher(BaseFetcher):
         verbose: bool = True
     ) -> Generator[GeocodingResult, None, None]:
 
-        from datetime import datetime
-
         self.stats["start_time"] = datetime.now()
         iterator = tqdm(addresses, desc="Géocodage", disable=not verbose)
 
         for addr in iterator:
-            self._rate_limit()
-            yield self.fetch_one(addr)
+            yield self._fetch_record(addr, self.stats["start_time"]).to_model()
 
         self.stats["end_time"] = datetime.now()
+
+    # ==========================================================
+    # Mode asynchrone (requêtes concurrentes)
+    # ==========================================================
+
+    async def fetch_one_async(
+        self,
+        client: httpx.AsyncClient,
+        item: str
+    ) -> GeocodingResult:
+        """Version asynchrone de fetch_one (débit limité par le seau de jetons)."""
+        return (await self._fetch_record_async(client, item)).to_model()
+
+    async def _fetch_record_async(
+        self,
+        client: httpx.AsyncClient,
+        item: str,
+        fetched_at: datetime | None = None
+    ) -> GeocodingRecord:
+        """Version asynchrone de _fetch_record."""
+        if not item or not item.strip():
+            return GeocodingRecord(query=item or "", score=0)
+
+        cached = self._from_cache(item)
+        if cached:
+            return cached
+
+        data = await self._make_request_async(
+            client,
+            endpoint="/search/",
+            params={"q": item, "limit": 1}
+        )
+        return self._to_cache(
+            self._parse_response(item, data, fetched_at or datetime.now())
+        )
+
+    async def fetch_many_async(
+        self,
+        addresses: list[str],
+        concurrency: int | None = None,
+        verbose: bool = True,
+        client: httpx.AsyncClient | None = None
+    ) -> list[GeocodingResult]:
+        """
+        Géocode les adresses avec au plus `concurrency` requêtes en vol.
+        Les résultats sont retournés dans l'ordre des adresses d'entrée.
+        Sans `client`, un client async est créé pour l'appel.
+        """
+        records = await self._fetch_many_records_async(
+            addresses, concurrency=concurrency, verbose=verbose, client=client
+        )
+        return [r.to_model() for r in records]
+
+    async def _fetch_many_records_async(
+        self,
+        addresses: list[str],
+        concurrency: int | None = None,
+        verbose: bool = True,
+        client: httpx.AsyncClient | None = None
+    ) -> list[GeocodingRecord]:
+        """fetch_many_async sans conversion pydantic."""
+        concurrency = concurrency or self.config.max_concurrency
+        results: list[GeocodingRecord | None] = [None] * len(addresses)
+        pending = iter(enumerate(addresses))
+
+        self.stats["start_time"] = datetime.now()
+        progress = tqdm(total=len(addresses), desc="Géocodage async", disable=not verbose)
+
+        async with nullcontext(client) if client else self._make_async_client() as client:
+
+            async def worker():
+                # Chaque worker consomme la même file d'index : le nombre de
+                # tâches reste borné quelle que soit la taille de l'entrée
+                for i, addr in pending:
+                    results[i] = await self._fetch_record_async(
+                        client, addr, self.stats["start_time"]
+                    )
+                    progress.update(1)
+
+            await asyncio.gather(
+                *(worker() for _ in range(min(concurrency, len(addresses))))
+            )
+
+        progress.close()
+        self.stats["end_time"] = datetime.now()
+        return results
+
+    def fetch_many(
+        self,
+        addresses: list[str],
+        concurrency: int | None = None,
+        verbose: bool = True
+    ) -> list[GeocodingResult]:
+        """
+        Point d'entrée synchrone de fetch_many_async. La boucle et le pool
+        de connexions async sont réutilisés d'un appel à l'autre (libérés
+        par close()).
+        """
+        records = self._fetch_many_records(
+            addresses, concurrency=concurrency, verbose=verbose
+        )
+        return [r.to_model() for r in records]
+
+    def _fetch_many_records(
+        self,
+        addresses: list[str],
+        concurrency: int | None = None,
+        verbose: bool = True
+    ) -> list[GeocodingRecord]:
+        """
+        fetch_many sans conversion pydantic (boucle d'enrichissement).
+        Depuis du code async, préférer `await fetch_many_async(...)` : cet
+        appel bloque la boucle appelante le temps du géocodage.
+        """
+        if self._runner is None:
+            self._runner = asyncio.Runner()
+        if self._async_client is None:
+            self._async_client = self._make_async_client()
+        coro = self._fetch_many_records_async(
+            addresses, concurrency=concurrency, verbose=verbose, client=self._async_client
+        )
+        return self._run_outside_loop(self._runner.run, coro)
+
+    # ==========================================================
+    # Mode bulk (envoi CSV à /search/csv/)
+    # ==========================================================
+
+    def fetch_bulk(
+        self,
+        addresses: list[str],
+        chunk_size: int | None = None,
+        verbose: bool = True
+    ) -> list[GeocodingResult]:
+        """
+        Géocode les adresses par lots CSV via l'endpoint /search/csv/.
+        Les résultats sont retournés dans l'ordre des adresses d'entrée.
+        """
+        records = self._fetch_bulk_records(
+            addresses, chunk_size=chunk_size, verbose=verbose
+        )
+        return [r.to_model() for r in records]
+
+    def _fetch_bulk_records(
+        self,
+        addresses: list[str],
+        chunk_size: int | None = None,
+        verbose: bool = True
+    ) -> list[GeocodingRecord]:
+        """fetch_bulk sans conversion pydantic (boucle d'enrichissement)."""
+        chunk_size = chunk_size or BULK_BATCH_SIZE
+        results: list[GeocodingRecord | None] = [None] * len(addresses)
+
+        self.stats["start_time"] = datetime.now()
+
+        # Seules les adresses absentes du cache partent dans les lots CSV
+        missing = []
+        for i, addr in enumerate(addresses):
+            if addr and addr.strip():
+                results[i] = self._from_cache(addr)
+            if results[i] is None:
+                missing.append(i)
+
+        starts = range(0, len(missing), chunk_size)
+        for start in tqdm(starts, desc="Géocodage bulk", disable=not verbose):
+            indices = missing[start:start + chunk_size]
+            chunk_results = self._geocode_chunk([addresses[i] for i in indices])
+            for i, result in zip(indices, chunk_results):
+                if result is None:
+                    # Échec réseau : non géocodée, et pas mise en cache pour
+                    # être retentée au prochain run
+                    results[i] = GeocodingRecord(query=addresses[i], score=0)
+                else:
+                    results[i] = self._to_cache(result) if result.query.strip() else result
+
+        self.stats["end_time"] = datetime.now()
+        return results
+
+    def _geocode_chunk(self, chunk: list[str]) -> list[GeocodingRecord | None]:
+        """
+        Géocode un lot ; en cas d'échec, le lot est coupé en deux et relancé.
+        None pour une adresse dont le géocodage unitaire a aussi échoué.
+        """
+        try:
+            return self._post_csv(chunk)
+        except (httpx.HTTPError, csv.Error, ValueError, KeyError) as e:
+            self.stats["requests_failed"] += 1
+
+            if len(chunk) == 1:
+                # Dernier recours : géocodage unitaire (avec son propre retry,
+                # chaque tentative échouée est comptée dans requests_failed)
+                try:
+                    return [self._search(chunk[0])]
+                except (RetryError, httpx.HTTPError, ValueError) as e:
+                    logger.warning("Échec du géocodage de %r : %s", chunk[0], e)
+                    return [None]
+
+            logger.warning(
+                "Échec du lot CSV (%d adresses) : %s — découpage en deux",
+                len(chunk), e
+            )
+            mid = len(chunk) // 2
+            return self._geocode_chunk(chunk[:mid]) + self._geocode_chunk(chunk[mid:])
+
+    def _post_csv(self, chunk: list[str]) -> list[GeocodingRecord]:
+        """Envoie un lot CSV et lit la réponse CSV en flux."""
+        results: list[GeocodingRecord | None] = [None] * len(chunk)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["id", "q"])
+        for i, addr in enumerate(chunk):
+            if not addr or not addr.strip():
+                results[i] = GeocodingRecord(query=addr or "", score=0)
+                continue
+            # Un retour à la ligne casserait la lecture ligne à ligne de la réponse
+            writer.writerow([i, " ".join(addr.split())])
+
+        if all(r is not None for r in results):
+            return results
+
+        # Un jeton par envoi, y compris les relances des moitiés de lot
+        self._rate_limit()
+        start = time.perf_counter()
+        with self.client.stream(
+            "POST",
+            "/search/csv/",
+            files={"data": ("addresses.csv", buffer.getvalue().encode("utf-8"), "text/csv")},
+            data={"columns": "q", "result_columns": BULK_RESULT_COLUMNS},
+            timeout=BULK_TIMEOUT,
+        ) as response:
+            self.stats["requests_made"] += 1
+            response.raise_for_status()
+
+            reader = csv.DictReader(response.iter_lines())
+            # Le BOM éventuel reste collé au premier nom de colonne
+            reader.fieldnames = [f.lstrip("\ufeff") for f in reader.fieldnames or []]
+
+            fetched_at = datetime.now()
+            for row in reader:
+                i = int(row["id"])
+                results[i] = self._parse_csv_row(chunk[i], row, fetched_at)
+
+        # Latence d'un envoi CSV complet (réponse lue en entier)
+        self.latencies.append(time.perf_counter() - start)
+
+        if any(r is None for r in results):
+            raise ValueError("Réponse CSV incomplète")
+
+        return results
+
+    def _parse_csv_row(
+        self,
+        item: str,
+        row: dict,
+        fetched_at: datetime | None = None
+    ) -> GeocodingRecord:
+        """Convertit une ligne de la réponse CSV en GeocodingRecord."""
+        if not row.get("result_label"):
+            return GeocodingRecord(query=item, score=0)
+
+        self.stats["items_fetched"] += 1
+
+        return GeocodingRecord(
+            query=item,
+            label=row["result_label"],
+            latitude=float(row["latitude"]) if row.get("latitude") else None,
+            longitude=float(row["longitude"]) if row.get("longitude") else None,
+            score=float(row.get("result_score") or 0),
+            postcode=row.get("result_postcode") or None,
+            city=row.get("result_city") or None,
+            citycode=row.get("result_citycode") or None,
+            fetched_at=fetched_at,
+        )
@@ -1,6 +1,8 @@
 """Classe de base pour les fetchers d'API GEO."""
+import importlib.util
 import time
 from abc import ABC, abstractmethod
+from collections import deque
 from typing import Generator
 
 import httpx
@@ -13,17 +15,48 @@ from tenacity import (
 )
 import logging
 
+from .ratelimit import TokenBucket
 from ..config import APIConfig
+from ..metrics import latency_percentiles
 
 logger = logging.getLogger(__name__)
 
+# HTTP/2 n'est disponible que si le paquet optionnel h2 est installé
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Nombre de latences HTTP conservées pour les percentiles
+LATENCY_SAMPLES = 100_000
+
+# Politique de retry commune aux requêtes synchrones et asynchrones
+_retry_policy = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=2, max=20),
+    retry=retry_if_exception_type(
+        (httpx.HTTPError, httpx.TimeoutException)
+    ),
+    before_sleep=before_sleep_log(logger, logging.WARNING)
+)
+
 
 class BaseFetcher(ABC):
     """Classe abstraite pour les fetchers d'API REST."""
 
-    def __init__(self, config: APIConfig):
+    def __init__(
+        self,
+        config: APIConfig,
+        transport: httpx.BaseTransport | None = None,
+        async_transport: httpx.AsyncBaseTransport | None = None
+    ):
         # Configuration de l'API (URL, timeout, rate limit)
         self.config = config
+        # Client HTTP persistant (créé à la première requête)
+        self._transport = transport
+        self._async_transport = async_transport
+        self._client: httpx.Client | None = None
+        # Seau de jetons partagé par les modes synchrone et asynchrone
+        self.rate_limiter = TokenBucket.from_interval(
+            config.rate_limit, capacity=config.burst
+        )
         # Statistiques d'utilisation
         self.stats = {
             "requests_made": 0,
@@ -32,58 +65,121 @@ class BaseFetcher(ABC):
             "start_time": None,
             "end_time": None,
         }
+        # Durées (s) des dernières requêtes HTTP
+        self.latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    # ==========================================================
+    #  Client HTTP persistant (pool de connexions)
+    # ==========================================================
+
+    @property
+    def client(self) -> httpx.Client:
+        """Client HTTP partagé par toutes les requêtes du fetcher."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.Client(
+                base_url=self.config.base_url,
+                timeout=self.config.timeout,
+                headers=self.config.headers,
+                limits=self._pool_limits(),
+                http2=self.config.http2 and HTTP2_AVAILABLE,
+                transport=self._transport,
+            )
+        return self._client
+
+    def _make_async_client(self) -> httpx.AsyncClient:
+        """
+        Crée un client asynchrone avec les mêmes réglages de pool.
+        Un client async est lié à sa boucle d'événements : il n'est
+        conservé qu'avec la boucle qui l'utilise.
+        """
+        return httpx.AsyncClient(
+            base_url=self.config.base_url,
+            timeout=self.config.timeout,
+            headers=self.config.headers,
+            limits=self._pool_limits(),
+            http2=self.config.http2 and HTTP2_AVAILABLE,
+            transport=self._async_transport,
+        )
+
+    def _pool_limits(self) -> httpx.Limits:
+        """Limites du pool de connexions définies dans APIConfig."""
+        return httpx.Limits(
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
+            keepalive_expiry=self.config.keepalive_expiry,
+        )
+
+    def close(self):
+        """Ferme le client HTTP et libère les connexions du pool."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     # ==========================================================
     #  Requête HTTP avec retry automatique
     # ==========================================================
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=20),
-        retry=retry_if_exception_type(
-            (httpx.HTTPError, httpx.TimeoutException)
-        ),
-        before_sleep=before_sleep_log(logger, logging.WARNING)
-    )
+    @_retry_policy
     def _make_request(self, endpoint: str, params: dict | None = None) -> dict | None:
         """
         Effectue une requête HTTP GET avec retry.
         Retourne le JSON ou None si 404.
+        Chaque tentative consomme un jeton du seau (les lectures en cache, non).
         """
-        url = f"{self.config.base_url}{endpoint}"
-
+        self._rate_limit()
         try:
-            with httpx.Client(
-                timeout=self.config.timeout,
-                headers=self.config.headers
-            ) as client:
-                response = client.get(url, params=params)
-
-              
-                self.stats["requests_made"] += 1
-
-                try:
-                    response.raise_for_status()
-                except httpx.HTTPStatusError as e:
-                    if e.response.status_code == 404:
-                        
-                        return None
-                    
-                    raise
-
-                return response.json()
+            start = time.perf_counter()
+            response = self.client.get(endpoint, params=params)
+            self.latencies.append(time.perf_counter() - start)
+            return self._handle_response(response)
+        except Exception:
+            self.stats["requests_failed"] += 1
+            raise
 
+    @_retry_policy
+    async def _make_request_async(
+        self,
+        client: httpx.AsyncClient,
+        endpoint: str,
+        params: dict | None = None
+    ) -> dict | None:
+        """Version asynchrone de _make_request (même retry, même contrat)."""
+        await self.rate_limiter.acquire_async()
+        try:
+            start = time.perf_counter()
+            response = await client.get(endpoint, params=params)
+            self.latencies.append(time.perf_counter() - start)
+            return self._handle_response(response)
         except Exception:
             self.stats["requests_failed"] += 1
             raise
 
+    def _handle_response(self, response: httpx.Response) -> dict | None:
+        """Vérifie le statut HTTP et décode le JSON (None si 404)."""
+        self.stats["requests_made"] += 1
+
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+
+        return response.json()
+
     # ==========================================================
     # Rate limiting
     # ==========================================================
 
     def _rate_limit(self):
-        """Respecte le délai entre chaque requête pour éviter le blocage."""
-        time.sleep(self.config.rate_limit)
+        """Respecte le débit autorisé par l'API (seau de jetons)."""
+        self.rate_limiter.acquire()
 
     # ==========================================================
     # Méthodes à implémenter
@@ -99,7 +195,6 @@ class BaseFetcher(ABC):
         results = []
 
         for item in items:
-            self._rate_limit()
             data = self.fetch_one(item=item, **kwargs)
             if data:
                 results.append(data)
@@ -110,7 +205,6 @@ class BaseFetcher(ABC):
     def fetch_all(self, items: list, **kwargs) -> Generator[dict, None, None]:
         """Itère sur tous les éléments fournis."""
         for item in items:
-            self._rate_limit()
             data = self.fetch_one(item=item, **kwargs)
             if data:
                 self.stats["items_fetched"] += 1
@@ -121,4 +215,4 @@ class BaseFetcher(ABC):
     # ==========================================================
 
     def get_stats(self) -> dict:
-        return self.stats.copy()
+        return {**self.stats, "latency_ms": latency_percentiles(self.latencies)}
@@ -1,21 +1,66 @@
 """Fetcher pour l'API geo.api.gouv.fr (communes)."""
 
+from collections import OrderedDict, defaultdict
+from typing import Iterable
+
+import httpx
+
 from .base import BaseFetcher
-from ..config import COMMUNE_CONFIG
+from ..config import APIConfig, COMMUNE_CONFIG, COMMUNE_CACHE_SIZE
 from ..models import CommuneInfo
 
+# Champs demandés lors du chargement groupé par département
+COMMUNE_FIELDS = "nom,code,population,codeDepartement,codeRegion"
+
+
+def departement_from_citycode(citycode: str) -> str:
+    """Déduit le code département d'un code INSEE (DOM-TOM sur 3 caractères)."""
+    if citycode[:2] in {"97", "98"}:
+        return citycode[:3]
+    return citycode[:2]
+
 
 class CommuneFetcher(BaseFetcher):
     """Fetcher pour récupérer les informations d'une commune."""
 
-    def __init__(self):
-        super().__init__(COMMUNE_CONFIG)
+    def __init__(
+        self,
+        transport: httpx.BaseTransport | None = None,
+        async_transport: httpx.AsyncBaseTransport | None = None,
+        cache_size: int = COMMUNE_CACHE_SIZE,
+        config: APIConfig = COMMUNE_CONFIG
+    ):
+        super().__init__(
+            config,
+            transport=transport,
+            async_transport=async_transport
+        )
+        # Cache LRU code INSEE -> CommuneInfo (None = commune inconnue)
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, CommuneInfo | None] = OrderedDict()
+        self.stats.update({"cache_hits": 0, "cache_misses": 0, "prefetched": 0})
+
+    # ==========================================================
+    # Commune unique (avec cache)
+    # ==========================================================
 
     def fetch_one(self, item: str) -> CommuneInfo | None:
         """Récupère les infos d'une commune via son code INSEE."""
         if not item:
             return None
 
+        if item in self._cache:
+            self._cache.move_to_end(item)
+            self.stats["cache_hits"] += 1
+            return self._cache[item]
+
+        self.stats["cache_misses"] += 1
+        commune = self._fetch_remote(item)
+        self._remember(item, commune)
+        return commune
+
+    def _fetch_remote(self, item: str) -> CommuneInfo | None:
+        """Interroge /communes/{code} (sans passer par le cache)."""
         data = self._make_request(
             endpoint=f"/communes/{item}"
         )
@@ -25,9 +70,12 @@ class CommuneFetcher(BaseFetcher):
             return None # Commune non trouvée
 
         # ✅ CAS COMMUNE VALIDE
-         # Retourne un objet CommuneInfo
         self.stats["items_fetched"] += 1
+        return self._to_commune(data)
 
+    @staticmethod
+    def _to_commune(data: dict) -> CommuneInfo:
+        """Convertit la réponse JSON de l'API en CommuneInfo."""
         return CommuneInfo(
             citycode=data["code"],
             nom=data["nom"],
@@ -35,3 +83,52 @@ class CommuneFetcher(BaseFetcher):
             code_departement=data["codeDepartement"],
             code_region=data["codeRegion"],
         )
+
+    def _remember(self, citycode: str, commune: CommuneInfo | None):
+        """Ajoute une entrée au cache en évinçant la moins récemment utilisée."""
+        self._cache[citycode] = commune
+        self._cache.move_to_end(citycode)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # ==========================================================
+    # Préchargement groupé
+    # ==========================================================
+
+    def prefetch(self, citycodes: Iterable[str]) -> int:
+        """
+        Charge en une requête par département toutes les communes demandées.
+        Les codes absents de la réponse seront interrogés un par un par fetch_one.
+        Retourne le nombre de communes mises en cache.
+        """
+        wanted_by_dep: dict[str, set[str]] = defaultdict(set)
+        for code in set(citycodes):
+            if code and code not in self._cache:
+                wanted_by_dep[departement_from_citycode(code)].add(code)
+
+        loaded = 0
+        for dep, wanted in wanted_by_dep.items():
+            data = self._make_request(
+                endpoint="/communes",
+                params={
+                    "codeDepartement": dep,
+                    "type": "commune-actuelle,arrondissement-municipal",
+                    "fields": COMMUNE_FIELDS,
+                }
+            )
+
+            for item in data or []:
+                if item.get("code") in wanted:
+                    self._remember(item["code"], self._to_commune(item))
+                    loaded += 1
+
+        self.stats["prefetched"] += loaded
+        self.stats["items_fetched"] += loaded
+        return loaded
+
+    # ==========================================================
+    # Statistiques
+    # ==========================================================
+
+    def get_stats(self) -> dict:
+        return {**super().get_stats(), "cache_entries": len(self._cache)}
@@ -0,0 +1,58 @@
+"""Limiteur de débit à seau de jetons pour les fetchers GEO."""
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Seau de jetons : autorise `rate` requêtes par seconde
+    avec des rafales de `capacity` requêtes au maximum.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        # rate <= 0 : aucune limitation
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_interval(cls, interval: float, capacity: float = 1.0) -> "TokenBucket":
+        """Construit le seau à partir d'un délai (secondes) entre requêtes."""
+        rate = 1.0 / interval if interval > 0 else 0.0
+        return cls(rate, capacity)
+
+    def _reserve(self) -> float:
+        """
+        Réserve un jeton et retourne le temps d'attente nécessaire.
+        Le solde peut devenir négatif : les appelants suivants attendent
+        d'autant plus, ce qui garantit le débit même en concurrence.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Attend (bloquant) qu'un jeton soit disponible."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Attend (asyncio) qu'un jeton soit disponible."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,60 @@
+"""Mode incrémental : n'enrichir que les adresses nouvelles ou modifiées."""
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+
+from .cache import normalize_query
+from .config import PROCESSED_DIR
+
+
+def fingerprint_address(address: str) -> str:
+    """Empreinte stable d'une adresse (insensible à la casse, aux accents, aux espaces)."""
+    return hashlib.sha1(normalize_query(address).encode("utf-8")).hexdigest()
+
+
+def find_latest_dataset(name: str = "geo_dataset", folder: Path | None = None) -> Path | None:
+    """Retourne le Parquet le plus récent `{name}_<timestamp>.parquet` (ou None)."""
+    # Le timestamp YYYYmmdd_HHMMSS se trie chronologiquement
+    candidates = sorted(Path(folder or PROCESSED_DIR).glob(f"{name}_*.parquet"))
+    return candidates[-1] if candidates else None
+
+
+def select_new_addresses(addresses: list[str], existing: pd.DataFrame) -> list[str]:
+    """
+    Filtre les adresses déjà présentes dans le dataset existant.
+    La comparaison se fait sur la colonne `query` (adresse d'entrée) ;
+    les anciens datasets qui ne l'ont pas sont comparés sur `address`.
+    """
+    key = "query" if "query" in existing.columns else "address"
+    known = {
+        fingerprint_address(value)
+        for value in existing[key].dropna().astype(str)
+    }
+
+    new_addresses = []
+    for address in addresses:
+        fingerprint = fingerprint_address(address or "")
+        if fingerprint not in known:
+            known.add(fingerprint)  # doublons dans l'entrée
+            new_addresses.append(address)
+
+    return new_addresses
+
+
+def upsert_dataset(
+    existing: pd.DataFrame,
+    updates: pd.DataFrame,
+    key: str = "address"
+) -> pd.DataFrame:
+    """Fusionne les nouvelles lignes : une ligne existante de même clé est remplacée."""
+    merged = pd.concat([existing, updates], ignore_index=True)
+    # Des catégories différentes de part et d'autre repassent en objets au concat
+    categorical = [
+        col for col in merged.columns
+        if any(isinstance(df[col].dtype, pd.CategoricalDtype)
+               for df in (existing, updates) if col in df.columns)
+    ]
+    if categorical:
+        merged = merged.astype(dict.fromkeys(categorical, "category"))
+    return merged.drop_duplicates(subset=[key], keep="last").reset_index(drop=True)
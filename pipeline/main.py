@@ -1,85 +1,305 @@
 #!/usr/bin/env python3
 """Script principal du pipeline GEO."""
 import argparse
+import cProfile
+import pstats
+import sys
 from datetime import datetime
-import pandas as pd
+from itertools import islice
+from pathlib import Path
 
-from .enricher import GeoEnricher
+from .cache import open_cache
+from .batch import EnrichedBatch
+from .checkpoint import EnrichmentCheckpoint
+from .enricher import GeoEnricher, GEOCODING_MODES
 from .transformer import DataTransformer
 from .quality import QualityAnalyzer
-from .storage import save_raw_json, save_parquet
-from .config import MAX_ITEMS
+from .incremental import find_latest_dataset, select_new_addresses, upsert_dataset
+from .storage import save_raw, save_dataset, load_parquet, OUTPUT_FORMATS, RAW_FORMATS
+from .store import DatasetStore
+from .streaming import iter_addresses, run_pipeline_geo_streaming
+from .metrics import PipelineMetrics, write_metrics
+from .config import MAX_ITEMS, RAW_FORMAT, REPORTS_DIR, STREAM_CHUNK_SIZE
 
 
 def run_pipeline_geo(
     addresses: list[str],
-    max_items: int = MAX_ITEMS,
+    max_items: int | None = MAX_ITEMS,
     skip_enrichment: bool = False,
-    verbose: bool = True
+    verbose: bool = True,
+    use_cache: bool = True,
+    incremental: bool = False,
+    resume: bool = False,
+    mode: str = "sequential",
+    concurrency: int | None = None,
+    batch_size: int | None = None,
+    cache_dir: str | Path | None = None,
+    output_format: str = "parquet",
+    raw_format: str = RAW_FORMAT,
+    metrics_format: str | None = None
 ) -> dict:
     stats = {"start_time": datetime.now()}
+    timer = PipelineMetrics()
+    log = print if verbose else (lambda *args, **kwargs: None)
+    addresses = addresses[:max_items]
+    existing = None
+    # Sortie "store" : dataset partitionné mis à jour par upsert
+    store = DatasetStore() if output_format == "store" else None
     
-    print("="*60)
-    print("🚀 PIPELINE GEO")
-    print("="*60)
+    log("="*60)
+    log("🚀 PIPELINE GEO")
+    log("="*60)
+
+    # === Mode incrémental : seules les nouvelles adresses sont enrichies ===
+    if incremental:
+        if store is not None:
+            latest = store.root if len(store) else None
+        else:
+            latest = find_latest_dataset("geo_dataset")
+        if latest is not None:
+            with timer.stage("incremental_diff", rows_in=len(addresses)) as stage:
+                if store is not None:
+                    existing = store.read(columns=["address", "query"])
+                else:
+                    existing = load_parquet(latest)
+                new_addresses = select_new_addresses(addresses, existing)
+                stage["rows_out"] = len(new_addresses)
+            stats["incremental"] = {
+                "base_dataset": str(latest),
+                "input_addresses": len(addresses),
+                "new_addresses": len(new_addresses),
+            }
+            log(f"\n♻️ Mode incrémental : {len(new_addresses)}/{len(addresses)} nouvelles adresses")
+            addresses = new_addresses
+
+            if not addresses:
+                log("✅ Aucune nouvelle adresse : dataset inchangé")
+                stats["output_path"] = str(latest)
+                return stats
     
     # === ÉTAPE 1 : Enrichissement GEO ===
+    checkpoint = EnrichmentCheckpoint.for_addresses(addresses)
+    if not resume:
+        checkpoint.clear()
+
     if not skip_enrichment:
-        print("\n🌍 ÉTAPE 1 : Enrichissement (géocodage + commune)")
-        enricher = GeoEnricher()
-        enriched_list = enricher.enrich_addresses(addresses[:max_items])
-        stats["enricher"] = enricher.get_stats()
+        log("\n🌍 ÉTAPE 1 : Enrichissement (géocodage + commune)")
+        cache = open_cache(use_cache, cache_dir)
+        try:
+            with GeoEnricher(
+                mode=mode,
+                concurrency=concurrency,
+                batch_size=batch_size,
+                cache=cache
+            ) as enricher:
+                with timer.stage("enrichment", rows_in=len(addresses)) as stage:
+                    enriched = enricher.enrich_batch(addresses, checkpoint=checkpoint)
+                    stage["rows_out"] = len(enriched)
+                stats["enricher"] = enricher.get_stats()
+                stats["http_latency_ms"] = {
+                    "geocoder": stats["enricher"]["geocoder_stats"]["latency_ms"],
+                    "commune": stats["enricher"]["commune_stats"]["latency_ms"],
+                }
+        finally:
+            if cache is not None:
+                cache.close()
     else:
-        print("⏭️ ÉTAPE 1 : Enrichissement ignoré")
-        enriched_list = []
+        log("⏭️ ÉTAPE 1 : Enrichissement ignoré")
+        enriched = EnrichedBatch()
     
-    if not enriched_list:
-        print("❌ Aucun résultat enrichi. Arrêt.")
+    if not enriched:
+        log("❌ Aucun résultat enrichi. Arrêt.")
+        checkpoint.clear()
         return {"error": "No enriched data"}
     
-    save_raw_json([e.dict() for e in enriched_list], "geo_enriched_raw")
+    # Le dump brut et le DataFrame sont construits depuis les mêmes colonnes
+    with timer.stage("dataframe", rows_in=len(enriched)):
+        df = enriched.to_frame()
+
+    with timer.stage("raw_dump", rows_in=len(df)):
+        save_raw(df, "geo_enriched_raw", raw_format)
     
     # === ÉTAPE 2 : Transformation ===
-    print("\n🔧 ÉTAPE 2 : Transformation et nettoyage")
-    df = pd.DataFrame([e.dict() for e in enriched_list])
-    
-    transformer = DataTransformer(df)
-    df_clean = (
-        transformer
-        .remove_duplicates(subset=["address"])
-        .handle_missing_values(numeric_strategy='median', text_strategy='unknown')
-        .normalize_text_columns(["city", "commune"])
-        .get_result()
-    )
+    log("\n🔧 ÉTAPE 2 : Transformation et nettoyage")
+    with timer.stage("transformation", rows_in=len(df)) as stage:
+        transformer = DataTransformer(df)
+        df_clean = (
+            transformer
+            .remove_duplicates(subset=["address"])
+            .handle_missing_values(numeric_strategy='median', text_strategy='unknown')
+            .normalize_text_columns(["city", "commune"])
+            .get_result()
+        )
+
+        if existing is not None and store is None:
+            # Upsert : les adresses ré-enrichies remplacent les anciennes lignes
+            df_clean = upsert_dataset(existing, df_clean, key="address")
+        stage["rows_out"] = len(df_clean)
     
     stats["transformer"] = {"transformations": transformer.transformations_applied}
     
+    def analyze_quality(analyzer: QualityAnalyzer, rows: int):
+        log("\n📊 ÉTAPE 3 : Analyse de qualité")
+        with timer.stage("quality", rows_in=rows):
+            metrics = analyzer.analyze()
+            analyzer.generate_report("geo_dataset")
+
+        log(f"   Note: {metrics.quality_grade}")
+        log(f"   Complétude: {metrics.completeness_score*100:.1f}%")
+        log(f"   Doublons: {metrics.duplicates_pct:.1f}%")
+
+        stats["quality"] = metrics.dict()
+        return metrics
+
     # === ÉTAPE 3 : Qualité ===
-    print("\n📊 ÉTAPE 3 : Analyse de qualité")
-    analyzer = QualityAnalyzer(df_clean)
-    metrics = analyzer.analyze()
-    
-    print(f"   Note: {metrics.quality_grade}")
-    print(f"   Complétude: {metrics.completeness_score*100:.1f}%")
-    print(f"   Doublons: {metrics.duplicates_pct:.1f}%")
-    
-    analyzer.generate_report("geo_dataset")
-    stats["quality"] = metrics.dict()
+    # Sortie store : l'analyse porte sur le dataset complet, après l'upsert
+    if store is None:
+        metrics = analyze_quality(QualityAnalyzer(df_clean), len(df_clean))
     
     # === ÉTAPE 4 : Stockage final ===
-    print("\n💾 ÉTAPE 4 : Stockage final")
-    output_path = save_parquet(df_clean, "geo_dataset")
+    log("\n💾 ÉTAPE 4 : Stockage final")
+    with timer.stage("storage", rows_in=len(df_clean)):
+        if store is not None:
+            # Seuls les fichiers contenant des adresses ré-enrichies sont réécrits
+            output_path = store.upsert(df_clean, key="address")
+        else:
+            output_path = save_dataset(df_clean, "geo_dataset", output_format)
+            if existing is not None and output_format == "parquet" and output_path != latest:
+                # Le nouveau snapshot contient toutes les lignes de l'ancien : le
+                # garder ferait lire chaque adresse deux fois (dashboard, audits)
+                latest.unlink(missing_ok=True)
+                stats["incremental"]["replaced_dataset"] = str(latest)
     stats["output_path"] = str(output_path)
+    if store is not None:
+        # Analyse avant le compactage : il supprime les fichiers qu'il remplace
+        metrics = analyze_quality(QualityAnalyzer.from_parquet(store.root), len(store))
+        # Fusion des petits fichiers pendant la fin du run (thread non démon)
+        store.compact_in_background()
+    # Run terminé : le point de reprise n'est plus utile
+    checkpoint.clear()
     
     stats["end_time"] = datetime.now()
-    stats["duration_seconds"] = (stats["end_time"] - stats["start_time"]).seconds
+    stats["duration_seconds"] = (stats["end_time"] - stats["start_time"]).total_seconds()
+    stats["rows_out"] = len(df_clean)
+    stats["stages"] = timer.to_dict()
+
+    if metrics_format:
+        stats["metrics_path"] = str(write_metrics(stats, "geo_pipeline_metrics", metrics_format))
     
-    print("\n" + "="*60)
-    print("✅ PIPELINE GEO TERMINÉ")
-    print("="*60)
-    print(f"Durée: {stats['duration_seconds']}s")
-    print(f"Adresses enrichies: {len(df_clean)}")
-    print(f"Qualité: {metrics.quality_grade}")
-    print(f"Fichier: {output_path}")
+    log("\n" + "="*60)
+    log("✅ PIPELINE GEO TERMINÉ")
+    log("="*60)
+    log(f"Durée: {stats['duration_seconds']:.1f}s")
+    for name, stage in stats["stages"].items():
+        log(f"   {name:<16} {stage['wall_seconds']:>8.2f}s  {stage['rows_per_second']:>10.1f} lignes/s")
+    log(f"Adresses enrichies: {len(df_clean)}")
+    log(f"Qualité: {metrics.quality_grade}")
+    log(f"Fichier: {output_path}")
     
     return stats
+
+
+# ==========================================================
+# Ligne de commande : python -m pipeline
+# ==========================================================
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m pipeline",
+        description="Pipeline GEO : géocodage, enrichissement communes, qualité et stockage."
+    )
+    parser.add_argument("input", type=Path, help="Fichier d'adresses (CSV avec colonne 'address' ou texte)")
+    parser.add_argument(
+        "--max-items", type=int,
+        help="Nombre max d'adresses traitées (défaut : tout le fichier)"
+    )
+    parser.add_argument(
+        "--mode", choices=GEOCODING_MODES, default="sequential",
+        help="Mode de géocodage"
+    )
+    parser.add_argument("--concurrency", type=int, help="Requêtes simultanées (mode async)")
+    parser.add_argument("--batch-size", type=int, help="Adresses par envoi CSV (mode bulk)")
+    parser.add_argument("--cache-dir", type=Path, help="Dossier du cache de géocodage")
+    parser.add_argument("--no-cache", action="store_true", help="Désactive le cache de géocodage")
+    parser.add_argument("--incremental", action="store_true", help="N'enrichit que les nouvelles adresses")
+    parser.add_argument("--resume", action="store_true", help="Reprend au dernier point de reprise")
+    parser.add_argument("--stream", action="store_true", help="Traitement par lots à mémoire bornée")
+    parser.add_argument("--chunk-size", type=int, default=STREAM_CHUNK_SIZE, help="Taille des lots (--stream)")
+    parser.add_argument(
+        "--output-format", choices=[*OUTPUT_FORMATS, "store"], default="parquet",
+        help="Format du dataset final (store : dataset partitionné par département)"
+    )
+    parser.add_argument(
+        "--raw-format", choices=["json", *RAW_FORMATS], default=RAW_FORMAT,
+        help="Format du dump brut des adresses enrichies"
+    )
+    parser.add_argument("--profile", action="store_true", help="Profile l'exécution (cProfile)")
+    parser.add_argument(
+        "--metrics-format", choices=["json", "prometheus"],
+        help="Écrit les métriques du run dans data/reports"
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # Options propres à un mode de géocodage : refusées ailleurs plutôt qu'ignorées
+    if args.concurrency is not None and args.mode != "async":
+        parser.error("--concurrency ne s'applique qu'au mode async (--mode async)")
+    if args.batch_size is not None and args.mode != "bulk":
+        parser.error("--batch-size ne s'applique qu'au mode bulk (--mode bulk)")
+    if args.stream and (args.incremental or args.resume or args.output_format != "parquet"):
+        parser.error("--stream n'accepte ni --incremental, ni --resume, ni --output-format autre que parquet")
+    if args.stream and args.raw_format not in RAW_FORMATS:
+        # Le dump brut est écrit lot par lot : le JSON indenté n'est pas extensible
+        parser.error(f"--stream écrit le dump brut lot par lot : --raw-format parmi {list(RAW_FORMATS)}")
+
+    if args.stream:
+        def run() -> dict:
+            return run_pipeline_geo_streaming(
+                args.input,
+                chunk_size=args.chunk_size,
+                max_items=args.max_items,
+                mode=args.mode,
+                concurrency=args.concurrency,
+                batch_size=args.batch_size,
+                use_cache=not args.no_cache,
+                cache_dir=args.cache_dir,
+                raw_format=args.raw_format,
+                metrics_format=args.metrics_format,
+            )
+    else:
+        def run() -> dict:
+            addresses = list(islice(iter_addresses(args.input), args.max_items))
+            return run_pipeline_geo(
+                addresses,
+                max_items=args.max_items,
+                use_cache=not args.no_cache,
+                incremental=args.incremental,
+                resume=args.resume,
+                mode=args.mode,
+                concurrency=args.concurrency,
+                batch_size=args.batch_size,
+                cache_dir=args.cache_dir,
+                output_format=args.output_format,
+                raw_format=args.raw_format,
+                metrics_format=args.metrics_format,
+            )
+
+    if not args.profile:
+        stats = run()
+    else:
+        profiler = cProfile.Profile()
+        stats = profiler.runcall(run)
+        profile_path = REPORTS_DIR / f"profile_{datetime.now():%Y%m%d_%H%M%S}.prof"
+        profiler.dump_stats(profile_path)
+        print(f"\n⏱️ Profil: {profile_path}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+    return 1 if "error" in stats else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
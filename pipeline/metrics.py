@@ -0,0 +1,156 @@
+"""Instrumentation du pipeline GEO : temps, débit, mémoire et latences HTTP."""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from .config import REPORTS_DIR
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float | None:
+    """
+    Pic de mémoire résidente du processus depuis son démarrage (Mo), None si
+    indisponible. La valeur ne redescend jamais : ce n'est pas la
+    consommation d'une étape.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss est en octets sous macOS, en kilo-octets sous Linux
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().peak_wset / 1024 / 1024
+
+
+def latency_percentiles(samples: Iterable[float]) -> dict:
+    """Percentiles de latence (ms) d'une série de durées en secondes."""
+    values = np.fromiter(samples, dtype=float) * 1000
+    if not len(values):
+        return {"count": 0}
+
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(len(values)),
+        "mean": round(float(values.mean()), 2),
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "max": round(float(values.max()), 2),
+    }
+
+
+# ==========================================================
+# Mesure par étape
+# ==========================================================
+
+class PipelineMetrics:
+    """
+    Temps mur, temps CPU, lignes et débit de chaque étape du pipeline,
+    plus le pic mémoire du processus atteint à la fin de l'étape
+    (`process_peak_rss_mb`, cumulé depuis le démarrage du processus).
+    """
+
+    def __init__(self):
+        self.stages: dict[str, dict] = {}
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = 0) -> Iterator[dict]:
+        """
+        Mesure un bloc de code. Le dict produit permet de renseigner
+        `rows_out` ; une étape répétée (lots) cumule ses mesures.
+        """
+        current = {"rows_out": rows_in}
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        try:
+            yield current
+        finally:
+            entry = self.stages.setdefault(name, {
+                "wall_seconds": 0.0,
+                "cpu_seconds": 0.0,
+                "rows_in": 0,
+                "rows_out": 0,
+            })
+            entry["wall_seconds"] += time.perf_counter() - wall_start
+            entry["cpu_seconds"] += time.process_time() - cpu_start
+            entry["rows_in"] += rows_in
+            entry["rows_out"] += current["rows_out"]
+            entry["rows_per_second"] = (
+                entry["rows_in"] / entry["wall_seconds"] if entry["wall_seconds"] else 0.0
+            )
+            entry["process_peak_rss_mb"] = peak_rss_mb()
+
+    def to_dict(self) -> dict:
+        return {
+            name: {k: round(v, 4) if isinstance(v, float) else v for k, v in entry.items()}
+            for name, entry in self.stages.items()
+        }
+
+
+# ==========================================================
+# Export (JSON / Prometheus textfile)
+# ==========================================================
+
+def to_prometheus(stats: dict, prefix: str = "geo_pipeline") -> str:
+    """Convertit les statistiques d'un run au format textfile de Prometheus."""
+    lines = []
+
+    for stage, entry in stats.get("stages", {}).items():
+        for key, value in entry.items():
+            if isinstance(value, (int, float)):
+                lines.append(f'{prefix}_stage_{key}{{stage="{stage}"}} {value}')
+
+    for fetcher, latency in stats.get("http_latency_ms", {}).items():
+        for key, value in latency.items():
+            if key == "count":
+                lines.append(f'{prefix}_http_requests_total{{fetcher="{fetcher}"}} {value}')
+            else:
+                lines.append(f'{prefix}_http_latency_ms{{fetcher="{fetcher}",stat="{key}"}} {value}')
+
+    for key in ("duration_seconds", "rows_out"):
+        if key in stats:
+            lines.append(f"{prefix}_{key} {stats[key]}")
+
+    for key, value in stats.get("quality", {}).items():
+        if isinstance(value, (int, float)):
+            lines.append(f"{prefix}_quality_{key} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(stats: dict, name: str = "geo_pipeline_metrics", fmt: str = "json") -> Path:
+    """
+    Écrit les métriques d'un run dans REPORTS_DIR.
+    - json : un fichier horodaté par run (historique)
+    - prometheus : `{name}.prom` remplacé à chaque run, comme l'attend le
+      collecteur textfile de node_exporter
+    """
+    if fmt == "json":
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = REPORTS_DIR / f"{name}_{timestamp}.json"
+        path.write_text(json.dumps(stats, indent=2, default=str), encoding="utf-8")
+    elif fmt == "prometheus":
+        path = REPORTS_DIR / f"{name}.prom"
+        # Écriture atomique : le collecteur ne lit jamais un fichier à moitié écrit
+        tmp_path = path.with_suffix(".prom.tmp")
+        tmp_path.write_text(to_prometheus(stats), encoding="utf-8")
+        os.replace(tmp_path, path)
+    else:
+        raise ValueError(f"Format de métriques inconnu : {fmt} (attendu : json, prometheus)")
+
+    return path
@@ -1,5 +1,6 @@
 """Modèles de données avec validation pour le pipeline GEO."""
 
+from dataclasses import dataclass, fields
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
@@ -33,6 +34,46 @@ class GeocodingResult(BaseModel):
         )
 
 
+@dataclass(slots=True)
+class GeocodingRecord:
+    """
+    Version légère de GeocodingResult pour la boucle géocodage/enrichissement
+    (un objet par adresse) : pas de validation ni d'horodatage par objet.
+    Les valeurs sont typées à la lecture de la réponse API et validées en
+    bloc par EnrichedBatch ; to_model() redonne le modèle pydantic.
+    """
+
+    query: str
+    label: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    score: float = 0.0
+    city: Optional[str] = None
+    postcode: Optional[str] = None
+    citycode: Optional[str] = None
+    fetched_at: Optional[datetime] = None   # renseigné par lot, pas par adresse
+
+    @property
+    def is_valid(self) -> bool:
+        """Mêmes critères que GeocodingResult.is_valid."""
+        return (
+            self.score >= 0.5
+            and self.latitude is not None
+            and self.longitude is not None
+            and self.citycode is not None
+        )
+
+    def to_model(self) -> GeocodingResult:
+        values = {f.name: getattr(self, f.name) for f in fields(self)}
+        if values["fetched_at"] is None:
+            del values["fetched_at"]
+        return GeocodingResult(**values)
+
+    @classmethod
+    def from_model(cls, model: GeocodingResult) -> "GeocodingRecord":
+        return cls(**{f.name: getattr(model, f.name) for f in fields(cls)})
+
+
 # ==========================================================
 # Données commune (geo.api.gouv.fr)
 # ==========================================================
@@ -63,6 +104,7 @@ class EnrichedAddress(BaseModel):
     citycode: str
     commune: str
     population: int
+    query: Optional[str] = None          # adresse d'entrée (clé du mode incrémental)
     fetched_at: datetime = Field(default_factory=datetime.now)
 
 
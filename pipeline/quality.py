@@ -1,19 +1,168 @@
 """Module d'analyse et scoring de la qualité des données GEO."""
 
+import duckdb
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from datetime import datetime
 from pathlib import Path
-
-from .config import QUALITY_THRESHOLDS, REPORTS_DIR
+from typing import Iterable
+
+from .config import (
+    QUALITY_THRESHOLDS,
+    QUALITY_DUPLICATE_SKETCH,
+    QUALITY_SKETCH_ERROR,
+    REPORTS_DIR,
+    PROCESSED_DIR,
+)
 from .models import QualityMetrics
+from .store import DatasetStore
+
+
+# ==========================================================
+# Agrégation en un seul passage (DuckDB)
+# ==========================================================
+
+def quote_identifier(column: str) -> str:
+    """Échappe un nom de colonne pour une requête DuckDB."""
+    return '"' + str(column).replace('"', '""') + '"'
+
+
+def is_arrow_backed(dtype) -> bool:
+    return isinstance(dtype, pd.ArrowDtype) or (
+        isinstance(dtype, pd.StringDtype) and dtype.storage == "pyarrow"
+    )
+
+
+def duckdb_source(df: pd.DataFrame):
+    """
+    Objet à enregistrer dans DuckDB pour `df` : un DataFrame à colonnes
+    Arrow (string[pyarrow]) est passé en table Arrow, lue sans conversion.
+    """
+    if any(is_arrow_backed(dtype) for dtype in df.dtypes):
+        return pa.Table.from_pandas(df, preserve_index=False)
+    return df
+
+
+def quality_summary(
+    con: duckdb.DuckDBPyConnection,
+    source: str,
+    columns: list[str],
+    params: dict | None = None
+) -> dict:
+    """
+    Calcule en une seule requête tous les comptages de QualityMetrics :
+    valeurs non nulles par colonne, adresses distinctes et scores valides.
+    `source` est une table ou une expression FROM (ex. read_parquet($files)),
+    dont les paramètres sont passés dans `params`.
+    """
+    selects = ["count(*)"] + [f"count({quote_identifier(c)})" for c in columns]
+
+    if "address" in columns:
+        # Comme pandas.duplicated, les adresses nulles comptent pour une valeur
+        selects.append("count(DISTINCT address) + (count(*) > count(address))::INTEGER")
+    if "score" in columns:
+        selects.append("count(*) FILTER (WHERE score >= $score_min)")
+        selects.append("avg(score) FILTER (WHERE score >= $score_min)")
+
+    params = dict(params or {})
+    if "score" in columns:
+        params["score_min"] = QUALITY_THRESHOLDS["geocoding_score_min"]
+    row = list(con.execute(f"SELECT {', '.join(selects)} FROM {source}", params).fetchone())
+
+    total = row.pop(0)
+    non_null = {col: row.pop(0) for col in columns}
+    distinct = row.pop(0) if "address" in columns else total
+    valid_scores, avg_score = (row.pop(0), row.pop(0)) if "score" in columns else (0, None)
+
+    return {
+        "total_records": total,
+        "non_null": non_null,
+        "duplicates": total - distinct if "address" in columns else 0,
+        "valid_scores": valid_scores,
+        "avg_score": avg_score or 0.0,
+    }
+
+
+def resolve_parquet_files(paths: str | Path | list[str | Path]) -> list[str]:
+    """Liste les fichiers Parquet désignés (fichiers, dossiers ou motifs glob)."""
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+
+    files = []
+    for path in map(Path, paths):
+        if DatasetStore.is_store(path):
+            files.extend(map(Path, DatasetStore(path).files()))
+        elif path.is_dir():
+            files.extend(sorted(path.glob("*.parquet")))
+        elif any(c in path.name for c in "*?["):
+            files.extend(sorted(path.parent.glob(path.name)))
+        elif path.exists():
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"Parquet introuvable : {path}")
+
+    if not files:
+        raise FileNotFoundError(f"Aucun fichier Parquet dans : {paths}")
+    return [f.as_posix() for f in files]
 
 
 class QualityAnalyzer:
     """Analyse la qualité d'un dataset GEO."""
 
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame | None = None):
         self.df = df
+        self.parquet_files: list[str] = []
         self.metrics: QualityMetrics | None = None
+        self._summary: dict | None = None
+
+    @classmethod
+    def from_parquet(
+        cls,
+        paths: str | Path | list[str | Path] | None = None
+    ) -> "QualityAnalyzer":
+        """
+        Analyse un ou plusieurs Parquet sans les charger en pandas :
+        DuckDB agrège les row groups à la volée (mémoire indépendante
+        de la taille des fichiers).
+        """
+        analyzer = cls()
+        analyzer.parquet_files = resolve_parquet_files(paths or PROCESSED_DIR)
+        return analyzer
+
+    def summary(self) -> dict:
+        """Comptages du dataset, calculés en un seul passage puis réutilisés."""
+        if self._summary is None:
+            with duckdb.connect() as con:
+                if self.parquet_files:
+                    self._summary = self._summarize_parquet(con)
+                else:
+                    self._summary = self._summarize_frame(con)
+        return self._summary
+
+    def _summarize_frame(self, con: duckdb.DuckDBPyConnection) -> dict:
+        columns = [str(c) for c in self.df.columns]
+        if not columns:
+            return {
+                "total_records": len(self.df),
+                "non_null": {},
+                "duplicates": 0,
+                "valid_scores": 0,
+                "avg_score": 0.0,
+            }
+
+        # Scan direct du DataFrame par DuckDB (pas de copie pandas)
+        con.register("dataset", duckdb_source(self.df))
+        return quality_summary(con, "dataset", columns)
+
+    def _summarize_parquet(self, con: duckdb.DuckDBPyConnection) -> dict:
+        # Schémas fusionnés par nom : les anciens fichiers peuvent avoir moins de colonnes
+        source = "read_parquet($files, union_by_name = true)"
+        params = {"files": self.parquet_files}
+        columns = [
+            row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}", params).fetchall()
+        ]
+        return quality_summary(con, source, columns, params)
 
     # ==========================================================
     # Métriques
@@ -21,39 +170,46 @@ class QualityAnalyzer:
 
     def calculate_completeness(self) -> float:
         """Calcule le pourcentage de cellules non-null."""
-        total_cells = self.df.size
-        non_null = self.df.notna().sum().sum()
+        summary = self.summary()
+        total_cells = summary["total_records"] * len(summary["non_null"])
+        non_null = sum(summary["non_null"].values())
         return non_null / total_cells if total_cells else 0
 
     def count_duplicates(self) -> tuple[int, float]:
         """Compte les doublons par adresse."""
-        if "address" not in self.df.columns:
+        summary = self.summary()
+        if "address" not in summary["non_null"]:
             return 0, 0.0
 
-        duplicates = self.df.duplicated(subset=["address"]).sum()
-        pct = duplicates / len(self.df) * 100 if len(self.df) else 0
+        duplicates = summary["duplicates"]
+        total = summary["total_records"]
+        pct = duplicates / total * 100 if total else 0
         return duplicates, pct
 
     def calculate_geocoding_stats(self) -> tuple[float, float]:
         """Calcule le taux de géocodage et score moyen."""
-        if "score" not in self.df.columns:
+        summary = self.summary()
+        if "score" not in summary["non_null"]:
             return 0.0, 0.0
 
-        valid = self.df["score"] >= QUALITY_THRESHOLDS["geocoding_score_min"]
-        success_rate = valid.sum() / len(self.df) * 100 if len(self.df) else 0
-        avg_score = self.df.loc[valid, "score"].mean() if valid.any() else 0
-
-        return success_rate, avg_score
+        total = summary["total_records"]
+        success_rate = summary["valid_scores"] / total * 100 if total else 0
+        return success_rate, summary["avg_score"]
 
     def calculate_null_counts(self) -> dict:
         """Compte les valeurs nulles par colonne."""
-        return self.df.isnull().sum().to_dict()
+        summary = self.summary()
+        return {
+            col: summary["total_records"] - count
+            for col, count in summary["non_null"].items()
+        }
 
     # ==========================================================
     # Scoring
     # ==========================================================
 
-    def determine_grade(self, completeness, duplicates_pct, geo_rate) -> str:
+    @staticmethod
+    def determine_grade(completeness, duplicates_pct, geo_rate) -> str:
         """Détermine la note finale selon les seuils définis."""
         score = 0
 
@@ -92,9 +248,10 @@ class QualityAnalyzer:
 
         grade = self.determine_grade(completeness, duplicates_pct, geo_rate)
 
+        total = self.summary()["total_records"]
         self.metrics = QualityMetrics(
-            total_records=len(self.df),
-            valid_records=len(self.df) - duplicates,
+            total_records=total,
+            valid_records=total - duplicates,
             completeness_score=round(completeness, 3),
             duplicates_count=duplicates,
             duplicates_pct=round(duplicates_pct, 2),
@@ -115,24 +272,226 @@ class QualityAnalyzer:
         if not self.metrics:
             self.analyze()
 
-        report = f"""# Rapport de Qualité des Données GEO
+        return write_quality_report(self.metrics, name)
+
+
+def write_quality_report(metrics: QualityMetrics, name: str = "geo_quality_report") -> Path:
+    """Écrit le rapport Markdown d'un objet QualityMetrics."""
+    report = f"""# Rapport de Qualité des Données GEO
 
 **Date** : {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ## Résumé
-- Total lignes : {self.metrics.total_records}
-- Complétude : {self.metrics.completeness_score * 100:.1f}%
-- Doublons : {self.metrics.duplicates_pct:.1f}%
-- Succès géocodage : {self.metrics.geocoding_success_rate:.1f}%
-- Note globale : **{self.metrics.quality_grade}**
+- Total lignes : {metrics.total_records}
+- Complétude : {metrics.completeness_score * 100:.1f}%
+- Doublons : {metrics.duplicates_pct:.1f}%
+- Succès géocodage : {metrics.geocoding_success_rate:.1f}%
+- Note globale : **{metrics.quality_grade}**
 
 ## Valeurs nulles
 """
 
-        for col, cnt in self.metrics.null_counts.items():
-            report += f"- {col}: {cnt}\n"
+    for col, cnt in metrics.null_counts.items():
+        report += f"- {col}: {cnt}\n"
+
+    path = REPORTS_DIR / f"{name}_{datetime.now():%Y%m%d_%H%M%S}.md"
+    path.write_text(report, encoding="utf-8")
+
+    return path
+
+
+# ==========================================================
+# Esquisses de cardinalité (détection des doublons)
+# ==========================================================
+
+class ExactSketch:
+    """Ensemble exact des empreintes 64 bits (mémoire proportionnelle aux distincts)."""
+
+    kind = "exact"
+
+    def __init__(self):
+        self.hashes: set[int] = set()
+
+    def add(self, hashes: np.ndarray):
+        self.hashes.update(hashes.tolist())
+
+    def merge(self, other: "ExactSketch"):
+        self.hashes |= other.hashes
+
+    def count(self) -> int:
+        return len(self.hashes)
+
+    def compatible(self, other) -> bool:
+        return isinstance(other, ExactSketch)
+
+
+class HyperLogLog:
+    """
+    Estimateur HyperLogLog : mémoire fixe (2**precision octets) et erreur
+    relative type d'environ 1.04 / sqrt(2**precision).
+    """
+
+    kind = "hll"
+
+    def __init__(self, error: float = 0.01):
+        if not 0 < error < 1:
+            raise ValueError(f"Erreur HyperLogLog invalide : {error}")
+        self.precision = min(18, max(4, int(np.ceil(np.log2((1.04 / error) ** 2)))))
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # Rang = position du premier bit à 1 dans les 64 - p bits restants
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = (64 - p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Petites cardinalités : comptage linéaire, plus précis
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def compatible(self, other) -> bool:
+        return isinstance(other, HyperLogLog) and other.precision == self.precision
+
+
+DUPLICATE_SKETCHES = {
+    "exact": lambda error: ExactSketch(),
+    "hll": HyperLogLog,
+}
+
+
+# ==========================================================
+# Accumulation incrémentale (lots, workers parallèles)
+# ==========================================================
+
+class QualityAccumulator:
+    """
+    Calcule les mêmes métriques que QualityAnalyzer, lot par lot,
+    sans conserver les données (seule une esquisse des adresses est gardée).
+    Des accumulateurs partiels (lots, workers) se fusionnent avec merge() / +,
+    dans n'importe quel ordre.
+    """
+
+    def __init__(
+        self,
+        duplicate_sketch: str = QUALITY_DUPLICATE_SKETCH,
+        sketch_error: float = QUALITY_SKETCH_ERROR
+    ):
+        if duplicate_sketch not in DUPLICATE_SKETCHES:
+            raise ValueError(
+                f"Esquisse inconnue : {duplicate_sketch} (attendu : {list(DUPLICATE_SKETCHES)})"
+            )
+        self.duplicate_sketch = duplicate_sketch
+        self.sketch_error = sketch_error
+        self.total_records = 0
+        self.total_cells = 0
+        self.non_null_cells = 0
+        self.null_counts: dict[str, int] = {}
+        self.address_records = 0
+        self.valid_scores = 0
+        self.valid_score_sum = 0.0
+        self.sketch = DUPLICATE_SKETCHES[duplicate_sketch](sketch_error)
+
+    def update(self, df: pd.DataFrame) -> "QualityAccumulator":
+        """Intègre un lot de lignes aux métriques."""
+        self.total_records += len(df)
+        self.total_cells += df.size
+
+        nulls = df.isnull().sum()
+        self.non_null_cells += int(df.size - nulls.sum())
+        for col, cnt in nulls.items():
+            self.null_counts[col] = self.null_counts.get(col, 0) + int(cnt)
+
+        if "address" in df.columns:
+            self.address_records += len(df)
+            self.sketch.add(
+                pd.util.hash_pandas_object(df["address"], index=False).to_numpy()
+            )
+
+        if "score" in df.columns:
+            scores = df["score"].to_numpy(dtype=float, na_value=np.nan)
+            valid = scores >= QUALITY_THRESHOLDS["geocoding_score_min"]
+            self.valid_scores += int(valid.sum())
+            self.valid_score_sum += float(scores[valid].sum())
+
+        return self
+
+    # ==========================================================
+    # Fusion
+    # ==========================================================
+
+    def merge(self, other: "QualityAccumulator") -> "QualityAccumulator":
+        """Intègre (sur place) les métriques partielles d'un autre accumulateur."""
+        if not self.sketch.compatible(other.sketch):
+            raise ValueError("Accumulateurs incompatibles : esquisses de doublons différentes")
+
+        self.total_records += other.total_records
+        self.total_cells += other.total_cells
+        self.non_null_cells += other.non_null_cells
+        for col, cnt in other.null_counts.items():
+            self.null_counts[col] = self.null_counts.get(col, 0) + cnt
+        self.address_records += other.address_records
+        self.valid_scores += other.valid_scores
+        self.valid_score_sum += other.valid_score_sum
+        self.sketch.merge(other.sketch)
+        return self
+
+    def __add__(self, other: "QualityAccumulator") -> "QualityAccumulator":
+        return QualityAccumulator(self.duplicate_sketch, self.sketch_error).merge(self).merge(other)
+
+    @classmethod
+    def combine(cls, parts: Iterable["QualityAccumulator"]) -> "QualityAccumulator":
+        """Fusionne des accumulateurs partiels en un seul."""
+        parts = list(parts)
+        if not parts:
+            return cls()
+        result = cls(parts[0].duplicate_sketch, parts[0].sketch_error)
+        for part in parts:
+            result.merge(part)
+        return result
 
-        path = REPORTS_DIR / f"{name}_{datetime.now():%Y%m%d_%H%M%S}.md"
-        path.write_text(report, encoding="utf-8")
+    # ==========================================================
+    # Métriques finales
+    # ==========================================================
 
-        return path
+    @property
+    def duplicates(self) -> int:
+        """Nombre de doublons d'adresse (estimé si l'esquisse est HyperLogLog)."""
+        if not self.address_records:
+            return 0
+        return max(0, self.address_records - min(self.sketch.count(), self.address_records))
+
+    def to_metrics(self) -> QualityMetrics:
+        """Construit l'objet QualityMetrics final."""
+        n = self.total_records
+        duplicates = self.duplicates
+        completeness = self.non_null_cells / self.total_cells if self.total_cells else 0
+        duplicates_pct = duplicates / n * 100 if n else 0
+        geo_rate = self.valid_scores / n * 100 if n else 0
+        geo_avg = self.valid_score_sum / self.valid_scores if self.valid_scores else 0
+
+        return QualityMetrics(
+            total_records=n,
+            valid_records=n - duplicates,
+            completeness_score=round(completeness, 3),
+            duplicates_count=duplicates,
+            duplicates_pct=round(duplicates_pct, 2),
+            geocoding_success_rate=round(geo_rate, 2),
+            avg_geocoding_score=round(geo_avg, 3),
+            null_counts=dict(self.null_counts),
+            quality_grade=QualityAnalyzer.determine_grade(
+                completeness, duplicates_pct, geo_rate
+            ),
+        )
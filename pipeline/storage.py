@@ -1,29 +1,283 @@
 """Module de stockage des données GEO."""
 import json
+import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.json as pj
+import pyarrow.parquet as pq
 from datetime import datetime
 from pathlib import Path
+from typing import Iterator
 
-from .config import RAW_DIR, PROCESSED_DIR
+from .config import RAW_DIR, PROCESSED_DIR, RAW_FORMAT, RAW_CHUNK_ROWS
 
+# Colonnes très répétitives (quelques milliers de communes) : catégories en
+# mémoire, colonnes dictionnaire en Arrow/Parquet
+CATEGORICAL_COLUMNS = ["city", "postcode", "citycode", "commune"]
 
-def save_raw_json(data: list[dict], name: str) -> Path:
-    """Sauvegarde les données brutes en JSON."""
+_DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+
+# Schéma fixe du dataset GEO final (colonnes issues d'EnrichedAddress)
+GEO_DATASET_SCHEMA = pa.schema([
+    ("address", pa.string()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("score", pa.float64()),
+    ("city", _DICTIONARY),
+    ("postcode", _DICTIONARY),
+    ("citycode", _DICTIONARY),
+    ("commune", _DICTIONARY),
+    ("population", pa.int64()),
+    ("query", pa.string()),
+    ("fetched_at", pa.timestamp("us")),
+])
+
+# Types pandas correspondants : chaînes Arrow (pas d'objets Python) et catégories
+GEO_DATASET_DTYPES = {
+    "address": pd.StringDtype("pyarrow"),
+    "latitude": "float64",
+    "longitude": "float64",
+    "score": "float64",
+    **{col: "category" for col in CATEGORICAL_COLUMNS},
+    "population": "int64",
+    "query": pd.StringDtype("pyarrow"),
+    "fetched_at": "datetime64[us]",
+}
+
+
+def apply_geo_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Convertit les colonnes connues du dataset GEO vers GEO_DATASET_DTYPES."""
+    dtypes = {col: dtype for col, dtype in GEO_DATASET_DTYPES.items() if col in df.columns}
+    # population peut contenir des nulls (lignes fusionnées, fichiers anciens)
+    if "population" in dtypes and df["population"].isna().any():
+        dtypes["population"] = "float64"
+    return df.astype(dtypes)
+
+
+def to_geo_frame(records: list[dict]) -> pd.DataFrame:
+    """DataFrame au schéma fixe du dataset GEO à partir d'EnrichedAddress.dict()."""
+    df = pd.DataFrame.from_records(records, columns=GEO_DATASET_SCHEMA.names)
+    return apply_geo_dtypes(df)
+
+
+def arrow_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    Table Arrow → pandas sans repasser par des objets Python : chaînes en
+    string[pyarrow], colonnes dictionnaire en catégories.
+    """
+    return table.to_pandas(types_mapper={
+        pa.string(): pd.StringDtype("pyarrow"),
+        pa.large_string(): pd.StringDtype("pyarrow"),
+    }.get)
+
+
+def save_raw_json(
+    data: list[dict] | pd.DataFrame,
+    name: str,
+    folder: Path | None = None
+) -> Path:
+    """
+    Sauvegarde les données brutes en JSON (liste d'objets). Un DataFrame est
+    sérialisé directement par colonnes, sans dict intermédiaire par ligne.
+    """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = RAW_DIR / f"{name}_{timestamp}.json"
+    filepath = Path(folder or RAW_DIR) / f"{name}_{timestamp}.json"
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    if isinstance(data, pd.DataFrame):
+        data.to_json(
+            filepath, orient="records", force_ascii=False, indent=2,
+            date_format="iso", date_unit="us"
+        )
+    else:
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
 
     size_kb = filepath.stat().st_size / 1024
     print(f"   💾 Brut: {filepath.name} ({size_kb:.1f} KB)")
     return filepath
 
 
-def save_parquet(df: pd.DataFrame, name: str) -> Path:
-    """Sauvegarde le DataFrame en Parquet."""
+# ==========================================================
+# Dumps bruts : NDJSON compressé ou flux Arrow IPC
+# ==========================================================
+
+# Format → compression du flux (le nom du format sert d'extension)
+RAW_FORMATS = {
+    "ndjson": None,
+    "ndjson.gz": "gzip",
+    "ndjson.zst": "zstd",
+    "arrow": None,
+}
+
+
+def raw_format_of(path: str | Path) -> str:
+    """Format d'un dump brut d'après son extension (json compris)."""
+    name = Path(path).name
+    for raw_format in ["json", *RAW_FORMATS]:
+        if name.endswith(f".{raw_format}"):
+            return raw_format
+    raise ValueError(f"Format de dump brut inconnu : {name}")
+
+
+class RawWriter:
+    """
+    Dump brut écrit lot par lot : NDJSON (éventuellement compressé gzip ou
+    zstd) ou flux Arrow IPC, rechargé sans copie par memory map. Comme pour
+    ParquetChunkWriter, le fichier ne prend son nom final qu'à la fermeture.
+    """
+
+    def __init__(self, name: str, raw_format: str = RAW_FORMAT, folder: Path | None = None):
+        if raw_format not in RAW_FORMATS:
+            raise ValueError(
+                f"Format de dump brut inconnu : {raw_format} (attendu : {list(RAW_FORMATS)})"
+            )
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.raw_format = raw_format
+        self.filepath = Path(folder or RAW_DIR) / f"{name}_{timestamp}.{raw_format}"
+        self._tmp_path = self.filepath.with_name(self.filepath.name + ".tmp")
+        self._sink = pa.output_stream(str(self._tmp_path), compression=RAW_FORMATS[raw_format])
+        self._ipc_writer = None
+        self._schema: pa.Schema | None = None
+        self.rows_written = 0
+        self.closed = False
+
+    def write(self, df: pd.DataFrame):
+        """Ajoute un lot au dump."""
+        if self.raw_format == "arrow":
+            self._write_arrow(df)
+        else:
+            for start in range(0, len(df), RAW_CHUNK_ROWS):
+                lines = df.iloc[start:start + RAW_CHUNK_ROWS].to_json(
+                    orient="records", lines=True, force_ascii=False,
+                    date_format="iso", date_unit="us"
+                )
+                self._sink.write(lines.encode("utf-8"))
+        self.rows_written += len(df)
+
+    def _write_arrow(self, df: pd.DataFrame):
+        if self._ipc_writer is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            # Index int32 pour toutes les catégories : un lot suivant peut en avoir plus
+            self._schema = pa.schema([
+                field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                if pa.types.is_dictionary(field.type) else field
+                for field in schema
+            ])
+            # Flux IPC plutôt que fichier : les dictionnaires peuvent changer entre lots
+            self._ipc_writer = pa.ipc.new_stream(self._sink, self._schema)
+        self._ipc_writer.write_table(
+            pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        )
+
+    def close(self) -> Path:
+        """Finalise le dump et le renomme sous son nom définitif."""
+        if self._ipc_writer is not None:
+            self._ipc_writer.close()
+        self._sink.close()
+        self.closed = True
+        os.replace(self._tmp_path, self.filepath)
+
+        size_kb = self.filepath.stat().st_size / 1024
+        print(f"   💾 Brut: {self.filepath.name} ({size_kb:.1f} KB)")
+        return self.filepath
+
+    def abort(self):
+        """Abandonne l'écriture et supprime le dump partiel."""
+        self._sink.close()
+        self.closed = True
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.closed:
+            return
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def save_raw(
+    df: pd.DataFrame,
+    name: str,
+    raw_format: str = RAW_FORMAT,
+    folder: Path | None = None
+) -> Path:
+    """Sauvegarde le dump brut dans le format demandé (« json » : JSON indenté)."""
+    if raw_format == "json":
+        return save_raw_json(df, name, folder)
+
+    with RawWriter(name, raw_format, folder) as writer:
+        writer.write(df)
+    return writer.filepath
+
+
+def _ndjson_schema(path: Path, compression: str | None) -> pa.Schema | None:
+    """Types GEO des colonnes présentes dans la première ligne (None si dump vide)."""
+    first = b""
+    with pa.input_stream(str(path), compression=compression) as f:
+        while b"\n" not in first and (block := f.read(1 << 16)):
+            first += block
+    first = first.split(b"\n", 1)[0]
+    if not first.strip():
+        return None
+
+    keys = json.loads(first)
+    return pa.schema([
+        (field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+        for field in GEO_DATASET_SCHEMA if field.name in keys
+    ])
+
+
+def iter_raw_batches(path: str | Path) -> Iterator[pa.RecordBatch]:
+    """Relit un dump brut par lots Arrow (mémoire bornée pour NDJSON et Arrow IPC)."""
+    path = Path(path)
+    raw_format = raw_format_of(path)
+
+    if raw_format == "json":
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        if records:
+            yield pa.RecordBatch.from_pylist(records)
+        return
+
+    if raw_format == "arrow":
+        if path.stat().st_size:
+            # Les lots pointent dans le fichier projeté en mémoire : pas de copie
+            yield from pa.ipc.open_stream(pa.memory_map(str(path)))
+        return
+
+    compression = RAW_FORMATS[raw_format]
+    schema = _ndjson_schema(path, compression)
+    if schema is None:
+        return
+    with pa.input_stream(str(path), compression=compression) as f:
+        yield from pj.open_json(f, parse_options=pj.ParseOptions(explicit_schema=schema))
+
+
+def iter_raw(path: str | Path) -> Iterator[dict]:
+    """Relit un dump brut enregistrement par enregistrement."""
+    for batch in iter_raw_batches(path):
+        yield from batch.to_pylist()
+
+
+def load_raw(path: str | Path) -> pd.DataFrame:
+    """Charge un dump brut entier (types du dataset GEO)."""
+    batches = list(iter_raw_batches(path))
+    if not batches:
+        return pd.DataFrame()
+    return apply_geo_dtypes(arrow_to_pandas(pa.Table.from_batches(batches)))
+
+
+def save_parquet(df: pd.DataFrame, name: str, folder: Path | None = None) -> Path:
+    """
+    Sauvegarde le DataFrame en Parquet. Les colonnes catégorielles sont
+    écrites en dictionnaire et relues comme telles par load_parquet.
+    """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = PROCESSED_DIR / f"{name}_{timestamp}.parquet"
+    filepath = Path(folder or PROCESSED_DIR) / f"{name}_{timestamp}.parquet"
 
     df.to_parquet(filepath, index=False, compression="snappy")
 
@@ -32,6 +286,85 @@ def save_parquet(df: pd.DataFrame, name: str) -> Path:
     return filepath
 
 
+def save_csv(df: pd.DataFrame, name: str, folder: Path | None = None) -> Path:
+    """Sauvegarde le DataFrame en CSV."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = Path(folder or PROCESSED_DIR) / f"{name}_{timestamp}.csv"
+
+    df.to_csv(filepath, index=False)
+
+    size_kb = filepath.stat().st_size / 1024
+    print(f"   💾 CSV: {filepath.name} ({size_kb:.1f} KB)")
+    return filepath
+
+
+# Formats de sortie du dataset final
+OUTPUT_FORMATS = {
+    "parquet": save_parquet,
+    "csv": save_csv,
+}
+
+
+def save_dataset(df: pd.DataFrame, name: str, output_format: str = "parquet") -> Path:
+    """Sauvegarde le dataset final dans le format demandé."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Format de sortie inconnu : {output_format} (attendu : {list(OUTPUT_FORMATS)})"
+        )
+    return OUTPUT_FORMATS[output_format](df, name)
+
+
 def load_parquet(filepath: str | Path) -> pd.DataFrame:
-    """Charge un fichier Parquet."""
-    return pd.read_parquet(filepath)
+    """Charge un fichier Parquet (chaînes Arrow, catégories conservées)."""
+    return arrow_to_pandas(pq.read_table(filepath))
+
+
+class ParquetChunkWriter:
+    """
+    Écrit un dataset Parquet lot par lot (un row group par lot).
+    Le fichier n'apparaît sous son nom final qu'une fois fermé correctement.
+    """
+
+    def __init__(self, name: str, schema: pa.Schema = GEO_DATASET_SCHEMA):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.schema = schema
+        self.filepath = PROCESSED_DIR / f"{name}_{timestamp}.parquet"
+        self._tmp_path = self.filepath.with_suffix(".parquet.tmp")
+        self._writer = pq.ParquetWriter(self._tmp_path, schema, compression="snappy")
+        self.rows_written = 0
+        self.closed = False
+
+    def write(self, df: pd.DataFrame):
+        """Ajoute un lot au fichier."""
+        table = pa.Table.from_pandas(
+            df[self.schema.names], schema=self.schema, preserve_index=False
+        )
+        self._writer.write_table(table)
+        self.rows_written += len(df)
+
+    def close(self) -> Path:
+        """Finalise le fichier et le renomme sous son nom définitif."""
+        self._writer.close()
+        self.closed = True
+        os.replace(self._tmp_path, self.filepath)
+
+        size_kb = self.filepath.stat().st_size / 1024
+        print(f"   💾 Parquet: {self.filepath.name} ({size_kb:.1f} KB)")
+        return self.filepath
+
+    def abort(self):
+        """Abandonne l'écriture et supprime le fichier partiel."""
+        self._writer.close()
+        self.closed = True
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.closed:
+            return
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
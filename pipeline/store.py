@@ -0,0 +1,344 @@
+"""
+Dataset GEO partitionné par département, enrichi run après run.
+
+Chaque partition est un dossier `code_departement=XX` contenant un ou
+plusieurs fichiers Parquet ; un manifeste JSON liste les fichiers avec leur
+nombre de lignes et les min/max/nulls de chaque colonne. Les lecteurs ne
+parcourent que les fichiers utiles (départements demandés, plages de valeurs
+compatibles) au lieu de scanner tout le dossier.
+"""
+import json
+import os
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .config import STORE_DIR, STORE_COMPACT_MIN_ROWS
+from .fetchers.commune import departement_from_citycode
+from .storage import GEO_DATASET_SCHEMA, apply_geo_dtypes, arrow_to_pandas
+
+MANIFEST_NAME = "_manifest.json"
+PARTITION_COLUMN = "code_departement"
+# Partition des lignes sans code INSEE exploitable
+UNKNOWN_PARTITION = "inconnu"
+
+
+def departement_codes(citycodes: pd.Series) -> pd.Series:
+    """
+    Code département de chaque code INSEE (UNKNOWN_PARTITION si absent ou
+    invalide). Calculé une fois par code distinct.
+    """
+    codes = citycodes.astype("string")
+    valid = codes.dropna().unique()
+    mapping = {
+        code: departement_from_citycode(code) if len(code) == 5 else UNKNOWN_PARTITION
+        for code in valid
+    }
+    return codes.map(mapping).fillna(UNKNOWN_PARTITION).astype("category")
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def column_stats(table: pa.Table) -> dict:
+    """Min, max et nombre de nulls des colonnes numériques, texte et dates."""
+    stats = {}
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        kind = column.type
+        if not (
+            pa.types.is_integer(kind) or pa.types.is_floating(kind)
+            or pa.types.is_string(kind) or pa.types.is_large_string(kind)
+            or pa.types.is_timestamp(kind)
+        ):
+            continue
+        min_max = pc.min_max(column)
+        stats[name] = {
+            "min": _json_value(min_max["min"].as_py()),
+            "max": _json_value(min_max["max"].as_py()),
+            "nulls": column.null_count,
+        }
+    return stats
+
+
+def read_file(path: str | Path, columns: list[str] | None = None) -> pa.Table:
+    """Lit un fichier du store (la colonne de partition est dans le fichier, pas déduite du chemin)."""
+    return pq.read_table(path, columns=columns, partitioning=None)
+
+
+def may_contain(entry: dict, column: str, low=None, high=None) -> bool:
+    """
+    False si les statistiques du fichier prouvent qu'aucune valeur de
+    `column` n'est dans [low, high] ; True dans le doute.
+    """
+    stats = entry.get("stats", {}).get(column)
+    if stats is None:
+        return True
+    if stats["min"] is None:
+        return False  # colonne entièrement nulle
+    try:
+        if low is not None and stats["max"] < _json_value(low):
+            return False
+        if high is not None and stats["min"] > _json_value(high):
+            return False
+    except TypeError:
+        return True
+    return True
+
+
+class DatasetStore:
+    """
+    Dataset Parquet partitionné par département, avec manifeste :
+
+        store = DatasetStore()
+        store.upsert(df_clean)             # remplace les adresses déjà présentes
+        store.compact_in_background()      # fusionne les petits fichiers
+        df = store.read(departements=["75", "92"], where={"score": (0.8, None)})
+
+    Les modifications du manifeste sont sérialisées par un verrou : un
+    compactage en arrière-plan peut tourner pendant un append ou un upsert.
+    Les fichiers remplacés sont supprimés après la mise à jour du manifeste.
+    """
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root or STORE_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.root / MANIFEST_NAME
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def is_store(path: str | Path) -> bool:
+        return (Path(path) / MANIFEST_NAME).exists()
+
+    # ==========================================================
+    # Manifeste
+    # ==========================================================
+
+    def manifest(self) -> dict:
+        """Contenu du manifeste (vide si le dataset n'a jamais été écrit)."""
+        if not self.manifest_path.exists():
+            return {"partition_by": PARTITION_COLUMN, "files": []}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: dict):
+        # Écriture atomique : un lecteur voit l'ancien ou le nouveau manifeste
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def __len__(self) -> int:
+        return sum(entry["rows"] for entry in self.manifest()["files"])
+
+    def partitions(self) -> dict[str, int]:
+        """Nombre de lignes par partition."""
+        rows = defaultdict(int)
+        for entry in self.manifest()["files"]:
+            rows[entry["partition"]] += entry["rows"]
+        return dict(sorted(rows.items()))
+
+    def files(
+        self,
+        departements: list[str] | None = None,
+        where: dict[str, tuple] | None = None
+    ) -> list[str]:
+        """
+        Fichiers à lire pour les départements demandés (tous si None) dont
+        les statistiques sont compatibles avec `where` ({colonne: (min, max)},
+        bornes incluses, None = non borné).
+        """
+        wanted = set(departements) if departements is not None else None
+        return [
+            (self.root / entry["path"]).as_posix()
+            for entry in self.manifest()["files"]
+            if (wanted is None or entry["partition"] in wanted)
+            and all(may_contain(entry, col, *bounds) for col, bounds in (where or {}).items())
+        ]
+
+    # ==========================================================
+    # Écriture
+    # ==========================================================
+
+    def _write_file(self, table: pa.Table, partition: str) -> dict:
+        """Écrit un fichier dans la partition ; retourne son entrée de manifeste."""
+        folder = self.root / f"{PARTITION_COLUMN}={partition}"
+        folder.mkdir(exist_ok=True)
+        path = folder / f"part-{datetime.now():%Y%m%d_%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+        pq.write_table(table, path, compression="snappy")
+        return {
+            "path": path.relative_to(self.root).as_posix(),
+            "partition": partition,
+            "rows": table.num_rows,
+            "bytes": path.stat().st_size,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "stats": column_stats(table),
+        }
+
+    def _write_partitions(self, df: pd.DataFrame) -> list[dict]:
+        """Répartit le DataFrame par département : un fichier par partition."""
+        if "citycode" in df.columns:
+            partitions = departement_codes(df["citycode"])
+        else:
+            partitions = pd.Series(UNKNOWN_PARTITION, index=df.index, dtype="category")
+        table = pa.Table.from_pandas(
+            df.assign(**{PARTITION_COLUMN: partitions.to_numpy()}), preserve_index=False
+        )
+        groups = partitions.groupby(partitions.to_numpy(), observed=True, sort=True).indices
+        return [
+            self._write_file(table.take(indices), partition)
+            for partition, indices in groups.items()
+        ]
+
+    def append(self, df: pd.DataFrame) -> Path:
+        """Ajoute les lignes telles quelles (sans dédoublonnage)."""
+        if df.empty:
+            return self.root
+        with self._lock:
+            manifest = self.manifest()
+            added = self._write_partitions(df)
+            manifest["files"] += added
+            self._save_manifest(manifest)
+        self._log(f"+{len(df)} lignes", added)
+        return self.root
+
+    def upsert(self, df: pd.DataFrame, key: str = "address") -> Path:
+        """
+        Ajoute les lignes en remplaçant celles qui ont la même clé, quelle
+        que soit leur partition d'origine. Seuls les fichiers contenant une
+        des clés (min/max puis lecture de la seule colonne clé) sont réécrits.
+        """
+        df = df.drop_duplicates(subset=[key], keep="last")
+        if df.empty:
+            return self.root
+        keys = df[key].dropna()
+        low, high = keys.min(), keys.max()
+        value_set = pa.array(keys.astype(str).to_numpy(), type=pa.string())
+
+        with self._lock:
+            manifest = self.manifest()
+            kept, removed, added = [], [], []
+            for entry in manifest["files"]:
+                path = self.root / entry["path"]
+                if not may_contain(entry, key, low, high):
+                    kept.append(entry)
+                    continue
+                column = read_file(path, columns=[key])[key]
+                if not pc.any(pc.is_in(column, value_set=value_set.cast(column.type))).as_py():
+                    kept.append(entry)
+                    continue
+                table = read_file(path)
+                mask = pc.is_in(table[key], value_set=value_set.cast(table[key].type))
+                remaining = table.filter(pc.invert(mask))
+                removed.append(entry)
+                if remaining.num_rows:
+                    added.append(self._write_file(remaining, entry["partition"]))
+            added += self._write_partitions(df)
+            manifest["files"] = kept + added
+            self._save_manifest(manifest)
+
+        for entry in removed:
+            (self.root / entry["path"]).unlink(missing_ok=True)
+        self._log(f"{len(df)} lignes (upsert, {len(removed)} fichiers réécrits)", added)
+        return self.root
+
+    def _log(self, message: str, added: list[dict]):
+        size_kb = sum(entry["bytes"] for entry in added) / 1024
+        partitions = len({entry["partition"] for entry in added})
+        print(f"   💾 Store: {self.root.name} {message}, {partitions} partitions ({size_kb:.1f} KB)")
+
+    # ==========================================================
+    # Compactage
+    # ==========================================================
+
+    def compact(self, min_rows: int = STORE_COMPACT_MIN_ROWS) -> int:
+        """
+        Fusionne, partition par partition, les fichiers de moins de
+        `min_rows` lignes. Retourne le nombre de fichiers fusionnés.
+        La fusion est écrite hors verrou ; elle est abandonnée si un upsert
+        a réécrit l'un des fichiers entre-temps.
+        """
+        small = defaultdict(list)
+        for entry in self.manifest()["files"]:
+            if entry["rows"] < min_rows:
+                small[entry["partition"]].append(entry)
+
+        merged = 0
+        for partition, entries in small.items():
+            if len(entries) < 2:
+                continue
+            try:
+                table = pa.concat_tables(
+                    [read_file(self.root / entry["path"]) for entry in entries],
+                    promote_options="permissive"
+                )
+            except FileNotFoundError:
+                continue  # fichier supprimé par un upsert concurrent
+            new_entry = self._write_file(table, partition)
+            paths = {entry["path"] for entry in entries}
+
+            with self._lock:
+                manifest = self.manifest()
+                if not paths <= {entry["path"] for entry in manifest["files"]}:
+                    (self.root / new_entry["path"]).unlink()
+                    continue
+                manifest["files"] = [
+                    entry for entry in manifest["files"] if entry["path"] not in paths
+                ] + [new_entry]
+                self._save_manifest(manifest)
+
+            for path in paths:
+                (self.root / path).unlink(missing_ok=True)
+            merged += len(entries)
+        return merged
+
+    def compact_in_background(self, min_rows: int = STORE_COMPACT_MIN_ROWS) -> threading.Thread:
+        """Lance compact() dans un thread (non démon : terminé avant la sortie du programme)."""
+        thread = threading.Thread(target=self.compact, args=(min_rows,), name="store-compaction")
+        thread.start()
+        return thread
+
+    # ==========================================================
+    # Lecture
+    # ==========================================================
+
+    def read(
+        self,
+        departements: list[str] | None = None,
+        columns: list[str] | None = None,
+        where: dict[str, tuple] | None = None
+    ) -> pd.DataFrame:
+        """
+        Charge les départements demandés (tous si None). Les fichiers sont
+        d'abord filtrés par le manifeste, puis `where` ({colonne: (min, max)})
+        est appliqué aux lignes (row groups ignorés d'après leurs statistiques).
+        """
+        files = self.files(departements, where)
+        if not files:
+            names = columns or [*GEO_DATASET_SCHEMA.names, PARTITION_COLUMN]
+            return pd.DataFrame(columns=names)
+
+        schema = pa.unify_schemas(
+            [pq.read_schema(path) for path in files], promote_options="permissive"
+        )
+        dataset = ds.dataset(files, schema=schema, format="parquet")
+
+        expression = None
+        for column, (low, high) in (where or {}).items():
+            for bound, compare in ((low, pc.greater_equal), (high, pc.less_equal)):
+                if bound is not None:
+                    condition = compare(pc.field(column), bound)
+                    expression = condition if expression is None else expression & condition
+
+        table = dataset.to_table(columns=columns, filter=expression)
+        return apply_geo_dtypes(arrow_to_pandas(table))
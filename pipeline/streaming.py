@@ -0,0 +1,235 @@
+"""Pipeline GEO en streaming : mémoire bornée du fichier d'entrée au Parquet."""
+import csv
+import sqlite3
+import tempfile
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from .cache import open_cache
+from .config import STREAM_CHUNK_SIZE
+from .enricher import GeoEnricher
+from .metrics import PipelineMetrics, write_metrics
+from .quality import QualityAccumulator, write_quality_report
+from .storage import ParquetChunkWriter, RawWriter
+from .transformer import DataTransformer
+
+
+# ==========================================================
+# Lecture paresseuse des adresses
+# ==========================================================
+
+def iter_addresses(path: str | Path, column: str = "address") -> Iterator[str]:
+    """
+    Lit les adresses une à une depuis un CSV (colonne `column`,
+    sinon la première) ou un fichier texte (une adresse par ligne).
+    """
+    path = Path(path)
+
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames or []
+            key = column if column in fieldnames else fieldnames[0]
+            for row in reader:
+                if row.get(key):
+                    yield row[key]
+        else:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Découpe un itérable en listes de `size` éléments."""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# ==========================================================
+# Doublons entre lots
+# ==========================================================
+
+class SeenAddresses:
+    """
+    Empreintes 64 bits des adresses déjà écrites, rangées dans une base
+    SQLite temporaire : seule la page cache SQLite reste en mémoire, quel
+    que soit le nombre d'adresses distinctes. Supprimée à la fermeture.
+    """
+
+    def __init__(self, directory: str | Path | None = None):
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="geo_seen_", dir=directory)
+        self.con = sqlite3.connect(Path(self._tmpdir.name) / "seen.sqlite")
+        self.con.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            PRAGMA cache_size = -32768;  -- 32 Mo de pages au plus
+            CREATE TABLE seen (hash INTEGER PRIMARY KEY) WITHOUT ROWID;
+            CREATE TEMP TABLE chunk (hash INTEGER);
+        """)
+
+    def add(self, hashes: np.ndarray) -> np.ndarray:
+        """Enregistre les empreintes ; True pour celles jamais vues avant ce lot."""
+        # SQLite stocke des entiers signés
+        values = np.asarray(hashes, dtype=np.uint64).view(np.int64)
+        with self.con:
+            self.con.execute("DELETE FROM chunk")
+            # Insertion triée : les pages de l'index sont parcourues dans l'ordre
+            self.con.executemany("INSERT INTO chunk VALUES (?)", ((v,) for v in np.sort(values).tolist()))
+            # RETURNING ne renvoie que les empreintes réellement insérées (nouvelles)
+            inserted = self.con.execute(
+                "INSERT OR IGNORE INTO seen SELECT hash FROM chunk ORDER BY hash RETURNING hash"
+            ).fetchall()
+        return np.isin(values, np.array([h for h, in inserted], dtype=np.int64))
+
+    def __len__(self) -> int:
+        return self.con.execute("SELECT count(*) FROM seen").fetchone()[0]
+
+    def close(self):
+        self.con.close()
+        self._tmpdir.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# ==========================================================
+# Pipeline streaming
+# ==========================================================
+
+def transform_chunk(df: pd.DataFrame, seen_addresses: SeenAddresses) -> pd.DataFrame:
+    """
+    Applique au lot les transformations de run_pipeline_geo.
+    Les doublons sont éliminés aussi entre lots grâce aux empreintes déjà vues ;
+    les médianes de remplissage sont celles du lot.
+    """
+    hashes = pd.util.hash_pandas_object(df["address"], index=False).to_numpy()
+    is_new = seen_addresses.add(hashes)
+
+    return (
+        DataTransformer(df[is_new])
+        .remove_duplicates(subset=["address"])
+        .handle_missing_values(numeric_strategy='median', text_strategy='unknown')
+        .normalize_text_columns(["city", "commune"])
+        .get_result()
+    )
+
+
+def run_pipeline_geo_streaming(
+    input_path: str | Path,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    max_items: int | None = None,
+    mode: str = "sequential",
+    concurrency: int | None = None,
+    batch_size: int | None = None,
+    use_cache: bool = True,
+    cache_dir: str | Path | None = None,
+    raw_format: str | None = None,
+    metrics_format: str | None = None,
+) -> dict:
+    """
+    Enrichit un fichier d'adresses lot par lot et écrit chaque lot comme
+    row group Parquet : la mémoire dépend de `chunk_size`, pas du fichier.
+    Les empreintes des adresses déjà écrites sont gardées sur disque
+    (SeenAddresses) et les doublons du rapport qualité estimés par
+    HyperLogLog (taille fixe, erreur QUALITY_SKETCH_ERROR).
+    Avec `raw_format` (voir RAW_FORMATS), les lots enrichis bruts sont aussi
+    ajoutés au fil de l'eau à un dump.
+    """
+    stats = {"start_time": datetime.now(), "chunks": 0}
+    timer = PipelineMetrics()
+
+    print("="*60)
+    print("🚀 PIPELINE GEO (streaming)")
+    print("="*60)
+
+    addresses = iter_addresses(input_path)
+    if max_items is not None:
+        addresses = islice(addresses, max_items)
+
+    accumulator = QualityAccumulator(duplicate_sketch="hll")
+    cache = open_cache(use_cache, cache_dir)
+
+    try:
+        # Les fichiers sont ouverts dans le with : si l'ouverture de l'un
+        # échoue (format inconnu…), ceux déjà ouverts sont abandonnés
+        with (
+            RawWriter("geo_enriched_raw", raw_format) if raw_format else nullcontext() as raw_writer,
+            ParquetChunkWriter("geo_dataset") as writer,
+            SeenAddresses() as seen_addresses,
+            GeoEnricher(
+                mode=mode,
+                concurrency=concurrency,
+                batch_size=batch_size,
+                cache=cache
+            ) as enricher,
+        ):
+            for chunk in chunked(addresses, chunk_size):
+                with timer.stage("enrichment", rows_in=len(chunk)) as stage:
+                    enriched = enricher.enrich_batch(chunk)
+                    stage["rows_out"] = len(enriched)
+                stats["chunks"] += 1
+                if not enriched:
+                    continue
+
+                df_raw = enriched.to_frame()
+                if raw_writer is not None:
+                    with timer.stage("raw_dump", rows_in=len(df_raw)):
+                        raw_writer.write(df_raw)
+
+                with timer.stage("transformation", rows_in=len(df_raw)) as stage:
+                    df_chunk = transform_chunk(df_raw, seen_addresses)
+                    stage["rows_out"] = len(df_chunk)
+                if df_chunk.empty:
+                    continue  # lot entièrement déjà écrit : pas de row group vide
+                with timer.stage("quality", rows_in=len(df_chunk)):
+                    accumulator.update(df_chunk)
+                with timer.stage("storage", rows_in=len(df_chunk)):
+                    writer.write(df_chunk)
+
+            stats["enricher"] = enricher.get_stats()
+            stats["http_latency_ms"] = {
+                "geocoder": stats["enricher"]["geocoder_stats"]["latency_ms"],
+                "commune": stats["enricher"]["commune_stats"]["latency_ms"],
+            }
+
+            if writer.rows_written == 0:
+                writer.abort()
+                if raw_writer is not None:
+                    raw_writer.abort()
+                print("❌ Aucun résultat enrichi. Arrêt.")
+                return {"error": "No enriched data"}
+    finally:
+        if cache is not None:
+            cache.close()
+
+    metrics = accumulator.to_metrics()
+    write_quality_report(metrics, "geo_dataset")
+    stats["quality"] = metrics.dict()
+    stats["output_path"] = str(writer.filepath)
+
+    stats["end_time"] = datetime.now()
+    stats["duration_seconds"] = (stats["end_time"] - stats["start_time"]).total_seconds()
+    stats["rows_out"] = writer.rows_written
+    stats["stages"] = timer.to_dict()
+
+    if metrics_format:
+        stats["metrics_path"] = str(write_metrics(stats, "geo_pipeline_metrics", metrics_format))
+
+    print("\n" + "="*60)
+    print("✅ PIPELINE GEO TERMINÉ")
+    print("="*60)
+    print(f"Adresses enrichies: {writer.rows_written}")
+    print(f"Qualité: {metrics.quality_grade}")
+    print(f"Fichier: {writer.filepath}")
+
+    return stats
@@ -1,22 +1,69 @@
 """Module de transformation et nettoyage pour le pipeline GEO."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import duckdb
 import pandas as pd
+import pyarrow as pa
 import numpy as np
 from typing import Callable
 from litellm import completion
 from dotenv import load_dotenv
 
+from .config import PARALLEL_MIN_ROWS
+from .quality import duckdb_source, is_arrow_backed, quote_identifier
+
 load_dotenv()
 
 
 class DataTransformer:
-    """Transforme et nettoie les données GEO."""
+    """
+    Transforme et nettoie les données GEO.
 
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    En mode `lazy`, les étapes sont seulement enregistrées : get_result()
+    les compile en un plan DuckDB exécuté d'un bloc (l'index du résultat
+    est alors réinitialisé). Ce n'est pas une optimisation pour un DataFrame
+    déjà en mémoire : l'aller-retour pandas → DuckDB → pandas le rend plus
+    lent et plus gourmand que le mode direct à toutes les tailles mesurées
+    (voir README). Le mode direct reste le défaut.
+
+    Avec `n_jobs` > 1 (-1 : tous les cœurs), les étapes sont aussi différées,
+    puis exécutées par partitions dans un pool de processus (voir
+    _execute_parallel) ; le résultat est identique au mode direct. Le pool
+    n'est utilisé qu'à partir de PARALLEL_MIN_ROWS lignes et avec au moins
+    deux cœurs disponibles : en deçà, l'envoi des partitions aux workers
+    coûte plus que les étapes vectorisées elles-mêmes.
+    """
+
+    def __init__(self, df: pd.DataFrame, lazy: bool = False, n_jobs: int = 1):
+        if n_jobs < 1:
+            n_jobs = usable_cpus()
+        if lazy and n_jobs > 1:
+            raise ValueError("Les modes lazy et n_jobs > 1 sont exclusifs")
+
+        self.lazy = lazy
+        self.n_jobs = n_jobs
+        # En mode différé, la source n'est jamais modifiée en place : pas de copie
+        self.df = df if self.deferred else df.copy()
         self.transformations_applied = []
+        self._plan: list[tuple[str, dict]] = []
+
+    @property
+    def deferred(self) -> bool:
+        """True si les étapes sont enregistrées puis exécutées par get_result()."""
+        return self.lazy or self.n_jobs > 1
+
+    def _defer(self, step: str, **kwargs) -> 'DataTransformer':
+        """Enregistre une étape du plan (mode lazy ou parallèle)."""
+        self._plan.append((step, kwargs))
+        return self
 
     def remove_duplicates(self, subset: list[str] = None) -> 'DataTransformer':
         """Supprime les doublons."""
+        if self.deferred:
+            return self._defer("remove_duplicates", subset=subset)
+
         initial = len(self.df)
 
         if subset is None:
@@ -33,65 +80,49 @@ class DataTransformer:
         numeric_strategy: str = 'median',
         text_strategy: str = 'unknown'
     ) -> 'DataTransformer':
-        
-
-        # Colonnes numériques
-        num_cols = self.df.select_dtypes(include=[np.number]).columns
-        for col in num_cols:
-            if numeric_strategy == 'median':
-                fill_value = self.df[col].median()
-            elif numeric_strategy == 'mean':
-                fill_value = self.df[col].mean()
-            elif numeric_strategy == 'zero':
-                fill_value = 0
-            else:
-                fill_value = None
-
-            if fill_value is not None:
-                null_count = self.df[col].isnull().sum()
-                if null_count > 0:
-                    self.df[col] = self.df[col].fillna(fill_value)
-                    self.transformations_applied.append(f"{col}: {null_count} nulls → {fill_value:.2f}")
-
-        # Colonnes texte
-        text_cols = self.df.select_dtypes(include=['object']).columns
-        for col in text_cols:
-            null_count = self.df[col].isnull().sum()
-            if null_count > 0:
-                self.df[col] = self.df[col].fillna(text_strategy)
-                self.transformations_applied.append(f"{col}: {null_count} nulls → '{text_strategy}'")
+        if self.deferred:
+            return self._defer(
+                "handle_missing_values",
+                numeric_strategy=numeric_strategy,
+                text_strategy=text_strategy
+            )
 
+        fills = missing_value_fills(
+            self.df, numeric_strategy, text_strategy, self.transformations_applied
+        )
+        if fills:
+            self.df = fill_missing(self.df, fills)
         return self
 
     def normalize_text_columns(self, columns: list[str] = None) -> 'DataTransformer':
         """Normalise les colonnes texte (strip, lower)."""
+        if self.deferred:
+            return self._defer("normalize_text_columns", columns=columns)
+
         if columns is None:
-            columns = self.df.select_dtypes(include=['object']).columns.tolist()
+            columns = self.df.select_dtypes(include=TEXT_DTYPES).columns.tolist()
 
         for col in columns:
             if col in self.df.columns:
-                self.df[col] = self.df[col].astype(str).str.strip().str.lower()
+                self.df[col] = normalize_text(self.df[col])
 
         self.transformations_applied.append(f"Normalisation texte: {columns}")
         return self
 
     def add_derived_columns(self) -> 'DataTransformer':
         """Ajoute des colonnes dérivées GEO."""
+        if self.deferred:
+            return self._defer("add_derived_columns")
 
-        # Flag géocodé
-        if 'score' in self.df.columns:
-            self.df['is_geocoded'] = self.df['score'] >= 0.5
-            self.transformations_applied.append("Ajout: is_geocoded")
-
-        # Flag population non nulle
-        if 'population' in self.df.columns:
-            self.df['has_population'] = self.df['population'] > 0
-            self.transformations_applied.append("Ajout: has_population")
+        for col, values in derived_columns(self.df).items():
+            self.df[col] = values
+            self.transformations_applied.append(f"Ajout: {col}")
 
         return self
 
     def generate_ai_transformations(self) -> str:
         """Demande à l'IA des transformations supplémentaires."""
+        self.get_result()
         context = f"""
         Dataset GEO avec {len(self.df)} lignes.
         Colonnes: {list(self.df.columns)}
@@ -115,14 +146,456 @@ class DataTransformer:
         return response
     def apply_custom(self, func: Callable[[pd.DataFrame], pd.DataFrame], name: str) -> 'DataTransformer':
         """Applique une transformation personnalisée."""
+        if self.deferred:
+            return self._defer("apply_custom", func=func, name=name)
+
         self.df = func(self.df)
         self.transformations_applied.append(f"Custom: {name}")
         return self
 
     def get_result(self) -> pd.DataFrame:
-        """Retourne le DataFrame transformé."""
+        """Retourne le DataFrame transformé (exécute le plan en mode différé)."""
+        if self._plan:
+            self.df = self._execute_parallel() if self.n_jobs > 1 else self._execute_plan()
+            self._plan = []
         return self.df
 
+    def _execute_plan(self) -> pd.DataFrame:
+        """
+        Exécute le plan : les étapes traduisibles en SQL forment un seul plan
+        DuckDB ; une étape opaque (apply_custom) est appliquée en pandas entre deux.
+        """
+        df = self.df
+        plan = SQLPlan(df)
+
+        for step, kwargs in self._plan:
+            if plan.add(step, **kwargs):
+                continue
+
+            df = plan.execute(self.transformations_applied)
+            eager = DataTransformer(df)
+            getattr(eager, step)(**kwargs)
+            self.transformations_applied.extend(eager.transformations_applied)
+            df = eager.df
+            plan = SQLPlan(df)
+
+        return plan.execute(self.transformations_applied)
+
+    def _execute_parallel(self) -> pd.DataFrame:
+        """
+        Exécute le plan par partitions de lignes dans un pool de processus.
+        Les étapes globales restent dans le processus principal : doublons
+        (sur le DataFrame entier), valeurs de remplissage (médianes globales)
+        et apply_custom ; les étapes ligne à ligne consécutives (remplissage,
+        normalisation, colonnes dérivées) sont envoyées ensemble aux workers.
+        """
+        df = self.df
+        pending: list[tuple[str, object]] = []
+        pool = None
+
+        def flush():
+            nonlocal df, pool
+            if not pending:
+                return
+            if len(df) < PARALLEL_MIN_ROWS or usable_cpus() < 2:
+                df = apply_row_local(df, pending)
+            else:
+                pool = pool or ProcessPoolExecutor(self.n_jobs)
+                df = run_partitioned(pool, df, pending, self.n_jobs)
+            pending.clear()
+
+        try:
+            for step, kwargs in self._plan:
+                if step == "normalize_text_columns":
+                    columns = kwargs["columns"]
+                    if columns is None:
+                        # Les colonnes texte dépendent des étapes précédentes
+                        flush()
+                        columns = df.select_dtypes(include=TEXT_DTYPES).columns.tolist()
+                    pending.append(("normalize", columns))
+                    self.transformations_applied.append(f"Normalisation texte: {columns}")
+                elif step == "add_derived_columns":
+                    pending.append(("derived", None))
+                    self.transformations_applied.extend(
+                        f"Ajout: {col}" for col, source in DERIVED_SOURCES.items()
+                        if source in df.columns
+                    )
+                elif step == "handle_missing_values":
+                    flush()
+                    pending.append(("fill", missing_value_fills(
+                        df, log=self.transformations_applied, **kwargs
+                    )))
+                else:
+                    flush()
+                    eager = DataTransformer(df)
+                    getattr(eager, step)(**kwargs)
+                    self.transformations_applied.extend(eager.transformations_applied)
+                    df = eager.df
+            flush()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        return df
+
     def get_summary(self) -> str:
         """Retourne un résumé des transformations."""
+        self.get_result()
         return "\n".join([f"• {t}" for t in self.transformations_applied])
+
+
+# ==========================================================
+# Étapes ligne à ligne (mode direct et workers du mode parallèle)
+# ==========================================================
+
+# Colonne dérivée → colonne source
+DERIVED_SOURCES = {"is_geocoded": "score", "has_population": "population"}
+
+# Types de colonnes texte : objets Python, string[pyarrow] et catégories
+TEXT_DTYPES = ['object', 'string', 'category']
+
+
+def normalize_text(series: pd.Series) -> pd.Series:
+    """
+    strip + lower. Une colonne objet passe par astype(str) (None → « none ») ;
+    une colonne typée garde son type et ses valeurs manquantes.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Seules les catégories sont normalisées ; deux catégories devenues
+        # identiques sont fusionnées
+        labels = series.cat.categories.astype(str).str.strip().str.lower()
+        codes, categories = pd.factorize(labels)
+        old = series.cat.codes.to_numpy()
+        new = np.where(old < 0, -1, codes[old])
+        return pd.Series(
+            pd.Categorical.from_codes(new, categories=categories),
+            index=series.index, name=series.name
+        )
+    if isinstance(series.dtype, pd.StringDtype):
+        return series.str.strip().str.lower()
+    return series.astype(str).str.strip().str.lower()
+
+
+def fill_missing(df: pd.DataFrame, fills: dict) -> pd.DataFrame:
+    """fillna par colonne ; la valeur de remplissage d'une catégorie y est d'abord ajoutée."""
+    new_categories = {
+        col: df[col].cat.add_categories([value])
+        for col, value in fills.items()
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and value not in df[col].cat.categories
+    }
+    if new_categories:
+        df = df.assign(**new_categories)
+    return df.fillna(fills)
+
+
+def derived_columns(df: pd.DataFrame) -> dict[str, pd.Series]:
+    """Flags géocodé (score >= 0.5) et population non nulle."""
+    columns = {}
+    if "score" in df.columns:
+        columns["is_geocoded"] = df["score"] >= 0.5
+    if "population" in df.columns:
+        columns["has_population"] = df["population"] > 0
+    return columns
+
+
+def missing_value_fills(
+    df: pd.DataFrame,
+    numeric_strategy: str = 'median',
+    text_strategy: str = 'unknown',
+    log: list[str] | None = None
+) -> dict:
+    """
+    Valeurs de remplissage par colonne, calculées sur tout le DataFrame.
+    Seules les colonnes ayant des nulls sont retenues (et journalisées dans `log`).
+    """
+    fills = {}
+    log = [] if log is None else log
+
+    # Colonnes numériques
+    num_cols = df.select_dtypes(include=[np.number]).columns
+    for col in num_cols:
+        if numeric_strategy == 'median':
+            fill_value = df[col].median()
+        elif numeric_strategy == 'mean':
+            fill_value = df[col].mean()
+        elif numeric_strategy == 'zero':
+            fill_value = 0
+        else:
+            fill_value = None
+
+        if fill_value is not None:
+            null_count = df[col].isnull().sum()
+            if null_count > 0:
+                fills[col] = fill_value
+                log.append(f"{col}: {null_count} nulls → {fill_value:.2f}")
+
+    # Colonnes texte
+    text_cols = df.select_dtypes(include=TEXT_DTYPES).columns
+    for col in text_cols:
+        null_count = df[col].isnull().sum()
+        if null_count > 0:
+            fills[col] = text_strategy
+            log.append(f"{col}: {null_count} nulls → '{text_strategy}'")
+
+    return fills
+
+
+def usable_cpus() -> int:
+    """Cœurs utilisables par le processus (affinité CPU comprise quand elle est connue)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def apply_row_local(df: pd.DataFrame, ops: list[tuple[str, object]]) -> pd.DataFrame:
+    """Applique des étapes ligne à ligne à une partition (sans la modifier en place)."""
+    for op, arg in ops:
+        if op == "fill":
+            df = fill_missing(df, arg)
+        elif op == "normalize":
+            df = df.assign(**{col: normalize_text(df[col]) for col in arg if col in df.columns})
+        elif op == "derived":
+            df = df.assign(**derived_columns(df))
+    return df
+
+
+def run_partitioned(
+    pool: ProcessPoolExecutor,
+    df: pd.DataFrame,
+    ops: list[tuple[str, object]],
+    n_jobs: int
+) -> pd.DataFrame:
+    """Découpe `df` en partitions contiguës traitées par le pool, puis les recolle dans l'ordre."""
+    bounds = np.linspace(0, len(df), n_jobs * 2 + 1, dtype=int)
+    partitions = [df.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+    return pd.concat(pool.map(apply_row_local, partitions, repeat(ops)))
+
+
+# ==========================================================
+# Mode lazy : compilation du plan en SQL DuckDB
+# ==========================================================
+
+# Blancs retirés par str.strip() (mêmes caractères que str.isspace), en regex RE2
+_SPACE = r"[\s\x{0b}\x{1c}-\x{1f}\x{85}\p{Z}]"
+STRIP_PATTERN = f"^{_SPACE}+|{_SPACE}+$"
+
+
+class SQLPlan:
+    """
+    Traduit une suite d'étapes DataTransformer en CTE DuckDB chaînées
+    (mode lazy, sémantique identique au mode direct).
+    Les valeurs de remplissage et les comptages du journal
+    (`transformations_applied`) sont des agrégats d'une ligne, calculés
+    une fois par étape et réutilisés par la requête finale.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.source = df
+        self.columns = [str(c) for c in df.columns]
+        self.numeric = set(df.select_dtypes(include=[np.number]).columns.astype(str))
+        self.floats = set(df.select_dtypes(include=['floating']).columns.astype(str))
+        self.text = set(df.select_dtypes(include=['object']).columns.astype(str))
+        # Texte typé (string[pyarrow], catégories) : une valeur manquante reste manquante
+        self.typed_text = set(df.select_dtypes(include=['string', 'category']).columns.astype(str))
+        # Numéro de ligne d'origine : ordre final et « keep='first' » des doublons
+        self.ctes = [
+            ("s0", "SELECT * FROM source POSITIONAL JOIN (SELECT range AS __row FROM range($n_rows))")
+        ]
+        self.last = "s0"
+        self.params = {"n_rows": len(df)}
+        # Alias d'agrégat → CTE qui le calcule
+        self.stats: dict[str, str] = {}
+        self.messages: list[Callable[[dict], str | None]] = []
+
+    def _stage(self, sql: str):
+        """Ajoute une étape (CTE) lisant l'étape précédente."""
+        self.last = f"s{sum(name.startswith('s') for name, _ in self.ctes)}"
+        self.ctes.append((self.last, sql))
+
+    def _aggregate(self, exprs: list[str]) -> list[str]:
+        """Agrégats d'une ligne sur l'étape courante ; retourne leurs alias."""
+        name = f"a{sum(n.startswith('a') for n, _ in self.ctes)}"
+        aliases = [f"v{len(self.stats) + i}" for i in range(len(exprs))]
+        self.ctes.append((
+            name,
+            f"SELECT {', '.join(f'{e} AS {a}' for e, a in zip(exprs, aliases))} FROM {self.last}"
+        ))
+        self.stats.update(dict.fromkeys(aliases, name))
+        return aliases
+
+    def _param(self, value) -> str:
+        name = f"p{len(self.params)}"
+        self.params[name] = value
+        return f"${name}"
+
+    def _replace(self, exprs: dict[str, str]):
+        """Nouvelle étape remplaçant ou ajoutant les colonnes données."""
+        replaced = {c: e for c, e in exprs.items() if c in self.columns}
+        added = {c: e for c, e in exprs.items() if c not in self.columns}
+
+        select = "*"
+        if replaced:
+            select += " REPLACE (" + ", ".join(
+                f"{e} AS {quote_identifier(c)}" for c, e in replaced.items()
+            ) + ")"
+        for c, e in added.items():
+            select += f", {e} AS {quote_identifier(c)}"
+            self.columns.append(c)
+
+        self._stage(f"SELECT {select} FROM {self.last}")
+
+    def _ref(self, alias: str) -> str:
+        """Référence scalaire à un agrégat, utilisable dans une étape."""
+        return f"(SELECT {alias} FROM {self.stats[alias]})"
+
+    # ==========================================================
+    # Étapes
+    # ==========================================================
+
+    def add(self, step: str, **kwargs) -> bool:
+        """Ajoute une étape au plan ; False si elle n'est pas traduisible en SQL."""
+        compile_step = getattr(self, f"_{step}", None)
+        return compile_step is not None and compile_step(**kwargs) is not False
+
+    def _remove_duplicates(self, subset: list[str] = None):
+        if subset is None:
+            subset = ['address'] if 'address' in self.columns else [self.columns[0]]
+
+        [before] = self._aggregate(["count(*)"])
+        keys = ", ".join(quote_identifier(c) for c in subset)
+        # Seules les clés et le numéro de ligne passent par l'agrégation
+        self._stage(
+            f"SELECT * FROM {self.last} WHERE __row IN "
+            f"(SELECT min(__row) FROM {self.last} GROUP BY {keys})"
+        )
+        [after] = self._aggregate(["count(*)"])
+        self.messages.append(lambda v: f"Doublons supprimés: {v[before] - v[after]}")
+
+    def _handle_missing_values(self, numeric_strategy: str = 'median', text_strategy: str = 'unknown'):
+        aggregates = {'median': "median", 'mean': "avg"}
+        numeric = [c for c in self.columns if c in self.numeric] if (
+            numeric_strategy in aggregates or numeric_strategy == 'zero'
+        ) else []
+        text = [c for c in self.columns if c in self.text or c in self.typed_text]
+
+        exprs = []
+        for col in numeric:
+            q = quote_identifier(col)
+            exprs.append(f"count(*) - count({q})")
+            exprs.append(f"{aggregates[numeric_strategy]}({q})" if numeric_strategy in aggregates else "0")
+        exprs.extend(f"count(*) - count({quote_identifier(col)})" for col in text)
+        if not exprs:
+            return
+
+        aliases = iter(self._aggregate(exprs))
+        replacements = {}
+
+        for col in numeric:
+            nulls, value = next(aliases), next(aliases)
+            self.messages.append(
+                lambda v, col=col, nulls=nulls, value=value:
+                f"{col}: {v[nulls]} nulls → {np.nan if v[value] is None else v[value]:.2f}"
+                if v[nulls] > 0 else None
+            )
+            # Les colonnes entières (numpy) ne peuvent pas contenir de nulls
+            if col in self.floats:
+                replacements[col] = f"coalesce({quote_identifier(col)}, {self._ref(value)})"
+
+        for col in text:
+            nulls = next(aliases)
+            self.messages.append(
+                lambda v, col=col, nulls=nulls:
+                f"{col}: {v[nulls]} nulls → '{text_strategy}'" if v[nulls] > 0 else None
+            )
+            replacements[col] = f"coalesce({quote_identifier(col)}, {self._param(text_strategy)})"
+
+        if replacements:
+            self._replace(replacements)
+
+    def _normalize_text_columns(self, columns: list[str] = None):
+        if columns is None:
+            columns = [c for c in self.columns if c in self.text or c in self.typed_text]
+
+        targets = [c for c in columns if c in self.columns]
+        # astype(str) sur une colonne non textuelle n'a pas d'équivalent SQL exact
+        if any(c not in self.text and c not in self.typed_text for c in targets):
+            return False
+
+        pattern = self._param(STRIP_PATTERN)
+        exprs = {
+            c: f"lower(regexp_replace(CAST({quote_identifier(c)} AS VARCHAR), {pattern}, '', 'g'))"
+            for c in targets
+        }
+        # Comme astype(str), une valeur manquante d'une colonne objet devient « none »
+        self._replace({
+            c: f"coalesce({e}, 'none')" if c in self.text else e for c, e in exprs.items()
+        })
+        self.messages.append(lambda v: f"Normalisation texte: {columns}")
+
+    def _add_derived_columns(self):
+        exprs = {}
+        if 'score' in self.columns:
+            exprs['is_geocoded'] = "coalesce(score >= 0.5, false)"
+        if 'population' in self.columns:
+            exprs['has_population'] = "coalesce(population > 0, false)"
+
+        if exprs:
+            self._replace(exprs)
+        for col in exprs:
+            self.messages.append(lambda v, col=col: f"Ajout: {col}")
+
+    # ==========================================================
+    # Exécution
+    # ==========================================================
+
+    def execute(self, log: list[str]) -> pd.DataFrame:
+        """Exécute le plan et complète le journal des transformations."""
+        if len(self.ctes) == 1:
+            return self.source
+
+        # Les agrégats (une ligne) sont calculés une seule fois, pas à chaque référence
+        with_sql = "WITH " + ", ".join(
+            f"{name} AS {'MATERIALIZED ' if name.startswith('a') else ''}({sql})"
+            for name, sql in self.ctes
+        )
+
+        with duckdb.connect() as con:
+            con.register("source", duckdb_source(self.source))
+            values = {}
+            if self.stats:
+                aggregates = sorted(set(self.stats.values()))
+                row = con.execute(
+                    f"{with_sql} SELECT {', '.join(self.stats)} FROM {', '.join(aggregates)}",
+                    self.params
+                ).fetchone()
+                values = dict(zip(self.stats, row))
+            table = con.execute(
+                f"{with_sql} SELECT * EXCLUDE (__row) FROM {self.last} ORDER BY __row",
+                self.params
+            ).fetch_arrow_table()
+
+        log.extend(m for m in (message(values) for message in self.messages) if m)
+        return self._to_pandas(table)
+
+    def _to_pandas(self, table: pa.Table) -> pd.DataFrame:
+        """
+        Repasse en pandas en gardant le type des colonnes de la source : les
+        colonnes Arrow sans conversion, les catégories via un dictionnaire Arrow.
+        """
+        typed = {
+            str(c): dtype for c, dtype in self.source.dtypes.items()
+            if is_arrow_backed(dtype) or isinstance(dtype, pd.CategoricalDtype)
+        }
+        if not typed:
+            return table.to_pandas()
+
+        df = table.to_pandas(ignore_metadata=True)
+        for name in typed.keys() & set(table.column_names):
+            column = table[name]
+            if isinstance(typed[name], pd.CategoricalDtype):
+                if not pa.types.is_dictionary(column.type):
+                    column = column.dictionary_encode()
+                df[name] = column.to_pandas()
+            else:
+                df[name] = pd.Series(column, dtype=typed[name])
+        return df
@@ -0,0 +1,133 @@
+"""Fixtures partagées des tests du pipeline GEO."""
+import csv
+import io
+
+import httpx
+import pytest
+from pipeline import checkpoint, incremental, metrics, quality, storage, store
+from pipeline.enricher import GeoEnricher
+from pipeline.fetchers.adresse import AdresseFetcher
+from pipeline.fetchers.commune import CommuneFetcher
+
+
+@pytest.fixture
+def data_dirs(tmp_path, monkeypatch):
+    """
+    Redirige data/raw, data/processed et data/reports vers un dossier
+    temporaire : les tests de bout en bout ne touchent pas aux données du projet.
+    """
+    dirs = {name: tmp_path / name for name in ("raw", "processed", "reports", "checkpoints")}
+    for path in dirs.values():
+        path.mkdir()
+
+    # Les dossiers sont lus dans ces constantes au moment de l'appel
+    monkeypatch.setattr(storage, "RAW_DIR", dirs["raw"])
+    monkeypatch.setattr(storage, "PROCESSED_DIR", dirs["processed"])
+    monkeypatch.setattr(incremental, "PROCESSED_DIR", dirs["processed"])
+    monkeypatch.setattr(quality, "PROCESSED_DIR", dirs["processed"])
+    monkeypatch.setattr(store, "STORE_DIR", dirs["processed"] / "geo_store")
+    monkeypatch.setattr(checkpoint, "CHECKPOINT_DIR", dirs["checkpoints"])
+    monkeypatch.setattr(quality, "REPORTS_DIR", dirs["reports"])
+    monkeypatch.setattr(metrics, "REPORTS_DIR", dirs["reports"])
+    return dirs
+
+
+# ==========================================================
+# APIs simulées (aucun accès réseau)
+# ==========================================================
+
+def make_ban_transport(searched: list | None = None, fail_on: str | None = None):
+    """
+    Transport local simulant l'API Adresse (/search/, label = requête) et
+    geo.api.gouv.fr (toute autre route : la commune 75104). Les requêtes
+    reçues par /search/ sont ajoutées à `searched` ; `fail_on` simule une
+    panne réseau sur une adresse.
+    """
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/search/":
+            q = request.url.params["q"]
+            if q == fail_on:
+                raise RuntimeError("panne réseau simulée")
+            if searched is not None:
+                searched.append(q)
+            return httpx.Response(200, json={"features": [{
+                "geometry": {"coordinates": [2.35, 48.85]},
+                "properties": {"label": q, "score": 0.9, "postcode": "75004",
+                               "city": "Paris", "citycode": "75104"},
+            }]})
+        return httpx.Response(200, json=[{
+            "code": "75104", "nom": "Paris 4e", "population": 1000,
+            "codeDepartement": "75", "codeRegion": "11",
+        }])
+    return httpx.MockTransport(handler)
+
+
+def csv_part(request: httpx.Request) -> str:
+    """Extrait le fichier CSV du corps multipart envoyé à /search/csv/."""
+    boundary = request.headers["content-type"].split("boundary=")[1].encode()
+    for part in request.content.split(b"--" + boundary):
+        if b'name="data"' in part:
+            return part.split(b"\r\n\r\n", 1)[1].rstrip(b"\r\n").decode("utf-8")
+    raise AssertionError("Pas de fichier CSV dans la requête")
+
+
+def make_ban_csv_transport(calls: list, max_rows: int | None = None):
+    """
+    Transport local simulant /search/csv/ (erreur 500 au-delà de max_rows) ;
+    les autres routes sont servies par make_ban_transport. La taille de
+    chaque lot reçu est ajoutée à `calls`.
+    """
+    single = make_ban_transport()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path != "/search/csv/":
+            return single.handle_request(request)
+
+        rows = list(csv.DictReader(io.StringIO(csv_part(request))))
+        calls.append(len(rows))
+        if max_rows is not None and len(rows) > max_rows:
+            return httpx.Response(500)
+
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["id", "q", "latitude", "longitude", "result_label",
+                         "result_score", "result_postcode", "result_city", "result_citycode"])
+        for row in rows:
+            if "inconnue" in row["q"]:
+                writer.writerow([row["id"], row["q"], "", "", "", "", "", "", ""])
+            else:
+                writer.writerow([row["id"], row["q"], 48.85, 2.35, row["q"].upper(),
+                                 0.9, "75004", "Paris", "75104"])
+        return httpx.Response(200, text="\ufeff" + out.getvalue())
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def ban_transport():
+    """Fabrique de transports simulés : ban_transport(searched=None, fail_on=None)."""
+    return make_ban_transport
+
+
+@pytest.fixture
+def ban_csv_transport():
+    """Fabrique de transports /search/csv/ simulés : ban_csv_transport(calls, max_rows=None)."""
+    return make_ban_csv_transport
+
+
+@pytest.fixture
+def mock_enricher():
+    """
+    Fabrique de GeoEnricher branchés sur les APIs simulées, à substituer à
+    GeoEnricher dans un module : monkeypatch.setattr(module, "GeoEnricher", mock_enricher(searched)).
+    """
+    def factory(searched: list | None = None, fail_on: str | None = None):
+        def enricher(**kwargs):
+            transport = make_ban_transport(searched, fail_on)
+            return GeoEnricher(
+                geocoder=AdresseFetcher(transport=transport),
+                commune_fetcher=CommuneFetcher(transport=transport),
+                **kwargs
+            )
+        return enricher
+    return factory
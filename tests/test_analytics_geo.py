@@ -0,0 +1,110 @@
+"""Tests pour la session DuckDB du dashboard (utils/analytics.py)."""
+import numpy as np
+import pandas as pd
+import pytest
+from utils.analytics import AnalyticsSession, viewport_bbox
+
+
+def make_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    cities = rng.choice(["Paris", "Lyon", "Nice"], n)
+    population = pd.Series(cities).map({"Paris": 2_133_111, "Lyon": 522_250, "Nice": 348_085})
+    return pd.DataFrame({
+        "address": [f"{i} rue Test" for i in range(n)],
+        "latitude": rng.normal(46, 2, n),
+        "longitude": rng.normal(2, 2, n),
+        "score": np.round(rng.uniform(0, 1, n), 4),
+        "city": cities,
+        "population": population.where(rng.random(n) > 0.1),
+    })
+
+
+@pytest.fixture
+def session(tmp_path):
+    make_frame(2000).to_parquet(tmp_path / "geo_dataset_1.parquet", index=False)
+    with AnalyticsSession(tmp_path) as session:
+        session.refresh()
+        yield session
+
+
+class TestAnalyticsSession:
+
+    # 0.5 : tranche entière (cube) ; 0.52 : recalcul sur la table brute
+    @pytest.mark.parametrize("min_score", [None, 0.5, 0.52])
+    def test_aggregates_match_pandas(self, session, min_score):
+        df = make_frame(2000)
+        filters = {"city": ["Paris", "Lyon"]}
+        expected = df[df["city"].isin(filters["city"])]
+        if min_score is not None:
+            expected = expected[expected["score"] >= min_score]
+
+        summary = session.summary(filters, min_score)
+        assert summary["rows"] == len(expected)
+        assert summary["cities"] == 2
+        assert summary["population_mean"] == pytest.approx(expected["population"].mean())
+
+        by_city = session.population_by_city(filters, min_score).set_index("city")["population"]
+        pd.testing.assert_series_equal(
+            by_city, expected.groupby("city")["population"].mean().sort_values(ascending=False),
+            check_names=False, check_index_type=False,
+        )
+
+        corr = session.correlation_matrix(filters, min_score)
+        pd.testing.assert_frame_equal(corr, expected.select_dtypes("number").corr(), atol=1e-9)
+
+    def test_score_histogram(self, session):
+        hist = session.score_histogram(min_score=0.5)
+        assert hist["score"].min() == pytest.approx(0.5)
+        assert hist["count"].sum() == (make_frame(2000)["score"] >= 0.5).sum()
+
+    def test_refresh_on_new_parquet(self, session, tmp_path):
+        assert session.refresh() is False
+        make_frame(500, seed=1).to_parquet(tmp_path / "geo_dataset_2.parquet", index=False)
+        assert session.refresh() is True
+        assert session.summary()["rows"] == 2500
+        assert len(session.select(["city"], {"city": "Paris"}, limit=10)) == 10
+
+    def test_map_points_aggregates_above_limit(self, session):
+        bbox = (46.0, 2.0, 90.0, 180.0)
+        points = session.map_points(bbox=bbox, max_points=10_000)
+        df = make_frame(2000)
+        inside = df[(df["latitude"] >= 46.0) & (df["longitude"] >= 2.0)]
+        assert "count" not in points.columns
+        assert len(points) == len(inside)
+
+        cells = session.map_points(bbox=bbox, zoom=3, max_points=50)
+        assert len(cells) <= 50
+        assert cells["count"].sum() == len(inside)
+
+    def test_map_points_full_extent_keeps_dom_tom(self, session, tmp_path):
+        reunion = make_frame(20, seed=2).assign(latitude=-21.1, longitude=55.5)
+        reunion.to_parquet(tmp_path / "geo_dataset_2.parquet", index=False)
+        session.refresh()
+
+        # Sans emprise : toute l'étendue, agrégée si besoin
+        cells = session.map_points(zoom=5, max_points=50)
+        assert cells["count"].sum() == 2020
+        assert (cells["longitude"] > 50).any()
+
+        # L'emprise autour du centre médian, elle, exclut La Réunion
+        bbox = viewport_bbox(session.map_center(), 5)
+        assert session.map_points(bbox=bbox, max_points=10_000)["longitude"].max() < 50
+
+    def test_map_points_across_antimeridian(self, session, tmp_path):
+        fiji = make_frame(30, seed=3).assign(latitude=-17.8, longitude=[178.5, -179.5, 170.0] * 10)
+        fiji.to_parquet(tmp_path / "geo_dataset_2.parquet", index=False)
+        session.refresh()
+
+        expected = {178.5, -179.5}
+        # Emprise ouest > est, ou bornes au-delà de 180 (viewport_bbox près de l'antiméridien)
+        for bbox in [(-20, 175, -15, -175), (-20, 175, -15, 185)]:
+            points = session.map_points(bbox=bbox, max_points=10_000)
+            assert set(points["longitude"]) == expected
+            assert len(points) == 20
+
+    def test_nearest_uses_table_rows(self, session):
+        df = make_frame(2000)
+        near = session.nearest(46.0, 2.0, k=3, columns=["address"])
+        dist = (df["latitude"] - 46.0) ** 2 + ((df["longitude"] - 2.0) * np.cos(np.radians(46.0))) ** 2
+        assert list(near["address"]) == list(df["address"].iloc[np.argsort(dist.to_numpy())[:3]])
+        assert near["distance_km"].is_monotonic_increasing
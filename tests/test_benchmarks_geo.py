@@ -0,0 +1,65 @@
+"""Tests pour le serveur simulé et les générateurs des benchmarks."""
+import pytest
+from benchmarks import MockGeoServer, generate_addresses, generate_enriched_dataset
+from benchmarks.run import find_regressions
+from pipeline.config import ADRESSE_CONFIG, COMMUNE_CONFIG
+from pipeline.enricher import GeoEnricher
+from pipeline.fetchers import AdresseFetcher, CommuneFetcher
+
+
+@pytest.fixture(scope="module")
+def server():
+    with MockGeoServer() as server:
+        yield server
+
+
+class TestSyntheticData:
+
+    def test_addresses_are_reproducible(self):
+        assert generate_addresses(500, seed=1) == generate_addresses(500, seed=1)
+        assert generate_addresses(500, seed=1) != generate_addresses(500, seed=2)
+
+    def test_enriched_dataset_shape(self):
+        df = generate_enriched_dataset(1000)
+        assert len(df) == 1000
+        assert df["address"].duplicated().any()
+        assert df["latitude"].isna().any()
+
+
+class TestMockGeoServer:
+
+    @pytest.mark.parametrize("mode", ["sequential", "async", "bulk"])
+    def test_enrichment_against_server(self, server, mode):
+        addresses = generate_addresses(30, seed=3, unknown_rate=0.1)
+        with GeoEnricher(
+            mode=mode,
+            geocoder=AdresseFetcher(config=server.config(ADRESSE_CONFIG)),
+            commune_fetcher=CommuneFetcher(config=server.config(COMMUNE_CONFIG)),
+        ) as enricher:
+            results = enricher.enrich_addresses(addresses)
+
+        # Les adresses non géocodables sont écartées par l'enrichisseur
+        known = [a for a in addresses if "inconnue" not in a]
+        assert len(known) < len(addresses)
+        assert [r.address for r in results] == known
+        assert all(r.commune and r.population for r in results)
+
+    def test_config_keeps_shipped_rate_limit(self, server):
+        config = server.config(ADRESSE_CONFIG)
+        assert config.base_url == server.url
+        assert config.rate_limit == ADRESSE_CONFIG.rate_limit > 0
+        assert config.burst >= config.max_concurrency
+        assert server.config(ADRESSE_CONFIG, rate_limited=False).rate_limit == 0
+
+    def test_unknown_commune_returns_none(self, server):
+        with CommuneFetcher(config=server.config(COMMUNE_CONFIG)) as fetcher:
+            assert fetcher.fetch_one("99999") is None
+
+
+class TestRegressions:
+
+    def test_detects_slower_stage(self):
+        previous = {"results": {"1k": {"stages": {"quality": {"wall_seconds": 0.5}}}}}
+        record = {"results": {"1k": {"stages": {"quality": {"wall_seconds": 0.9}}}}}
+        assert len(find_regressions(record, previous)) == 1
+        assert find_regressions(previous, record) == []
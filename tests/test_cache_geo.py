@@ -0,0 +1,83 @@
+"""Tests pour le cache persistant du géocodage."""
+import time
+from dataclasses import replace
+
+import httpx
+import pytest
+from pipeline.cache import GeocodingCache, normalize_query
+from pipeline.config import ADRESSE_CONFIG
+from pipeline.fetchers.adresse import AdresseFetcher
+from pipeline.models import GeocodingRecord, GeocodingResult
+
+
+class TestGeocodingCache:
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        with GeocodingCache(tmp_path / "geocoding.sqlite") as cache:
+            yield cache
+
+    def test_normalize_query(self):
+        assert normalize_query("  10 Rue de l'Église,   PARIS ") == "10 rue de l'eglise, paris"
+
+    def test_read_through_write_through(self, cache):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json={"features": [{
+                "geometry": {"coordinates": [2.35, 48.85]},
+                "properties": {"label": "10 Rue de l'Église 75004 Paris", "score": 0.9,
+                               "postcode": "75004", "city": "Paris", "citycode": "75104"},
+            }]})
+
+        fetcher = AdresseFetcher(transport=httpx.MockTransport(handler), cache=cache)
+        first = fetcher.fetch_one("10 rue de l'Église, Paris")
+        second = fetcher.fetch_one("10 RUE DE L'EGLISE,  paris")
+
+        assert len(calls) == 1
+        assert second.query == "10 RUE DE L'EGLISE,  paris"
+        assert second.label == first.label
+        assert fetcher.get_stats()["cache_hits"] == 1
+
+    def test_cache_hits_do_not_wait_for_rate_limit(self, cache):
+        addresses = [f"{i} rue de Rivoli, Paris" for i in range(10)]
+        for address in addresses:
+            cache.set(GeocodingRecord(query=address, label=address, latitude=48.85,
+                                      longitude=2.35, score=0.9, citycode="75104"))
+
+        def handler(request):
+            raise AssertionError("requête inattendue")
+
+        # Un jeton toutes les 0.5 s : 10 requêtes prendraient 4.5 s
+        fetcher = AdresseFetcher(
+            transport=httpx.MockTransport(handler),
+            cache=cache,
+            config=replace(ADRESSE_CONFIG, rate_limit=0.5, burst=1),
+        )
+        start = time.monotonic()
+        results = fetcher.fetch_batch(addresses) + list(fetcher.fetch_all(addresses, verbose=False))
+        assert time.monotonic() - start < 0.4
+        assert all(r.is_valid for r in results)
+        assert fetcher.get_stats()["requests_made"] == 0
+
+    def test_ttl_expiry(self, tmp_path):
+        with GeocodingCache(tmp_path / "ttl.sqlite", ttl_days=0) as cache:
+            cache.set(GeocodingResult(query="1 rue A", score=0.9))
+            assert cache.get("1 rue A") is None
+            assert len(cache) == 0
+
+    def test_size_bounded_eviction(self, tmp_path):
+        with GeocodingCache(tmp_path / "lru.sqlite", max_entries=2) as cache:
+            for q in ["1 rue A", "2 rue B", "3 rue C"]:
+                cache.set(GeocodingResult(query=q, score=0.9))
+            cache.flush()
+            assert len(cache) == 2
+            assert cache.get("1 rue A") is None
+
+    def test_reads_entries_written_from_models(self, cache):
+        model = GeocodingResult(query="1 rue A", label="1 Rue A", latitude=1.0,
+                                longitude=2.0, score=0.9, citycode="75056")
+        cache.set(model)
+        record = cache.get("1 rue a")
+        assert record.to_model() == model
@@ -0,0 +1,59 @@
+"""Tests pour les points de reprise de l'enrichissement."""
+import pytest
+from pipeline.checkpoint import EnrichmentCheckpoint
+from pipeline.enricher import GeoEnricher
+from pipeline.fetchers.adresse import AdresseFetcher
+from pipeline.fetchers.commune import CommuneFetcher
+
+
+class TestEnrichmentCheckpoint:
+
+    def test_resume_after_failure(self, tmp_path, mock_enricher):
+        addresses = [f"{i} rue de Rivoli" for i in range(5)]
+        checkpoint = EnrichmentCheckpoint.for_addresses(addresses, directory=tmp_path)
+
+        searched = []
+        with pytest.raises(RuntimeError):
+            mock_enricher(searched, fail_on=addresses[3])().enrich_addresses(
+                addresses, checkpoint=checkpoint, checkpoint_every=2
+            )
+        assert searched == addresses[:3]
+
+        resumed = EnrichmentCheckpoint.for_addresses(addresses, directory=tmp_path)
+        assert resumed.offset == 2
+
+        searched = []
+        results = mock_enricher(searched)().enrich_addresses(
+            addresses, checkpoint=resumed, checkpoint_every=2
+        )
+        assert searched == addresses[2:]
+        assert [r.query for r in results] == addresses
+
+    def test_clear(self, tmp_path):
+        checkpoint = EnrichmentCheckpoint("run", directory=tmp_path)
+        checkpoint.save([], offset=10)
+        assert EnrichmentCheckpoint("run", directory=tmp_path).offset == 10
+        checkpoint.clear()
+        assert not EnrichmentCheckpoint("run", directory=tmp_path).exists
+
+    def test_bulk_uploads_are_not_split_by_checkpoints(self, tmp_path, ban_transport, ban_csv_transport):
+        addresses = [f"{i} rue de Rivoli" for i in range(3000)]
+        checkpoint = EnrichmentCheckpoint.for_addresses(addresses, directory=tmp_path)
+
+        uploads = []
+        enricher = GeoEnricher(
+            mode="bulk",
+            batch_size=5000,
+            geocoder=AdresseFetcher(transport=ban_csv_transport(uploads)),
+            commune_fetcher=CommuneFetcher(transport=ban_transport()),
+        )
+        results = enricher.enrich_batch(addresses, checkpoint=checkpoint, checkpoint_every=1000)
+        assert uploads == [3000]
+        assert len(results) == 3000
+
+        # Pas plus grand que les envois : arrondi au multiple supérieur
+        uploads.clear()
+        checkpoint.clear()
+        enricher.batch_size = 400
+        enricher.enrich_batch(addresses, checkpoint=checkpoint, checkpoint_every=1000)
+        assert uploads == [400, 400, 400] * 2 + [400, 200]
@@ -0,0 +1,51 @@
+"""Tests pour les loaders de utils/data.py (filtres poussés dans DuckDB)."""
+import pandas as pd
+import pyarrow as pa
+import pytest
+from utils.data import build_query, filter_data, load_all_parquets, load_data
+
+
+@pytest.fixture
+def parquet_folder(tmp_path):
+    pd.DataFrame({
+        "address": ["a", "b", "c", "d"],
+        "city": ["Paris", "Lyon", "Paris", "Nice"],
+        "score": [0.9, 0.8, 0.3, 0.95],
+    }).to_parquet(tmp_path / "geo_dataset_1.parquet", index=False)
+    # Ancien run sans colonne score
+    pd.DataFrame({
+        "address": ["e"], "city": ["Lyon"],
+    }).to_parquet(tmp_path / "geo_dataset_0.parquet", index=False)
+    return tmp_path
+
+
+class TestLoaders:
+
+    def test_build_query_is_parameterized(self):
+        query, params = build_query(
+            ["city", "score"], columns=["city"],
+            filters={"city": ["Paris", "x'); DROP TABLE t; --"], "unknown": 1},
+            min_score=0.5,
+        )
+        assert query.startswith('SELECT "city" FROM read_parquet(?')
+        assert 'WHERE "city" IN (?, ?) AND "score" >= ?' in query
+        assert params == ["Paris", "x'); DROP TABLE t; --", 0.5]
+
+    def test_pushdown_matches_pandas_filters(self, parquet_folder):
+        df = load_all_parquets(parquet_folder)
+        expected = filter_data(df, {"city": ["Paris", "Lyon"]})
+        expected = expected[expected["score"] >= 0.5]
+
+        loaded = load_all_parquets(
+            parquet_folder, columns=["address", "city"],
+            filters={"city": ["Paris", "Lyon"]}, min_score=0.5,
+        )
+        assert list(loaded.columns) == ["address", "city"]
+        assert sorted(loaded["address"]) == sorted(expected["address"]) == ["a", "b"]
+
+    def test_arrow_result(self, parquet_folder):
+        table = load_data(
+            parquet_folder / "geo_dataset_1.parquet", filters={"city": "Nice"}, as_arrow=True
+        )
+        assert isinstance(table, pa.Table)
+        assert table["address"].to_pylist() == ["d"]
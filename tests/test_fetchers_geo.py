@@ -1,7 +1,16 @@
 """Tests pour les fetchers GEO (Adresse et Commune)."""
+import asyncio
+import time
+from dataclasses import replace
+
+import httpx
 import pytest
+from tenacity import wait_none
+from pipeline.cache import GeocodingCache
+from pipeline.config import ADRESSE_CONFIG
 from pipeline.fetchers.adresse import AdresseFetcher
 from pipeline.fetchers.commune import CommuneFetcher
+from pipeline.fetchers.ratelimit import TokenBucket
 from pipeline.models import GeocodingResult, CommuneInfo
 
 class TestAdresseFetcher:
@@ -43,3 +52,221 @@ class TestCommuneFetcher:
     def test_fetch_one_invalid_commune(self, fetcher):
         result = fetcher.fetch_one("00000")
         assert result is None
+
+
+class TestConnectionPool:
+    """Tests du client HTTP persistant."""
+
+    def test_client_reused_between_requests(self, ban_transport):
+        calls = []
+        fetcher = AdresseFetcher(transport=ban_transport(calls))
+        fetcher.fetch_one("10 rue de Rivoli, Paris")
+        client = fetcher.client
+        fetcher.fetch_one("1 place du Capitole, Toulouse")
+        assert fetcher.client is client
+        assert len(calls) == 2
+        assert fetcher.get_stats()["requests_made"] == 2
+
+    def test_batch_shares_one_timestamp(self, ban_transport):
+        fetcher = AdresseFetcher(transport=ban_transport())
+        results = fetcher.fetch_batch([f"{i} rue de Rivoli, Paris" for i in range(3)])
+        assert all(isinstance(r, GeocodingResult) for r in results)
+        assert len({r.fetched_at for r in results}) == 1
+
+    def test_context_manager_closes_client(self, ban_transport):
+        with AdresseFetcher(transport=ban_transport()) as fetcher:
+            fetcher.fetch_one("10 rue de Rivoli, Paris")
+            client = fetcher.client
+        assert client.is_closed
+
+
+class TestAsyncGeocoding:
+    """Tests du mode asynchrone concurrent."""
+
+    def test_fetch_many_keeps_input_order(self, ban_transport):
+        addresses = [f"{i} rue de Rivoli, Paris" for i in range(25)] + [""]
+        fetcher = AdresseFetcher(async_transport=ban_transport())
+        results = fetcher.fetch_many(addresses, concurrency=5, verbose=False)
+
+        assert all(isinstance(r, GeocodingResult) for r in results)
+        assert [r.query for r in results] == addresses
+        assert [r.label for r in results[:-1]] == addresses[:-1]
+        assert results[-1].score == 0
+        stats = fetcher.get_stats()
+        assert stats["requests_made"] == 25
+        assert stats["items_fetched"] == 25
+
+    def test_fetch_many_reuses_loop_and_client(self, ban_transport):
+        fetcher = AdresseFetcher(async_transport=ban_transport())
+        fetcher.fetch_many(["10 rue de Rivoli, Paris"], verbose=False)
+        client = fetcher._async_client
+        results = fetcher.fetch_many(["1 place du Capitole, Toulouse"], verbose=False)
+        assert fetcher._async_client is client
+        assert results[0].label == "1 place du Capitole, Toulouse"
+
+        fetcher.close()
+        assert client.is_closed
+
+    def test_fetch_many_inside_running_loop(self, ban_transport):
+        # Cas Jupyter : fetch_many appelé alors qu'une boucle tourne déjà
+        fetcher = AdresseFetcher(async_transport=ban_transport())
+
+        async def notebook_cell():
+            results = fetcher.fetch_many(["10 rue de Rivoli, Paris"], verbose=False)
+            fetcher.close()
+            return results
+
+        results = asyncio.run(notebook_cell())
+        assert results[0].label == "10 rue de Rivoli, Paris"
+        assert fetcher._runner is None
+
+
+class TestTokenBucket:
+    """Tests du limiteur à seau de jetons."""
+
+    def test_enforces_requests_per_second(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        # 1 jeton disponible + 4 jetons à 20/s = 0.2 s minimum
+        assert time.monotonic() - start >= 0.19
+
+    def test_sequential_requests_are_rate_limited(self, ban_transport):
+        calls = []
+        fetcher = AdresseFetcher(
+            transport=ban_transport(calls),
+            config=replace(ADRESSE_CONFIG, rate_limit=0.05, burst=1),
+        )
+        start = time.monotonic()
+        for i in range(5):
+            fetcher.fetch_one(f"{i} rue de Rivoli, Paris")
+        assert time.monotonic() - start >= 0.19
+        assert len(calls) == 5
+
+    def test_zero_interval_disables_limit(self):
+        bucket = TokenBucket.from_interval(0)
+        start = time.monotonic()
+        for _ in range(100):
+            bucket.acquire()
+        assert time.monotonic() - start < 0.1
+
+
+class TestBulkGeocoding:
+    """Tests du géocodage par lots CSV."""
+
+    def test_fetch_bulk_chunks_and_parses(self, ban_csv_transport):
+        calls = []
+        addresses = [f"{i} rue de Rivoli, Paris" for i in range(10)] + ["", "rue inconnue"]
+        fetcher = AdresseFetcher(transport=ban_csv_transport(calls))
+        results = fetcher.fetch_bulk(addresses, chunk_size=4, verbose=False)
+
+        assert calls == [4, 4, 3]
+        assert all(isinstance(r, GeocodingResult) for r in results)
+        assert [r.query for r in results] == addresses
+        assert results[0].label == addresses[0].upper()
+        assert results[0].is_valid
+        assert results[10].score == 0
+        assert results[11].latitude is None
+
+    def test_failed_chunk_is_split(self, ban_csv_transport):
+        calls = []
+        addresses = [f"{i} rue de Rivoli, Paris" for i in range(8)]
+        fetcher = AdresseFetcher(transport=ban_csv_transport(calls, max_rows=2))
+        results = fetcher.fetch_bulk(addresses, chunk_size=8, verbose=False)
+
+        assert calls == [8, 4, 2, 2, 4, 2, 2]
+        assert [r.query for r in results] == addresses
+        assert all(r.is_valid for r in results)
+
+    def test_failed_single_address_does_not_abort_bulk(self, tmp_path, ban_csv_transport, monkeypatch):
+        # Pas d'attente entre les tentatives du retry
+        monkeypatch.setattr(AdresseFetcher._make_request.retry, "wait", wait_none())
+        calls = []
+        addresses = ["1 rue A", "2 rue en panne", "3 rue C"]
+        csv_transport = ban_csv_transport(calls, max_rows=0)
+
+        def handler(request):
+            if request.url.params.get("q") == "2 rue en panne":
+                return httpx.Response(503)
+            return csv_transport.handle_request(request)
+
+        with GeocodingCache(tmp_path / "geocoding.sqlite") as cache:
+            fetcher = AdresseFetcher(transport=httpx.MockTransport(handler), cache=cache)
+            results = fetcher.fetch_bulk(addresses, chunk_size=3, verbose=False)
+
+            assert [r.query for r in results] == addresses
+            assert results[0].is_valid and results[2].is_valid
+            assert results[1].score == 0
+            # 5 envois CSV en échec + 3 tentatives unitaires en échec
+            assert fetcher.get_stats()["requests_failed"] == 8
+            # L'échec n'est pas mis en cache comme « adresse introuvable »
+            assert cache.get("2 rue en panne") is None
+
+    def test_csv_response_without_id_is_split(self, ban_transport):
+        single = ban_transport()
+
+        def handler(request):
+            if request.url.path == "/search/csv/":
+                return httpx.Response(200, text="q,result_label\nx,y\n")
+            return single.handle_request(request)
+
+        fetcher = AdresseFetcher(transport=httpx.MockTransport(handler))
+        results = fetcher.fetch_bulk(["1 rue A", "2 rue B"], verbose=False)
+        assert [r.label for r in results] == ["1 rue A", "2 rue B"]
+
+
+def _geo_transport(calls: list):
+    """Transport local simulant geo.api.gouv.fr (/communes et /communes/{code})."""
+    communes = {
+        "75104": {"nom": "Paris 4e Arrondissement", "codeDepartement": "75"},
+        "75105": {"nom": "Paris 5e Arrondissement", "codeDepartement": "75"},
+        "69123": {"nom": "Lyon", "codeDepartement": "69"},
+    }
+
+    def to_json(code):
+        return {"code": code, "population": 1000, "codeRegion": "11", **communes[code]}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/communes":
+            dep = request.url.params["codeDepartement"]
+            return httpx.Response(200, json=[
+                to_json(code) for code, c in communes.items() if c["codeDepartement"] == dep
+            ])
+        code = request.url.path.rsplit("/", 1)[1]
+        if code not in communes:
+            return httpx.Response(404)
+        return httpx.Response(200, json=to_json(code))
+
+    return httpx.MockTransport(handler)
+
+
+class TestCommuneCache:
+    """Tests du cache LRU et du préchargement des communes."""
+
+    def test_prefetch_one_request_per_departement(self):
+        calls = []
+        fetcher = CommuneFetcher(transport=_geo_transport(calls))
+        loaded = fetcher.prefetch(["75104", "75105", "69123", "75104"])
+        assert loaded == 3
+        assert calls == ["/communes", "/communes"]
+
+        for code in ["75104", "75105", "69123", "75104"]:
+            assert fetcher.fetch_one(code).citycode == code
+        assert len(calls) == 2
+
+        stats = fetcher.get_stats()
+        assert stats["cache_hits"] == 4
+        assert stats["cache_misses"] == 0
+
+    def test_lru_eviction_and_negative_cache(self):
+        calls = []
+        fetcher = CommuneFetcher(transport=_geo_transport(calls), cache_size=2)
+        fetcher.fetch_one("75104")
+        fetcher.fetch_one("00000")
+        assert fetcher.fetch_one("00000") is None
+        fetcher.fetch_one("69123")   # évince 75104
+        fetcher.fetch_one("75104")
+        assert calls == ["/communes/75104", "/communes/00000", "/communes/69123", "/communes/75104"]
+        assert fetcher.get_stats()["cache_hits"] == 1
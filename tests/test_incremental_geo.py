@@ -0,0 +1,66 @@
+"""Tests pour le mode incrémental du pipeline GEO."""
+import threading
+from pathlib import Path
+
+import pandas as pd
+from pipeline import main as pipeline_main
+from pipeline.incremental import select_new_addresses, upsert_dataset
+from pipeline.main import run_pipeline_geo
+from utils.analytics import AnalyticsSession
+from utils.data import list_parquets, load_all_parquets
+
+
+class TestIncremental:
+
+    def test_select_new_addresses(self):
+        existing = pd.DataFrame({
+            'address': ['10 Rue de Rivoli 75004 Paris'],
+            'query': ['10 rue de Rivoli, Paris'],
+        })
+        addresses = ['10 RUE DE RIVOLI,  Paris', '1 place Bellecour, Lyon', '1 Place Bellecour, Lyon']
+        assert select_new_addresses(addresses, existing) == ['1 place Bellecour, Lyon']
+
+    def test_upsert_dataset(self):
+        existing = pd.DataFrame({'address': ['a', 'b'], 'population': [1, 2]})
+        updates = pd.DataFrame({'address': ['b', 'c'], 'population': [20, 3]})
+        merged = upsert_dataset(existing, updates)
+        assert merged['address'].tolist() == ['a', 'b', 'c']
+        assert merged['population'].tolist() == [1, 20, 3]
+
+    def test_incremental_runs_keep_one_row_per_address(self, data_dirs, monkeypatch, mock_enricher):
+        searched = []
+        monkeypatch.setattr(pipeline_main, "GeoEnricher", mock_enricher(searched))
+
+        first = [f"{i} rue de Rivoli" for i in range(3)]
+        second = first + ["1 rue du Temple", "2 rue du Temple"]
+        snapshot = run_pipeline_geo(first, use_cache=False, incremental=True, verbose=False)["output_path"]
+        # Deux runs dans la même seconde écriraient le même fichier
+        Path(snapshot).rename(data_dirs["processed"] / "geo_dataset_20000101_000000.parquet")
+        stats = run_pipeline_geo(second, use_cache=False, incremental=True, verbose=False)
+
+        assert searched == second
+        assert stats["incremental"]["new_addresses"] == 2
+        df = load_all_parquets(data_dirs["processed"])
+        assert len(df) == 5
+        assert df["address"].nunique() == 5
+        assert list(data_dirs["processed"].glob("*.parquet")) == [Path(stats["output_path"])]
+
+    def test_store_runs_are_visible_to_readers(self, data_dirs, monkeypatch, mock_enricher):
+        monkeypatch.setattr(pipeline_main, "GeoEnricher", mock_enricher())
+
+        run_pipeline_geo([f"{i} rue de Rivoli" for i in range(3)],
+                         use_cache=False, output_format="store", verbose=False)
+        stats = run_pipeline_geo(["1 rue du Temple", "2 rue du Temple"],
+                                 use_cache=False, output_format="store", verbose=False)
+
+        # Qualité calculée sur tout le store, pas seulement sur le dernier lot
+        assert stats["quality"]["total_records"] == 5
+        for thread in threading.enumerate():
+            if thread.name == "store-compaction":
+                thread.join()
+        assert len(load_all_parquets(data_dirs["processed"])) == 5
+        assert list_parquets(data_dirs["processed"], departements=["13"]) == []
+        assert len(load_all_parquets(data_dirs["processed"], filters={"code_departement": "13"})) == 0
+        with AnalyticsSession(data_dirs["processed"]) as session:
+            session.refresh()
+            assert session.summary()["rows"] == 5
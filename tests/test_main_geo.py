@@ -0,0 +1,58 @@
+"""Tests pour la ligne de commande du pipeline GEO."""
+import pytest
+from pipeline import main as pipeline_main
+from pipeline.main import build_parser, main
+
+
+class TestCommandLine:
+
+    def test_defaults(self):
+        args = build_parser().parse_args(["adresses.csv"])
+        assert args.max_items is None  # tout le fichier
+        assert args.mode == "sequential"
+        assert args.output_format == "parquet"
+        assert args.raw_format == "ndjson.zst"
+        assert not args.incremental and not args.resume and not args.profile
+
+    def test_throughput_options(self):
+        args = build_parser().parse_args([
+            "adresses.csv", "--mode", "async", "--concurrency", "16",
+            "--batch-size", "2000", "--cache-dir", "/tmp/cache", "--incremental",
+        ])
+        assert args.concurrency == 16
+        assert args.batch_size == 2000
+        assert str(args.cache_dir) == "/tmp/cache"
+        assert args.incremental
+
+    @pytest.mark.parametrize("options", [
+        ["--concurrency", "16"],
+        ["--mode", "bulk", "--concurrency", "16"],
+        ["--batch-size", "2000"],
+        ["--mode", "async", "--batch-size", "2000"],
+    ])
+    def test_rejects_options_of_another_mode(self, options, capsys):
+        with pytest.raises(SystemExit):
+            main(["adresses.csv", *options])
+        assert "ne s'applique qu'au mode" in capsys.readouterr().err
+
+    def test_stream_rejects_incremental(self):
+        with pytest.raises(SystemExit):
+            main(["adresses.csv", "--stream", "--incremental"])
+
+    def test_stream_rejects_json_raw_format(self):
+        with pytest.raises(SystemExit):
+            main(["adresses.csv", "--stream", "--raw-format", "json"])
+
+    def test_processes_whole_file_by_default(self, tmp_path, monkeypatch):
+        path = tmp_path / "adresses.txt"
+        path.write_text("\n".join(f"{i} rue de Rivoli" for i in range(250)), encoding="utf-8")
+        calls = []
+        monkeypatch.setattr(
+            pipeline_main, "run_pipeline_geo",
+            lambda addresses, **kwargs: calls.append((addresses, kwargs)) or {}
+        )
+
+        assert main([str(path)]) == 0
+        assert main([str(path), "--max-items", "10"]) == 0
+        assert [len(addresses) for addresses, _ in calls] == [250, 10]
+        assert calls[0][1]["max_items"] is None
@@ -0,0 +1,45 @@
+"""Tests pour l'instrumentation du pipeline GEO."""
+from pipeline.metrics import PipelineMetrics, latency_percentiles, to_prometheus, write_metrics
+
+
+class TestPipelineMetrics:
+
+    def test_stage_accumulates_across_chunks(self):
+        timer = PipelineMetrics()
+        for _ in range(3):
+            with timer.stage("enrichment", rows_in=10) as stage:
+                stage["rows_out"] = 8
+
+        entry = timer.to_dict()["enrichment"]
+        assert entry["rows_in"] == 30
+        assert entry["rows_out"] == 24
+        assert entry["wall_seconds"] >= 0
+        assert entry["cpu_seconds"] >= 0
+        assert entry["rows_per_second"] > 0
+        assert "process_peak_rss_mb" in entry
+
+    def test_latency_percentiles(self):
+        latency = latency_percentiles([0.01] * 99 + [1.0])
+        assert latency["count"] == 100
+        assert latency["p50"] == 10.0
+        assert latency["max"] == 1000.0
+        assert latency_percentiles([]) == {"count": 0}
+
+    def test_prometheus_textfile(self):
+        text = to_prometheus({
+            "stages": {"quality": {"wall_seconds": 0.5, "rows_in": 10}},
+            "http_latency_ms": {"geocoder": {"count": 3, "p95": 12.5}},
+            "duration_seconds": 1.5,
+        })
+        assert 'geo_pipeline_stage_wall_seconds{stage="quality"} 0.5' in text
+        assert 'geo_pipeline_http_requests_total{fetcher="geocoder"} 3' in text
+        assert 'geo_pipeline_http_latency_ms{fetcher="geocoder",stat="p95"} 12.5' in text
+        assert "geo_pipeline_duration_seconds 1.5" in text
+
+    def test_prometheus_file_is_replaced_in_place(self, data_dirs):
+        first = write_metrics({"duration_seconds": 1.0}, "run", "prometheus")
+        second = write_metrics({"duration_seconds": 2.0}, "run", "prometheus")
+
+        assert first == second == data_dirs["reports"] / "run.prom"
+        assert "geo_pipeline_duration_seconds 2.0" in second.read_text()
+        assert [p.name for p in data_dirs["reports"].iterdir()] == ["run.prom"]
@@ -1,7 +1,8 @@
 """Tests pour QualityAnalyzer GEO."""
 import pytest
 import pandas as pd
-from pipeline.quality import QualityAnalyzer
+import numpy as np
+from pipeline.quality import QualityAnalyzer, QualityAccumulator, HyperLogLog
 
 class TestQualityAnalyzer:
 
@@ -22,3 +23,88 @@ class TestQualityAnalyzer:
         assert metrics.valid_records == 3
         assert metrics.quality_grade in ['A', 'B', 'C', 'D', 'F']
         assert metrics.is_acceptable is True
+
+    def test_accumulator_matches_analyzer(self, sample_df):
+        df = pd.concat([sample_df, sample_df.iloc[[0]]], ignore_index=True)
+        df.loc[1, 'city'] = None
+        expected = QualityAnalyzer(df).analyze()
+
+        accumulator = QualityAccumulator()
+        for start in range(0, len(df), 2):
+            accumulator.update(df.iloc[start:start + 2])
+
+        metrics = accumulator.to_metrics()
+        # l'ordre de sommation peut changer le dernier chiffre arrondi
+        assert metrics.avg_geocoding_score == pytest.approx(expected.avg_geocoding_score, abs=2e-3)
+        assert metrics.dict(exclude={'avg_geocoding_score'}) == expected.dict(exclude={'avg_geocoding_score'})
+
+    def test_single_pass_matches_pandas(self, sample_df):
+        df = pd.concat([sample_df, sample_df.iloc[[1]]], ignore_index=True)
+        df.loc[0, 'score'] = None
+        df.loc[2, 'city'] = None
+
+        analyzer = QualityAnalyzer(df)
+        metrics = analyzer.analyze()
+
+        assert metrics.null_counts == df.isnull().sum().to_dict()
+        assert metrics.duplicates_count == df.duplicated(subset=['address']).sum()
+        assert metrics.completeness_score == round(df.notna().sum().sum() / df.size, 3)
+        valid = df['score'] >= 0.5
+        assert metrics.avg_geocoding_score == round(df.loc[valid, 'score'].mean(), 3)
+        # Le rapport réutilise les comptages déjà calculés
+        assert analyzer.summary() is analyzer.summary()
+
+    def test_from_parquet_matches_dataframe(self, sample_df, tmp_path):
+        df = pd.concat([sample_df, sample_df.iloc[[0]]], ignore_index=True)
+        df.loc[1, 'city'] = None
+        df.iloc[:2].to_parquet(tmp_path / "part_1.parquet")
+        df.iloc[2:].to_parquet(tmp_path / "part_2.parquet")
+
+        expected = QualityAnalyzer(df).analyze()
+        assert QualityAnalyzer.from_parquet(tmp_path).analyze() == expected
+        assert QualityAnalyzer.from_parquet(tmp_path / "part_*.parquet").analyze() == expected
+
+    def test_from_parquet_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            QualityAnalyzer.from_parquet(tmp_path / "absent.parquet")
+
+
+class TestQualityAccumulatorMerge:
+
+    @pytest.fixture
+    def df(self):
+        rng = np.random.default_rng(0)
+        addresses = [f"{i} rue test" for i in rng.integers(0, 300, 1000)]
+        scores = rng.uniform(0, 1, 1000)
+        scores[::7] = np.nan
+        return pd.DataFrame({"address": addresses, "score": scores})
+
+    def test_partial_merge_matches_analyzer(self, df):
+        expected = QualityAnalyzer(df).analyze()
+        parts = [QualityAccumulator().update(df.iloc[i:i + 150]) for i in range(0, len(df), 150)]
+
+        merged = QualityAccumulator.combine(reversed(parts)).to_metrics()
+        assert merged.duplicates_count == expected.duplicates_count
+        assert merged.null_counts == expected.null_counts
+        assert merged.avg_geocoding_score == pytest.approx(expected.avg_geocoding_score, abs=2e-3)
+
+    def test_merge_is_associative(self, df):
+        a, b, c = (QualityAccumulator().update(df.iloc[i:i + 400]) for i in (0, 400, 800))
+        assert ((a + b) + c).to_metrics() == (a + (b + c)).to_metrics()
+        # + ne modifie pas ses opérandes
+        assert a.total_records == 400
+
+    def test_hyperloglog_estimate(self, df):
+        hll = QualityAccumulator("hll", sketch_error=0.02).update(df)
+        distinct = df["address"].nunique()
+        assert hll.sketch.count() == pytest.approx(distinct, rel=0.05)
+
+        big = HyperLogLog(0.01)
+        big.add(pd.util.hash_pandas_object(pd.Series(range(200_000)), index=False).to_numpy())
+        assert big.count() == pytest.approx(200_000, rel=0.03)
+
+    def test_incompatible_sketches(self, df):
+        with pytest.raises(ValueError):
+            QualityAccumulator("exact").merge(QualityAccumulator("hll"))
+        with pytest.raises(ValueError):
+            QualityAccumulator("hll", 0.01).merge(QualityAccumulator("hll", 0.1))
@@ -0,0 +1,90 @@
+"""Tests pour l'index spatial (utils/spatial.py) et les loaders associés."""
+import numpy as np
+import pandas as pd
+import pytest
+from utils.data import load_nearest, load_rows, open_spatial_index
+from utils.spatial import SpatialIndex, haversine_km
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = np.random.default_rng(0)
+    lat = rng.normal(48.85, 0.2, 20_000)
+    lon = rng.normal(2.35, 0.2, 20_000)
+    lat[::100] = np.nan  # points sans coordonnées
+    return lat, lon
+
+
+class TestSpatialIndex:
+
+    def test_queries_match_brute_force(self, points):
+        lat, lon = points
+        index = SpatialIndex.build(lat, lon)
+        dist = haversine_km(48.86, 2.34, lat, lon)
+
+        rows, km = index.within_radius(48.86, 2.34, 2.0)
+        assert set(rows) == set(np.flatnonzero(dist <= 2.0))
+        assert np.all(np.diff(km) >= 0)
+
+        rows, km = index.k_nearest(48.86, 2.34, k=15)
+        expected = np.argsort(np.nan_to_num(dist, nan=np.inf))[:15]
+        assert list(rows) == list(expected)
+        np.testing.assert_allclose(km, dist[expected])
+
+        bbox = (lat >= 48.8) & (lat <= 48.9) & (lon >= 2.2) & (lon <= 2.5)
+        assert set(index.within_bbox(48.8, 2.2, 48.9, 2.5)) == set(np.flatnonzero(bbox))
+
+    def test_queries_across_antimeridian(self):
+        # Points de part et d'autre de ±180 (Wallis-et-Futuna, Fidji)
+        rng = np.random.default_rng(1)
+        lat = rng.uniform(-15, -12, 5000)
+        lon = rng.uniform(175, 185, 5000)
+        lon[lon > 180] -= 360
+        index = SpatialIndex.build(lat, lon)
+        dist = haversine_km(-13.5, 179.99, lat, lon)
+
+        rows, _ = index.within_radius(-13.5, 179.99, 50)
+        expected = np.flatnonzero(dist <= 50)
+        assert (lon[expected] < 0).any() and (lon[expected] > 0).any()
+        assert set(rows) == set(expected)
+
+        rows, _ = index.k_nearest(-13.5, -179.99, k=20)
+        dist = haversine_km(-13.5, -179.99, lat, lon)
+        assert list(rows) == list(np.argsort(dist)[:20])
+
+        # lon_min > lon_max : emprise traversant l'antiméridien
+        bbox = (lat >= -14) & (lat <= -13) & ((lon >= 179.5) | (lon <= -179.5))
+        assert set(index.within_bbox(-14, 179.5, -13, -179.5)) == set(np.flatnonzero(bbox))
+        assert set(index.within_bbox(-14, 179.5, -13, 180.5)) == set(np.flatnonzero(bbox))
+
+    def test_save_and_load_memory_mapped(self, points, tmp_path):
+        lat, lon = points
+        index = SpatialIndex.build(lat, lon, meta={"source": "test"})
+        loaded = SpatialIndex.load(index.save(tmp_path / "index"))
+
+        assert isinstance(loaded.latitude, np.memmap)
+        assert loaded.meta == {"source": "test"}
+        assert list(loaded.k_nearest(48.9, 2.4, k=5)[0]) == list(index.k_nearest(48.9, 2.4, k=5)[0])
+
+    def test_empty_index(self):
+        rows, km = SpatialIndex.build([], []).k_nearest(48.86, 2.34, k=3)
+        assert len(rows) == len(km) == 0
+
+
+class TestSpatialLoaders:
+
+    def test_index_follows_parquet_rows(self, points, tmp_path):
+        lat, lon = points
+        df = pd.DataFrame({"address": [f"a{i}" for i in range(len(lat))], "latitude": lat, "longitude": lon})
+        df.iloc[:12_000].to_parquet(tmp_path / "geo_dataset_1.parquet", index=False, row_group_size=5000)
+        df.iloc[12_000:].to_parquet(tmp_path / "geo_dataset_2.parquet", index=False, row_group_size=5000)
+
+        index = open_spatial_index(tmp_path)
+        assert open_spatial_index(tmp_path).meta == index.meta  # réutilisé tel quel
+
+        near = load_nearest(tmp_path, 48.86, 2.34, k=5)
+        rows, km = index.k_nearest(48.86, 2.34, k=5)
+        assert list(near["address"]) == list(df["address"].iloc[rows])
+        np.testing.assert_allclose(near["distance_km"], km)
+
+        assert list(load_rows(tmp_path, [19_999, 3, 12_000])["address"]) == ["a19999", "a3", "a12000"]
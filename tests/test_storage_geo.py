@@ -0,0 +1,101 @@
+"""Tests pour le stockage du dataset GEO."""
+import pandas as pd
+import pytest
+from pipeline.batch import EnrichedBatch
+from pipeline.models import EnrichedAddress
+from pipeline.storage import (
+    GEO_DATASET_SCHEMA, RawWriter, iter_raw, load_parquet, load_raw, save_parquet, save_raw,
+    to_geo_frame,
+)
+from pipeline.transformer import DataTransformer
+
+
+class TestGeoFrame:
+
+    def _records(self):
+        return [
+            EnrichedAddress(
+                address=f"{i} rue de la Paix 75001 Paris", latitude=48.86, longitude=2.33,
+                score=0.9, city="Paris", postcode="75001", citycode="75056",
+                commune="Paris", population=2133111,
+            ).dict()
+            for i in range(3)
+        ]
+
+    def test_fixed_schema_and_dtypes(self):
+        df = to_geo_frame(self._records())
+        assert list(df.columns) == GEO_DATASET_SCHEMA.names
+        assert df['address'].dtype == pd.StringDtype("pyarrow")
+        assert isinstance(df['city'].dtype, pd.CategoricalDtype)
+        # Sans enregistrement, le schéma reste le même
+        assert list(to_geo_frame([]).dtypes.astype(str)) == list(df.dtypes.astype(str))
+
+    def test_parquet_roundtrip_keeps_dtypes(self, tmp_path):
+        df = to_geo_frame(self._records())
+        loaded = load_parquet(save_parquet(df, "geo_dataset", folder=tmp_path))
+        pd.testing.assert_frame_equal(loaded, df)
+
+    def test_transformer_keeps_typed_columns(self):
+        df = to_geo_frame(self._records())
+        df['city'] = pd.Categorical([' Paris', 'PARIS', None])
+        result = (
+            DataTransformer(df)
+            .handle_missing_values(text_strategy='unknown')
+            .normalize_text_columns(['city', 'address'])
+            .get_result()
+        )
+        assert result['city'].tolist() == ['paris', 'paris', 'unknown']
+        assert isinstance(result['city'].dtype, pd.CategoricalDtype)
+        assert result['address'].dtype == pd.StringDtype("pyarrow")
+
+    @pytest.mark.parametrize("raw_format", ["json", "ndjson", "ndjson.gz", "ndjson.zst", "arrow"])
+    def test_raw_dump_roundtrip(self, tmp_path, raw_format):
+        df = to_geo_frame(self._records())
+        path = save_raw(df, "geo_enriched_raw", raw_format, folder=tmp_path)
+        assert path.name.endswith(f".{raw_format}")
+        pd.testing.assert_frame_equal(load_raw(path), df, check_categorical=False)
+
+    def test_raw_writer_streams_chunks(self, tmp_path):
+        df = to_geo_frame(self._records())
+        with RawWriter("geo_enriched_raw", "arrow", folder=tmp_path) as writer:
+            writer.write(df.iloc[:2])
+            # Lot suivant avec d'autres catégories
+            writer.write(df.iloc[2:].assign(city=pd.Categorical(["Lyon"])))
+        records = list(iter_raw(writer.filepath))
+        assert [r["city"] for r in records] == ["Paris", "Paris", "Lyon"]
+        assert writer.rows_written == 3
+
+
+class TestEnrichedBatch:
+
+    def _batch(self):
+        batch = EnrichedBatch()
+        for i, city in enumerate(["Paris", "Lyon", "Paris"]):
+            batch.append(
+                address=f"{i} rue Pasteur", latitude=45.0 + i, longitude=4.0, score=0.8,
+                city=city, postcode="69001", citycode="69123", commune=city,
+                population=1000 * i, query=f"{i} rue pasteur",
+            )
+        return batch
+
+    def test_matches_models(self):
+        batch = self._batch()
+        models = batch.to_models()
+        assert [m.city for m in models] == ["Paris", "Lyon", "Paris"]
+        pd.testing.assert_frame_equal(
+            batch.to_frame(), to_geo_frame([m.dict() for m in models]), check_categorical=False
+        )
+
+    def test_arrow_roundtrip(self):
+        batch = self._batch()
+        assert EnrichedBatch.from_arrow(batch.to_arrow()).columns == batch.columns
+
+    def test_validation(self):
+        batch = self._batch()
+        batch.columns["commune"][1] = None
+        with pytest.raises(ValueError, match="commune"):
+            batch.to_arrow()
+        batch.columns["commune"][1] = "Lyon"
+        batch.columns["latitude"][0] = "nord"
+        with pytest.raises(ValueError, match="latitude"):
+            batch.to_arrow()
@@ -0,0 +1,83 @@
+"""Tests pour le dataset partitionné (DatasetStore)."""
+import pandas as pd
+from pipeline.quality import resolve_parquet_files
+from pipeline.store import DatasetStore, departement_codes
+from pipeline.storage import apply_geo_dtypes
+
+
+def make_frame(rows: list[tuple[str, str, float]]) -> pd.DataFrame:
+    """Lignes (adresse, code INSEE, score) au format du dataset GEO."""
+    return apply_geo_dtypes(pd.DataFrame({
+        "address": [address for address, _, _ in rows],
+        "latitude": 48.0,
+        "longitude": 2.0,
+        "score": [score for _, _, score in rows],
+        "city": "Ville",
+        "postcode": "00000",
+        "citycode": [citycode for _, citycode, _ in rows],
+        "commune": "Ville",
+        "population": 1000,
+        "query": [address for address, _, _ in rows],
+        "fetched_at": pd.Timestamp("2024-01-01"),
+    }))
+
+
+class TestDatasetStore:
+
+    def test_departement_codes(self):
+        codes = departement_codes(pd.Series(["75056", "2A004", "97411", "unknown", None]))
+        assert list(codes) == ["75", "2A", "974", "inconnu", "inconnu"]
+
+    def test_append_partitions_and_manifest(self, tmp_path):
+        store = DatasetStore(tmp_path)
+        store.append(make_frame([("a", "75056", 0.9), ("b", "69123", 0.5), ("c", "75101", 0.7)]))
+
+        assert store.partitions() == {"69": 1, "75": 2}
+        assert (tmp_path / "code_departement=75").is_dir()
+        entry = next(e for e in store.manifest()["files"] if e["partition"] == "75")
+        assert entry["rows"] == 2
+        assert entry["stats"]["score"] == {"min": 0.7, "max": 0.9, "nulls": 0}
+
+    def test_read_prunes_partitions_and_ranges(self, tmp_path):
+        store = DatasetStore(tmp_path)
+        store.append(make_frame([("a", "75056", 0.9), ("b", "69123", 0.5)]))
+        store.append(make_frame([("c", "75056", 0.3)]))
+
+        assert len(store.files(departements=["75"])) == 2
+        # Le second fichier de Paris (score max 0.3) n'est pas lu
+        assert len(store.files(departements=["75"], where={"score": (0.8, None)})) == 1
+        df = store.read(where={"score": (0.4, None)})
+        assert sorted(df["address"]) == ["a", "b"]
+        assert set(df["code_departement"]) == {"75", "69"}
+
+    def test_upsert_replaces_across_partitions(self, tmp_path):
+        store = DatasetStore(tmp_path)
+        store.upsert(make_frame([("a", "75056", 0.9), ("b", "69123", 0.5)]))
+        # "b" change de commune : il quitte la partition 69
+        store.upsert(make_frame([("b", "13055", 0.6), ("c", "13055", 0.8)]))
+
+        df = store.read().set_index("address")
+        assert len(store) == 3
+        assert df.loc["b", "code_departement"] == "13"
+        assert df.loc["b", "score"] == 0.6
+        assert "69" not in store.partitions()
+        # Les fichiers remplacés sont supprimés
+        on_disk = {p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.parquet")}
+        assert on_disk == {e["path"] for e in store.manifest()["files"]}
+
+    def test_background_compaction(self, tmp_path):
+        store = DatasetStore(tmp_path)
+        for i in range(4):
+            store.append(make_frame([(f"a{i}", "75056", 0.5), (f"b{i}", "69123", 0.5)]))
+        before = store.read().sort_values("address", ignore_index=True)
+
+        store.compact_in_background(min_rows=10).join()
+
+        assert len(store.manifest()["files"]) == 2
+        after = store.read().sort_values("address", ignore_index=True)
+        pd.testing.assert_frame_equal(after, before)
+
+    def test_quality_reads_store_files(self, tmp_path):
+        store = DatasetStore(tmp_path)
+        store.append(make_frame([("a", "75056", 0.9), ("b", "69123", 0.5)]))
+        assert sorted(resolve_parquet_files(tmp_path)) == sorted(store.files())
@@ -0,0 +1,58 @@
+"""Tests pour le pipeline GEO en streaming."""
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+from pipeline import streaming
+from pipeline.storage import GEO_DATASET_SCHEMA
+from pipeline.streaming import SeenAddresses, chunked, iter_addresses, run_pipeline_geo_streaming
+
+
+class TestStreaming:
+
+    def test_iter_addresses_csv(self, tmp_path):
+        path = tmp_path / "addresses.csv"
+        path.write_text("id,address\n1,10 rue de Rivoli\n2,\n3,1 place Bellecour\n", encoding="utf-8")
+        assert list(iter_addresses(path)) == ["10 rue de Rivoli", "1 place Bellecour"]
+
+    def test_iter_addresses_text(self, tmp_path):
+        path = tmp_path / "addresses.txt"
+        path.write_text("10 rue de Rivoli\n\n 1 place Bellecour \n", encoding="utf-8")
+        assert list(iter_addresses(path)) == ["10 rue de Rivoli", "1 place Bellecour"]
+
+    def test_chunked(self):
+        assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_unknown_raw_format_leaves_no_partial_file(self, data_dirs, tmp_path):
+        path = tmp_path / "addresses.txt"
+        path.write_text("10 rue de Rivoli\n", encoding="utf-8")
+        with pytest.raises(ValueError):
+            run_pipeline_geo_streaming(path, raw_format="json", use_cache=False)
+        assert not list(data_dirs["processed"].iterdir())
+        assert not list(data_dirs["raw"].iterdir())
+
+    def test_seen_addresses_across_chunks(self, tmp_path):
+        with SeenAddresses(tmp_path) as seen:
+            assert seen.add(np.array([1, 2, 2**63 + 5], dtype=np.uint64)).tolist() == [True, True, True]
+            assert seen.add(np.array([2, 3, 2**63 + 5], dtype=np.uint64)).tolist() == [False, True, False]
+            assert len(seen) == 4
+        assert not list(tmp_path.iterdir())
+
+    def test_pipeline_writes_one_row_group_per_chunk(self, data_dirs, tmp_path, monkeypatch, mock_enricher):
+        monkeypatch.setattr(streaming, "GeoEnricher", mock_enricher())
+
+        # 25 adresses dont 5 déjà vues dans un lot précédent
+        addresses = [f"{i} rue de Rivoli" for i in range(20)] + [f"{i} rue de Rivoli" for i in range(5)]
+        path = tmp_path / "addresses.txt"
+        path.write_text("\n".join(addresses), encoding="utf-8")
+
+        stats = run_pipeline_geo_streaming(path, chunk_size=10, use_cache=False)
+
+        assert stats["chunks"] == 3
+        assert stats["rows_out"] == 20
+        parquet = pq.ParquetFile(stats["output_path"])
+        assert parquet.metadata.num_row_groups == 2  # le dernier lot n'a que des doublons
+        assert parquet.schema_arrow == GEO_DATASET_SCHEMA
+        df = parquet.read().to_pandas()
+        assert df["address"].is_unique and len(df) == 20
+        assert stats["quality"]["duplicates_count"] == 0
+        assert not list(data_dirs["processed"].glob("*.tmp"))
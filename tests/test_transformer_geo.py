@@ -34,3 +34,65 @@ class TestDataTransformer:
         df = transformer.normalize_text_columns(['city']).get_result()
         assert all(isinstance(c, str) for c in df['city'])
         assert all(c == c.strip().lower() or c == 'unknown' for c in df['city'])
+
+    def test_lazy_plan_matches_eager(self, sample_df):
+        sample_df.loc[0, 'city'] = '  Paris\t'
+
+        def chain(transformer):
+            return (
+                transformer
+                .remove_duplicates(subset=['address'])
+                .handle_missing_values(numeric_strategy='median', text_strategy='unknown')
+                .normalize_text_columns(['city'])
+                .add_derived_columns()
+            )
+
+        eager = chain(DataTransformer(sample_df))
+        lazy = chain(DataTransformer(sample_df, lazy=True))
+        # Rien n'est exécuté avant get_result()
+        assert lazy.transformations_applied == []
+
+        expected = eager.get_result().reset_index(drop=True)
+        pd.testing.assert_frame_equal(lazy.get_result(), expected)
+        assert lazy.transformations_applied == eager.transformations_applied
+
+    def test_lazy_custom_step_splits_plan(self, sample_df):
+        transformer = (
+            DataTransformer(sample_df, lazy=True)
+            .remove_duplicates(subset=['address'])
+            .apply_custom(lambda df: df[df['score'].notna()], "Géocodées")
+            .normalize_text_columns(['city'])
+        )
+        df = transformer.get_result()
+        assert df['city'].tolist() == ['paris']
+        assert transformer.transformations_applied[1] == "Custom: Géocodées"
+        # La source n'est pas modifiée
+        assert sample_df['city'].tolist() == ['Paris', None, 'Paris']
+
+    def test_parallel_matches_eager(self, sample_df, monkeypatch):
+        # Force le passage par le pool de processus malgré la petite taille
+        monkeypatch.setattr("pipeline.transformer.PARALLEL_MIN_ROWS", 0)
+        monkeypatch.setattr("pipeline.transformer.usable_cpus", lambda: 2)
+        sample_df = pd.concat([sample_df] * 4, ignore_index=True)
+        sample_df['address'] = [f'Addr {i % 7}' for i in range(len(sample_df))]
+        sample_df.loc[0, 'city'] = '  Paris\t'
+
+        def chain(transformer):
+            return (
+                transformer
+                .remove_duplicates(subset=['address'])
+                .handle_missing_values(numeric_strategy='median', text_strategy='unknown')
+                .normalize_text_columns()
+                .add_derived_columns()
+            )
+
+        eager = chain(DataTransformer(sample_df))
+        parallel = chain(DataTransformer(sample_df, n_jobs=2))
+        assert parallel.transformations_applied == []
+
+        pd.testing.assert_frame_equal(parallel.get_result(), eager.get_result())
+        assert parallel.transformations_applied == eager.transformations_applied
+
+    def test_lazy_and_parallel_are_exclusive(self, sample_df):
+        with pytest.raises(ValueError):
+            DataTransformer(sample_df, lazy=True, n_jobs=2)
@@ -0,0 +1,402 @@
+"""
+Session DuckDB longue durée pour le dashboard.
+
+Le dataset traité est chargé une fois dans une table DuckDB en mémoire, avec
+une table d'agrégats (cube ville × tranche de score) recalculée seulement
+quand un Parquet est ajouté ou modifié. Les interactions du dashboard
+(filtre ville, score minimal) deviennent des requêtes sur quelques centaines
+de lignes pré-agrégées au lieu de groupby/corr pandas à chaque rerun.
+"""
+
+import threading
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .data import PARQUET_SOURCE, _quote, _to_pandas, build_query, build_where, list_parquets
+from .spatial import SpatialIndex
+
+# Largeur des tranches de score du cube (pas du curseur du dashboard)
+SCORE_BIN_WIDTH = 0.05
+# round : 0.15 / 0.05 vaut 2.999… en flottant
+SCORE_BIN_SQL = f"CAST(floor(round(score / {SCORE_BIN_WIDTH}, 9)) AS INTEGER)"
+
+# Dimensions du cube et leur expression sur les lignes brutes
+CUBE_DIMENSIONS = {"city": "city", "score_bin": SCORE_BIN_SQL}
+
+# Au-delà, la carte reçoit des cellules de grille agrégées plutôt que des points
+MAP_MAX_POINTS = 20_000
+# Cellules de grille par tuile de carte (256 px) : une cellule pour ~8 px
+MAP_CELLS_PER_TILE = 32
+# Colonnes envoyées à la carte (survol)
+MAP_COLUMNS = ["latitude", "longitude", "city", "commune", "population", "score"]
+
+
+def viewport_bbox(
+    center: tuple[float, float],
+    zoom: float,
+    width_px: int = 1200,
+    height_px: int = 650,
+) -> tuple[float, float, float, float]:
+    """
+    Emprise (lat_min, lon_min, lat_max, lon_max) d'une carte web mercator
+    de `width_px` × `height_px` centrée sur `center` (lat, lon) au niveau `zoom`.
+    """
+    lat, lon = center
+    lon_span = 360 / 2 ** zoom * width_px / 256
+    lat_span = lon_span * height_px / width_px * np.cos(np.radians(lat))
+    return (
+        max(lat - lat_span / 2, -90.0), lon - lon_span / 2,
+        min(lat + lat_span / 2, 90.0), lon + lon_span / 2,
+    )
+
+
+class AnalyticsSession:
+    """
+    Connexion DuckDB partagée (ex. `st.cache_resource`) sur les Parquet
+    d'un dossier :
+
+        session = AnalyticsSession("data/processed")
+        session.refresh()                       # à chaque rerun, quasi gratuit
+        session.population_by_city({"city": ["Paris"]}, min_score=0.5)
+
+    Chaque requête passe par son propre curseur : la session peut servir
+    plusieurs threads Streamlit.
+    """
+
+    def __init__(
+        self,
+        folder: str | Path,
+        database: str = ":memory:",
+        departements: list[str] | None = None
+    ):
+        self.folder = Path(folder)
+        # Partitions chargées si le dossier contient un DatasetStore (toutes si None)
+        self.departements = departements
+        self.con = duckdb.connect(database)
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self.columns: list[str] = []
+        self.numeric_columns: list[str] = []
+        self._measures: dict[str, str] = {}
+        self._has_cube = False
+        self._spatial = None
+
+    def close(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ==========================================================
+    # Chargement et agrégats matérialisés
+    # ==========================================================
+
+    def _files(self) -> list[Path]:
+        return list_parquets(self.folder, self.departements)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Recharge le dataset et les agrégats si les Parquet ont changé (noms,
+        tailles, dates de modification). Retourne True si rechargé.
+        """
+        files = self._files()
+        fingerprint = [(f.as_posix(), f.stat().st_size, f.stat().st_mtime_ns) for f in files]
+        with self._lock:
+            if fingerprint == self._fingerprint and not force:
+                return False
+
+            cursor = self.con.cursor()
+            # Transaction : les requêtes concurrentes voient l'ancien ou le nouvel état
+            cursor.execute("BEGIN TRANSACTION")
+            cursor.execute(
+                f"CREATE OR REPLACE TABLE geo AS SELECT * FROM {PARQUET_SOURCE}",
+                [[f.as_posix() for f in files]]
+            )
+            schema = cursor.execute("DESCRIBE geo").fetchall()
+            self.columns = [name for name, *_ in schema]
+            self.numeric_columns = [
+                name for name, kind, *_ in schema
+                if kind in {"DOUBLE", "FLOAT", "BIGINT", "INTEGER", "SMALLINT", "TINYINT", "HUGEINT"}
+            ]
+            self._measures = self._cube_measures()
+            self._has_cube = {"city", "score"} <= set(self.columns)
+
+            if self._has_cube:
+                dimensions = ", ".join(f"{sql} AS {name}" for name, sql in CUBE_DIMENSIONS.items())
+                measures = ", ".join(f"{sql} AS {_quote(name)}" for name, sql in self._measures.items())
+                cursor.execute(
+                    f"CREATE OR REPLACE TABLE geo_cube AS "
+                    f"SELECT {dimensions}, {measures} FROM geo GROUP BY ALL"
+                )
+            else:
+                cursor.execute("DROP TABLE IF EXISTS geo_cube")
+            cursor.execute("COMMIT")
+            self._fingerprint = fingerprint
+            self._spatial = None
+        return True
+
+    def _cube_measures(self) -> dict[str, str]:
+        """
+        Mesures additives du cube : effectifs, sommes de population et
+        statistiques suffisantes de la corrélation de chaque paire de
+        colonnes numériques (lignes où les deux valeurs sont renseignées).
+        """
+        measures = {"n": "count(*)"}
+        if "population" in self.columns:
+            measures["population_n"] = "count(population)"
+            measures["population_sum"] = "CAST(sum(population) AS DOUBLE)"
+
+        numeric = self.numeric_columns
+        for i, a in enumerate(numeric):
+            for j in range(i, len(numeric)):
+                x = f"CAST({_quote(a)} AS DOUBLE)"
+                y = f"CAST({_quote(numeric[j])} AS DOUBLE)"
+                both = f"{_quote(a)} IS NOT NULL AND {_quote(numeric[j])} IS NOT NULL"
+                measures[f"corr_{i}_{j}_n"] = f"count(*) FILTER ({both})"
+                measures[f"corr_{i}_{j}_x"] = f"sum({x}) FILTER ({both})"
+                measures[f"corr_{i}_{j}_y"] = f"sum({y}) FILTER ({both})"
+                measures[f"corr_{i}_{j}_xx"] = f"sum({x} * {x}) FILTER ({both})"
+                measures[f"corr_{i}_{j}_yy"] = f"sum({y} * {y}) FILTER ({both})"
+                measures[f"corr_{i}_{j}_xy"] = f"sum({x} * {y}) FILTER ({both})"
+        return measures
+
+    def _uses_cube(self, filters: dict | None, min_score: float | None) -> bool:
+        """Le cube répond si les filtres portent sur la ville et le score (tranche entière)."""
+        if not self._has_cube:
+            return False
+        if any(col in self.columns and col != "city" for col in (filters or {})):
+            return False
+        if min_score is None:
+            return True
+        bins = min_score / SCORE_BIN_WIDTH
+        return abs(bins - round(bins)) < 1e-9
+
+    def _aggregate(
+        self,
+        measures: list[str],
+        group_by: list[str] | None = None,
+        filters: dict | None = None,
+        min_score: float | None = None,
+    ) -> pd.DataFrame:
+        """Mesures du cube (ou recalculées sur la table brute) groupées par dimensions."""
+        group_by = group_by or []
+        if self._uses_cube(filters, min_score):
+            source = "geo_cube"
+            dimensions = group_by
+            values = [f"sum({_quote(m)}) AS {_quote(m)}" for m in measures]
+            where, params = build_where(["city"], filters)
+            if min_score is not None:
+                where += (" AND " if where else " WHERE ") + "score_bin >= ?"
+                params.append(round(min_score / SCORE_BIN_WIDTH))
+        else:
+            source = "geo"
+            dimensions = [f"{CUBE_DIMENSIONS[d]} AS {d}" for d in group_by]
+            values = [f"{self._measures[m]} AS {_quote(m)}" for m in measures]
+            where, params = build_where(self.columns, filters, min_score)
+
+        query = f"SELECT {', '.join(dimensions + values)} FROM {source}{where}"
+        if group_by:
+            query += f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+        return self.con.cursor().execute(query, params).df()
+
+    # ==========================================================
+    # Requêtes du dashboard
+    # ==========================================================
+
+    def cities(self) -> list[str]:
+        query = "SELECT DISTINCT city FROM geo WHERE city IS NOT NULL ORDER BY city"
+        return [city for (city,) in self.con.cursor().execute(query).fetchall()]
+
+    def summary(self, filters: dict | None = None, min_score: float | None = None) -> dict:
+        """Nombre de lignes, population moyenne et villes distinctes."""
+        measures = ["n"] + (["population_n", "population_sum"] if "population" in self.columns else [])
+        by_city = self._aggregate(measures, ["city"], filters, min_score)
+        rows = int(by_city["n"].sum())
+        population = (
+            by_city["population_sum"].sum() / by_city["population_n"].sum()
+            if "population_n" in by_city and by_city["population_n"].sum() else float("nan")
+        )
+        return {
+            "rows": rows,
+            "population_mean": population,
+            "cities": int(by_city.loc[by_city["n"] > 0, "city"].notna().sum()),
+        }
+
+    def population_by_city(self, filters: dict | None = None, min_score: float | None = None) -> pd.DataFrame:
+        """Population moyenne par ville, décroissante."""
+        agg = self._aggregate(["population_n", "population_sum"], ["city"], filters, min_score)
+        agg = agg[agg["city"].notna() & (agg["population_n"] > 0)]
+        return (
+            agg.assign(population=agg["population_sum"] / agg["population_n"])[["city", "population"]]
+            .sort_values("population", ascending=False, ignore_index=True)
+        )
+
+    def score_histogram(self, filters: dict | None = None, min_score: float | None = None) -> pd.DataFrame:
+        """Effectifs par tranche de score de largeur SCORE_BIN_WIDTH."""
+        agg = self._aggregate(["n"], ["score_bin"], filters, min_score)
+        agg = agg[agg["score_bin"].notna()]
+        return pd.DataFrame({
+            "score": agg["score_bin"].to_numpy() * SCORE_BIN_WIDTH,
+            "count": agg["n"].to_numpy(),
+        })
+
+    def correlation_matrix(self, filters: dict | None = None, min_score: float | None = None) -> pd.DataFrame:
+        """Corrélations de Pearson (paires de valeurs renseignées, comme DataFrame.corr)."""
+        numeric = self.numeric_columns
+        measures = [m for m in self._measures if m.startswith("corr_")]
+        sums = self._aggregate(measures, None, filters, min_score).iloc[0].astype(float).fillna(0.0)
+
+        corr = np.full((len(numeric), len(numeric)), np.nan)
+        for i in range(len(numeric)):
+            for j in range(i, len(numeric)):
+                n, x, y, xx, yy, xy = (sums[f"corr_{i}_{j}_{s}"] for s in ("n", "x", "y", "xx", "yy", "xy"))
+                if n < 2:
+                    continue
+                var_x, var_y = xx - x * x / n, yy - y * y / n
+                if var_x > 0 and var_y > 0:
+                    corr[i, j] = corr[j, i] = min(1.0, max(-1.0, (xy - x * y / n) / np.sqrt(var_x * var_y)))
+        return pd.DataFrame(corr, index=numeric, columns=numeric)
+
+    def _map_where(
+        self,
+        filters: dict | None,
+        min_score: float | None,
+        bbox: tuple[float, float, float, float] | None,
+    ) -> tuple[str, list]:
+        where, params = build_where(self.columns, filters, min_score)
+        clauses = ["latitude IS NOT NULL", "longitude IS NOT NULL"]
+        if bbox is not None:
+            clauses.append("latitude BETWEEN ? AND ?")
+            params += [bbox[0], bbox[2]]
+            # Une emprise à cheval sur l'antiméridien donne deux plages de longitude
+            ranges = SpatialIndex._lon_ranges(bbox[1], bbox[3])
+            clauses.append("(" + " OR ".join(["longitude BETWEEN ? AND ?"] * len(ranges)) + ")")
+            params += [bound for lon_range in ranges for bound in lon_range]
+        return (where + " AND " if where else " WHERE ") + " AND ".join(clauses), params
+
+    def map_center(self, filters: dict | None = None, min_score: float | None = None) -> tuple[float, float]:
+        """Centre (lat, lon) des points filtrés : médianes, peu sensibles aux DOM-TOM."""
+        where, params = self._map_where(filters, min_score, None)
+        lat, lon = self.con.cursor().execute(
+            f"SELECT median(latitude), median(longitude) FROM geo{where}", params
+        ).fetchone()
+        return (lat, lon) if lat is not None else (46.6, 2.4)
+
+    def map_points(
+        self,
+        filters: dict | None = None,
+        min_score: float | None = None,
+        bbox: tuple[float, float, float, float] | None = None,
+        zoom: float = 5,
+        max_points: int = MAP_MAX_POINTS,
+    ) -> pd.DataFrame:
+        """
+        Données de la carte pour l'emprise `bbox` : les points eux-mêmes s'ils
+        sont au plus `max_points`, sinon une ligne par cellule de grille
+        (taille adaptée au zoom, doublée tant qu'il reste trop de cellules)
+        avec le barycentre, l'effectif (`count`) et la ville majoritaire.
+        """
+        where, params = self._map_where(filters, min_score, bbox)
+        cursor = self.con.cursor()
+        (n,) = cursor.execute(f"SELECT count(*) FROM geo{where}", params).fetchone()
+        if n <= max_points:
+            query, _ = build_query(self.columns, MAP_COLUMNS, source="geo")
+            return _to_pandas(cursor.execute(query + where, params).fetch_arrow_table())
+
+        aggregates = ["avg(latitude) AS latitude", "avg(longitude) AS longitude", "count(*) AS count"]
+        aggregates += [f"mode({col}) AS {col}" for col in ("city", "commune") if col in self.columns]
+        aggregates += [f"avg({col}) AS {col}" for col in ("population", "score") if col in self.columns]
+        cell = 360 / (2 ** zoom * MAP_CELLS_PER_TILE)
+        while True:
+            cells = cursor.execute(
+                f"SELECT {', '.join(aggregates)} FROM geo{where} "
+                "GROUP BY floor(latitude / ?), floor(longitude / ?)",
+                [*params, cell, cell]
+            ).fetch_arrow_table()
+            if cells.num_rows <= max_points:
+                return _to_pandas(cells)
+            cell *= 2
+
+    def spatial_index(self) -> SpatialIndex:
+        """Index spatial de la table `geo` (positions = rowid), construit au premier appel."""
+        with self._lock:
+            if self._spatial is None:
+                coords = self.con.cursor().execute(
+                    "SELECT latitude, longitude FROM geo ORDER BY rowid"
+                ).fetchnumpy()
+                self._spatial = SpatialIndex.build(coords["latitude"], coords["longitude"])
+            return self._spatial
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 10,
+        radius_km: float | None = None,
+        columns: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """Les `k` adresses les plus proches (ou celles à moins de `radius_km`), avec leur distance."""
+        index = self.spatial_index()
+        if radius_km is None:
+            rows, distances = index.k_nearest(latitude, longitude, k)
+        else:
+            rows, distances = index.within_radius(latitude, longitude, radius_km)
+
+        hits = pa.table({"position": np.arange(len(rows)), "row": rows, "distance_km": distances})
+        selected = [col for col in columns if col in self.columns] if columns else self.columns
+        cursor = self.con.cursor()
+        cursor.register("hits", hits)
+        table = cursor.execute(
+            f"SELECT {', '.join(f'geo.{_quote(col)}' for col in selected)}, hits.distance_km "
+            "FROM hits JOIN geo ON geo.rowid = hits.row ORDER BY hits.position"
+        ).fetch_arrow_table()
+        return _to_pandas(table)
+
+    def histogram(
+        self,
+        column: str,
+        filters: dict | None = None,
+        min_score: float | None = None,
+        nbins: int = 30,
+    ) -> pd.DataFrame:
+        """Histogramme d'une colonne numérique calculé par DuckDB (début de classe, effectif)."""
+        if column == "score" and nbins == round(1 / SCORE_BIN_WIDTH):
+            return self.score_histogram(filters, min_score)
+
+        where, params = build_where(self.columns, filters, min_score)
+        col = _quote(column)
+        query = f"""
+            WITH data AS (SELECT CAST({col} AS DOUBLE) AS v FROM geo{where}),
+                 bounds AS (SELECT min(v) AS lo, max(v) AS hi FROM data)
+            SELECT lo + least(floor((v - lo) / ((hi - lo) / ?)), ? - 1) * (hi - lo) / ? AS {col},
+                   count(*) AS count
+            FROM data, bounds
+            WHERE v IS NOT NULL AND hi > lo
+            GROUP BY 1 ORDER BY 1
+        """
+        return self.con.cursor().execute(query, [*params, nbins, nbins, nbins]).df()
+
+    def select(
+        self,
+        columns: list[str] | None = None,
+        filters: dict | None = None,
+        min_score: float | None = None,
+        limit: int | None = None,
+        sample: int | None = None,
+        as_arrow: bool = False,
+    ) -> pd.DataFrame | pa.Table:
+        """Lignes filtrées : les `limit` premières, ou un échantillon aléatoire de `sample` lignes."""
+        query, params = build_query(self.columns, columns, filters, min_score, source="geo")
+        if sample is not None:
+            query = f"SELECT * FROM ({query}) USING SAMPLE reservoir({int(sample)} ROWS) REPEATABLE (42)"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        table = self.con.cursor().execute(query, params).fetch_arrow_table()
+        return table if as_arrow else _to_pandas(table)
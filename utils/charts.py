@@ -66,8 +66,11 @@ def create_line_chart(df: pd.DataFrame, x: str, y: str, title: str = "") -> go.F
 
 def create_heatmap(df: pd.DataFrame, title: str = "") -> go.Figure:
     numeric_df = df.select_dtypes(include=["number"])
-    corr = numeric_df.corr()
+    return create_corr_heatmap(numeric_df.corr(), title)
 
+
+def create_corr_heatmap(corr: pd.DataFrame, title: str = "") -> go.Figure:
+    """Heatmap d'une matrice de corrélation déjà calculée (ex. AnalyticsSession)."""
     return px.imshow(
         corr,
         title=title or "Matrice de corrélation",
@@ -79,37 +82,75 @@ def create_heatmap(df: pd.DataFrame, title: str = "") -> go.Figure:
 # ==========================================================
 # GRAPHIQUES SPÉCIFIQUES GEO 
 # ==========================================================
-def create_geo_map(df: pd.DataFrame) -> go.Figure:
+# Au-delà de ce nombre de points, une seule trace Scattermap (WebGL,
+# couleur par score) remplace une trace par ville
+MAP_WEBGL_THRESHOLD = 5_000
+
+
+def create_geo_map(
+    df: pd.DataFrame,
+    zoom: float = 4,
+    center: tuple[float, float] | None = None,
+    webgl_threshold: int = MAP_WEBGL_THRESHOLD,
+) -> go.Figure:
     """
     Carte interactive des adresses géocodées.
-    
-    """
 
-    fig = px.scatter_mapbox(
-        df,
-        lat="latitude",
-        lon="longitude",
-        color="city",
-        hover_name="commune",
-        hover_data={
-            "population": True,
-            "score": ":.2f",
-            "latitude": False,
-            "longitude": False,
-        },
-        zoom=4,
-        mapbox_style="open-street-map",
-        height=650,   
-    )
+    `df` contient des points, ou des cellules agrégées (colonne `count`,
+    voir AnalyticsSession.map_points) affichées en densité.
+    """
+    if "count" in df.columns:
+        fig = go.Figure(go.Densitymap(
+            lat=df["latitude"],
+            lon=df["longitude"],
+            z=df["count"],
+            radius=20,
+            colorscale="Viridis",
+            colorbar=dict(title="Adresses"),
+            customdata=df[["city", "count"]] if "city" in df.columns else None,
+            hovertemplate="%{customdata[0]}<br>%{customdata[1]} adresses<extra></extra>"
+            if "city" in df.columns else None,
+        ))
+    elif len(df) > webgl_threshold:
+        fig = go.Figure(go.Scattermap(
+            lat=df["latitude"],
+            lon=df["longitude"],
+            mode="markers",
+            marker=dict(
+                size=5,
+                color=df["score"] if "score" in df.columns else None,
+                colorscale="Viridis",
+                colorbar=dict(title="Score") if "score" in df.columns else None,
+            ),
+            text=df["city"] if "city" in df.columns else None,
+            hoverinfo="text",
+        ))
+    else:
+        fig = px.scatter_map(
+            df,
+            lat="latitude",
+            lon="longitude",
+            color="city",
+            hover_name="commune",
+            hover_data={
+                "population": True,
+                "score": ":.2f",
+                "latitude": False,
+                "longitude": False,
+            },
+        )
+
+    if center is None:
+        # Ajuste automatiquement la vue aux points
+        center = (df["latitude"].mean(), df["longitude"].mean()) if len(df) else (46.6, 2.4)
 
-    # Ajuste automatiquement la vue aux points
     fig.update_layout(
+        height=650,
         margin=dict(l=0, r=0, t=50, b=0),
-        mapbox=dict(
-            center=dict(
-                lat=df["latitude"].mean(),
-                lon=df["longitude"].mean(),
-            )
+        map=dict(
+            style="open-street-map",
+            zoom=zoom,
+            center=dict(lat=center[0], lon=center[1]),
         ),
     )
 
@@ -121,7 +162,8 @@ def population_by_city(df: pd.DataFrame) -> go.Figure:
     Population moyenne par ville.
     """
     agg = (
-        df.groupby("city", as_index=False)["population"]
+        # observed=True : city peut être catégorielle, sans les villes filtrées
+        df.groupby("city", as_index=False, observed=True)["population"]
         .mean()
         .sort_values("population", ascending=False)
     )
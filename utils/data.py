@@ -5,44 +5,287 @@ Consomme les Parquet produits par le pipeline TP2.
 
 from pathlib import Path
 import duckdb
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline.config import STORE_DIR
+from pipeline.store import PARTITION_COLUMN, DatasetStore
+
+from .spatial import DEFAULT_CELL_SIZE, SpatialIndex
+
+# Colonnes répétitives chargées en catégories (comme pipeline.storage)
+CATEGORICAL_COLUMNS = ["city", "postcode", "citycode", "commune"]
+
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    Résultat DuckDB (Arrow) → pandas sans objets Python : chaînes en
+    string[pyarrow], colonnes répétitives en catégories.
+    """
+    for i, field in enumerate(table.schema):
+        if field.name in CATEGORICAL_COLUMNS and pa.types.is_string(field.type):
+            table = table.set_column(i, field.name, table[field.name].dictionary_encode())
+
+    return table.to_pandas(types_mapper={
+        pa.string(): pd.StringDtype("pyarrow"),
+        pa.large_string(): pd.StringDtype("pyarrow"),
+    }.get)
+
+
+# ==========================================================
+# Requêtes DuckDB : colonnes et filtres poussés dans la lecture
+# ==========================================================
+def _quote(column: str) -> str:
+    """Identifiant SQL entre guillemets (les noms de colonnes ne sont pas paramétrables)."""
+    return '"' + column.replace('"', '""') + '"'
+
+
+# union_by_name : les fichiers d'anciens runs peuvent avoir moins de colonnes
+PARQUET_SOURCE = "read_parquet(?, union_by_name = true, hive_partitioning = false)"
+
+
+def build_where(
+    available: list[str],
+    filters: dict | None = None,
+    min_score: float | None = None,
+) -> tuple[str, list]:
+    """
+    Clause WHERE paramétrée (vide sans filtre). Comme filter_data, les
+    colonnes absentes sont ignorées ; une liste donne un IN, une valeur un =.
+    """
+    clauses, params = [], []
+    for col, value in (filters or {}).items():
+        if col not in available:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            values = list(value)
+            if not values:
+                clauses.append("false")
+                continue
+            clauses.append(f"{_quote(col)} IN ({', '.join(['?'] * len(values))})")
+            params.extend(values)
+        else:
+            clauses.append(f"{_quote(col)} = ?")
+            params.append(value)
+
+    if min_score is not None and "score" in available:
+        clauses.append('"score" >= ?')
+        params.append(min_score)
+
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def build_query(
+    available: list[str],
+    columns: list[str] | None = None,
+    filters: dict | None = None,
+    min_score: float | None = None,
+    source: str = PARQUET_SOURCE,
+) -> tuple[str, list]:
+    """
+    Compile colonnes, filtres et score minimal en SQL paramétré sur `source`
+    (par défaut `read_parquet(?)`, dont le premier paramètre est la liste
+    des fichiers).
+
+    Exemple:
+    filters = {"city": ["Paris", "Lyon"], "population_bucket": "grande"}
+    → SELECT * FROM read_parquet(...) WHERE "city" IN (?, ?) AND "population_bucket" = ?
+    """
+    selected = [col for col in columns if col in available] if columns else None
+    select = ", ".join(map(_quote, selected)) if selected else "*"
+    where, params = build_where(available, filters, min_score)
+    return f"SELECT {select} FROM {source}{where}", params
+
+
+def query_parquets(
+    files: list[str | Path],
+    columns: list[str] | None = None,
+    filters: dict | None = None,
+    min_score: float | None = None,
+    as_arrow: bool = False,
+) -> pd.DataFrame | pa.Table:
+    """
+    Lit les Parquet en ne matérialisant que les lignes et colonnes demandées :
+    DuckDB applique projection et filtres pendant la lecture (row groups
+    ignorés d'après leurs statistiques).
+    """
+    files = [Path(f).as_posix() for f in files]
+    con = duckdb.connect()
+    try:
+        available = [
+            row[0] for row in con.execute(
+                f"DESCRIBE SELECT * FROM {PARQUET_SOURCE}",
+                [files]
+            ).fetchall()
+        ]
+        query, params = build_query(available, columns, filters, min_score)
+        table = con.execute(query, [files, *params]).fetch_arrow_table()
+    finally:
+        con.close()
+
+    return table if as_arrow else _to_pandas(table)
+
 
 # ==========================================================
 # Chargement des Parquet d'un dossier
 # ==========================================================
-def load_all_parquets(folder: str | Path) -> pd.DataFrame:
+def load_all_parquets(
+    folder: str | Path,
+    columns: list[str] | None = None,
+    filters: dict | None = None,
+    min_score: float | None = None,
+    as_arrow: bool = False,
+) -> pd.DataFrame | pa.Table:
+    # Un filtre sur le département limite aussi les partitions lues (store)
+    departements = (filters or {}).get(PARTITION_COLUMN)
+    if isinstance(departements, str):
+        departements = [departements]
+    # Aucune partition retenue : la requête sur tous les fichiers donne un
+    # résultat vide avec le bon schéma
+    files = list_parquets(folder, departements) or list_parquets(folder)
+    return query_parquets(files, columns, filters, min_score, as_arrow)
+
+
+def store_root(folder: str | Path) -> Path | None:
+    """Racine du DatasetStore du dossier (lui-même ou son sous-dossier geo_store), sinon None."""
+    folder = Path(folder)
+    for root in (folder, folder / STORE_DIR.name):
+        if DatasetStore.is_store(root):
+            return root
+    return None
+
+
+def list_parquets(folder: str | Path, departements: list[str] | None = None) -> list[Path]:
+    """
+    Parquet du dossier, dans l'ordre de lecture de load_all_parquets.
+    Si le dossier est (ou contient) un DatasetStore, ce sont ses fichiers qui
+    sont lus, limités aux partitions `departements` (toutes si None, liste
+    éventuellement vide sinon) ; les Parquet à plat du dossier sont alors ignorés.
+    """
     folder = Path(folder)
 
     if not folder.exists():
         raise FileNotFoundError(f"Dossier introuvable : {folder}")
 
-    parquet_files = list(folder.glob("*.parquet"))
-    if not parquet_files:
+    root = store_root(folder)
+    if root is not None:
+        parquet_files = [Path(f) for f in DatasetStore(root).files(departements)]
+    else:
+        parquet_files = sorted(folder.glob("*.parquet"))
+    if not parquet_files and departements is None:
         raise FileNotFoundError(f"Aucun fichier Parquet dans : {folder}")
 
-    con = duckdb.connect()
-    df = con.execute(
-        f"SELECT * FROM read_parquet('{folder.as_posix()}/*.parquet')"
-    ).df()
-    con.close()
+    return parquet_files
+
 
-    return df
 # ==========================================================
 # Chargement Parquet 
 # ==========================================================
-def load_data(filepath: str | Path) -> pd.DataFrame:
+def load_data(
+    filepath: str | Path,
+    columns: list[str] | None = None,
+    filters: dict | None = None,
+    min_score: float | None = None,
+    as_arrow: bool = False,
+) -> pd.DataFrame | pa.Table:
     
     filepath = Path(filepath)
 
     if not filepath.exists():
         raise FileNotFoundError(f"Parquet introuvable : {filepath}")
 
-    con = duckdb.connect()
-    df = con.execute(
-        f"SELECT * FROM read_parquet('{filepath.as_posix()}')"
-    ).df()
-    con.close()
+    return query_parquets([filepath], columns, filters, min_score, as_arrow)
+
+
+# ==========================================================
+# Index spatial (positions = ordre de load_all_parquets)
+# ==========================================================
+SPATIAL_INDEX_DIR = "_spatial_index"
+
+
+def open_spatial_index(folder: str | Path, cell_size: float = DEFAULT_CELL_SIZE) -> SpatialIndex:
+    """
+    Index spatial des Parquet du dossier, sauvegardé dans `_spatial_index`
+    et rechargé en mémoire mappée ; reconstruit si les fichiers ont changé.
+    """
+    files = list_parquets(folder)
+    source = [
+        {
+            "name": f.relative_to(folder).as_posix(),
+            "size": f.stat().st_size,
+            "mtime_ns": f.stat().st_mtime_ns,
+        }
+        for f in files
+    ]
+    index_dir = Path(folder) / SPATIAL_INDEX_DIR
+
+    if (index_dir / "meta.json").exists():
+        index = SpatialIndex.load(index_dir)
+        if index.meta.get("source") == source and index.cell_size == cell_size:
+            return index
+
+    coords = query_parquets(files, columns=["latitude", "longitude"], as_arrow=True)
+    SpatialIndex.build(
+        coords["latitude"].to_numpy(), coords["longitude"].to_numpy(),
+        cell_size=cell_size, meta={"source": source},
+    ).save(index_dir)
+    return SpatialIndex.load(index_dir)
 
+
+def load_rows(
+    folder: str | Path,
+    rows,
+    columns: list[str] | None = None,
+    as_arrow: bool = False,
+) -> pd.DataFrame | pa.Table:
+    """
+    Lignes aux positions `rows` (résultat d'une requête spatiale), dans cet
+    ordre. Seuls les row groups qui les contiennent sont lus.
+    """
+    rows = np.asarray(rows, dtype="int64")
+    pieces, order = [], []
+    offset = 0
+    for path in list_parquets(folder):
+        parquet = pq.ParquetFile(path)
+        names = [c for c in columns if c in parquet.schema_arrow.names] if columns else None
+        for group in range(parquet.num_row_groups):
+            size = parquet.metadata.row_group(group).num_rows
+            wanted = np.flatnonzero((rows >= offset) & (rows < offset + size))
+            if len(wanted):
+                table = parquet.read_row_group(group, columns=names)
+                pieces.append(table.take(rows[wanted] - offset))
+                order.append(wanted)
+            offset += size
+
+    if not pieces:
+        table = pa.table({c: pa.array([], pa.null()) for c in columns or []})
+    else:
+        table = pa.concat_tables(pieces, promote_options="permissive")
+        table = table.take(np.argsort(np.concatenate(order), kind="stable"))
+    return table if as_arrow else _to_pandas(table)
+
+
+def load_nearest(
+    folder: str | Path,
+    latitude: float,
+    longitude: float,
+    k: int = 10,
+    radius_km: float | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Adresses les plus proches d'un point (les `k` plus proches, ou toutes
+    celles à moins de `radius_km`), avec leur distance en km.
+    """
+    index = open_spatial_index(folder)
+    if radius_km is None:
+        rows, distances = index.k_nearest(latitude, longitude, k)
+    else:
+        rows, distances = index.within_radius(latitude, longitude, radius_km)
+    df = load_rows(folder, rows, columns)
+    df["distance_km"] = distances
     return df
 
 
@@ -67,7 +310,8 @@ def get_data_summary(df: pd.DataFrame) -> dict:
 # ==========================================================
 def filter_data(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
     """
-    Applique des filtres simples au DataFrame.
+    Applique des filtres simples au DataFrame déjà chargé
+    (sur disque, préférer les paramètres `filters` des loaders).
 
     Exemple:
     filters = {
@@ -75,15 +319,16 @@ def filter_data(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
         "population_bucket": "grande"
     }
     """
-    df_filtered = df.copy()
+    # Un seul masque booléen : pas de copie intermédiaire par filtre
+    mask = pd.Series(True, index=df.index)
 
     for col, value in filters.items():
-        if col not in df_filtered.columns:
+        if col not in df.columns:
             continue
 
         if isinstance(value, list):
-            df_filtered = df_filtered[df_filtered[col].isin(value)]
+            mask &= df[col].isin(value)
         else:
-            df_filtered = df_filtered[df_filtered[col] == value]
+            mask &= df[col] == value
 
-    return df_filtered
+    return df[mask]
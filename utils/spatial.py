@@ -0,0 +1,240 @@
+"""
+Index spatial des points géocodés (grille régulière sur tableaux NumPy).
+
+Les points sont triés par cellule de grille (ligne par ligne, identifiant
+= ligne × nombre de colonnes + colonne) : une emprise se lit comme une
+tranche contiguë par ligne de grille, trouvée par recherche dichotomique.
+L'index est sauvegardé en .npy et rechargé en mémoire mappée : seules les
+pages des cellules interrogées sont lues.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+# Rayon terrestre moyen (km)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+# Taille des cellules (degrés) : ~1 km en latitude
+DEFAULT_CELL_SIZE = 0.01
+
+ARRAYS = ["latitude", "longitude", "rows", "cell_ids"]
+META_NAME = "meta.json"
+
+
+def haversine_km(lat: float, lon: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Distances (km) du point (lat, lon) aux points donnés."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class SpatialIndex:
+    """
+    Index grille des coordonnées d'un dataset :
+
+        index = SpatialIndex.build(df["latitude"], df["longitude"])
+        rows, km = index.k_nearest(48.8566, 2.3522, k=10)
+        df.iloc[rows]
+
+    Les requêtes renvoient les positions des lignes dans le dataset
+    d'origine (`rows`), les points sans coordonnées étant exclus.
+    """
+
+    def __init__(
+        self,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        rows: np.ndarray,
+        cell_ids: np.ndarray,
+        cell_size: float = DEFAULT_CELL_SIZE,
+        meta: dict | None = None,
+    ):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.rows = rows
+        self.cell_ids = cell_ids
+        self.cell_size = cell_size
+        self.n_cols = int(np.ceil(360 / cell_size))
+        self.meta = meta or {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # ==========================================================
+    # Construction et persistance
+    # ==========================================================
+
+    @classmethod
+    def build(
+        cls,
+        latitude,
+        longitude,
+        cell_size: float = DEFAULT_CELL_SIZE,
+        meta: dict | None = None,
+    ) -> "SpatialIndex":
+        """Index des points (lat, lon) ; les positions renvoyées sont celles de l'entrée."""
+        latitude = np.asarray(latitude, dtype="float64")
+        longitude = np.asarray(longitude, dtype="float64")
+        valid = np.flatnonzero(~(np.isnan(latitude) | np.isnan(longitude)))
+
+        index = cls(
+            latitude[valid], longitude[valid], valid.astype("int64"),
+            np.empty(0, dtype="int64"), cell_size, meta,
+        )
+        cell_ids = index._cell_row(index.latitude) * index.n_cols + index._cell_col(index.longitude)
+        order = np.argsort(cell_ids, kind="stable")
+
+        index.latitude = index.latitude[order]
+        index.longitude = index.longitude[order]
+        index.rows = index.rows[order]
+        index.cell_ids = cell_ids[order]
+        return index
+
+    def save(self, folder: str | Path) -> Path:
+        """
+        Écrit les tableaux (.npy) et les métadonnées (taille de cellule,
+        source). Chaque fichier est écrit à côté puis renommé : un index
+        déjà ouvert en mémoire mappée garde l'ancien contenu.
+        """
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            tmp_path = folder / f"{name}.npy.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(getattr(self, name)))
+            os.replace(tmp_path, folder / f"{name}.npy")
+
+        tmp_path = folder / f"{META_NAME}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"cell_size": self.cell_size, "points": len(self), **self.meta}, f, indent=2)
+        os.replace(tmp_path, folder / META_NAME)
+        return folder
+
+    @classmethod
+    def load(cls, folder: str | Path, mmap: bool = True) -> "SpatialIndex":
+        """Recharge un index sauvegardé, en mémoire mappée par défaut."""
+        folder = Path(folder)
+        with open(folder / META_NAME, encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(folder / f"{name}.npy", mmap_mode="r" if mmap else None)
+            for name in ARRAYS
+        }
+        cell_size = meta.pop("cell_size")
+        meta.pop("points", None)
+        return cls(**arrays, cell_size=cell_size, meta=meta)
+
+    # ==========================================================
+    # Requêtes
+    # ==========================================================
+
+    def _cell_row(self, latitude):
+        return np.floor((np.asarray(latitude) + 90) / self.cell_size).astype("int64")
+
+    def _cell_col(self, longitude):
+        cols = np.floor((np.asarray(longitude) + 180) / self.cell_size).astype("int64")
+        return np.clip(cols, 0, self.n_cols - 1)
+
+    @staticmethod
+    def _lon_ranges(lon_min: float, lon_max: float) -> list[tuple[float, float]]:
+        """
+        Plages de longitude dans [-180, 180] couvrant [lon_min, lon_max].
+        Une emprise qui traverse l'antiméridien (bornes hors de ±180, ou
+        lon_min > lon_max) est coupée en deux plages.
+        """
+        if lon_min > lon_max:
+            lon_max += 360
+        if lon_max - lon_min >= 360:
+            return [(-180.0, 180.0)]
+        # Ramène lon_min dans [-180, 180)
+        shift = 360 * np.floor((lon_min + 180) / 360)
+        lon_min, lon_max = lon_min - shift, lon_max - shift
+        if lon_max <= 180:
+            return [(lon_min, lon_max)]
+        return [(lon_min, 180.0), (-180.0, lon_max - 360)]
+
+    def _bbox_positions(self, lat_min, lon_min, lat_max, lon_max) -> np.ndarray:
+        """Positions (dans l'ordre trié) des points de l'emprise."""
+        if not len(self) or lat_min > lat_max:
+            return np.empty(0, dtype="int64")
+        ranges = self._lon_ranges(lon_min, lon_max)
+        if len(ranges) == 1:
+            return self._range_positions(lat_min, lat_max, *ranges[0])
+        return np.concatenate([self._range_positions(lat_min, lat_max, *r) for r in ranges])
+
+    def _range_positions(self, lat_min, lat_max, lon_min, lon_max) -> np.ndarray:
+        """Positions des points d'une emprise sans traversée de l'antiméridien."""
+        # Une tranche contiguë de cell_ids par ligne de grille
+        grid_rows = np.arange(self._cell_row(max(lat_min, -90.0)), self._cell_row(min(lat_max, 90.0)) + 1)
+        col_min = self._cell_col(lon_min)
+        col_max = self._cell_col(lon_max)
+        starts = np.searchsorted(self.cell_ids, grid_rows * self.n_cols + col_min, side="left")
+        ends = np.searchsorted(self.cell_ids, grid_rows * self.n_cols + col_max, side="right")
+
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype="int64")
+        # Concaténation des intervalles [start, end) sans boucle Python
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = offsets + np.arange(total)
+
+        lat = self.latitude[positions]
+        lon = self.longitude[positions]
+        inside = (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+        return positions[inside]
+
+    def within_bbox(self, lat_min: float, lon_min: float, lat_max: float, lon_max: float) -> np.ndarray:
+        """
+        Lignes dont le point est dans l'emprise (bornes incluses). Avec
+        lon_min > lon_max, l'emprise traverse l'antiméridien.
+        """
+        return np.asarray(self.rows[self._bbox_positions(lat_min, lon_min, lat_max, lon_max)])
+
+    def within_radius(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        sort: bool = True,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Lignes à moins de `radius_km` (distance orthodromique) et leurs distances."""
+        dlat = radius_km / KM_PER_DEGREE
+        # Près des pôles, l'emprise en longitude couvre tout le globe
+        cos_lat = np.cos(np.radians(min(abs(lat) + dlat, 90.0)))
+        dlon = radius_km / (KM_PER_DEGREE * cos_lat) if cos_lat > 1e-9 else 360.0
+        positions = self._bbox_positions(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+
+        distances = haversine_km(lat, lon, self.latitude[positions], self.longitude[positions])
+        keep = distances <= radius_km
+        positions, distances = positions[keep], distances[keep]
+        if sort:
+            order = np.argsort(distances, kind="stable")
+            positions, distances = positions[order], distances[order]
+        return np.asarray(self.rows[positions]), distances
+
+    def k_nearest(self, lat: float, lon: float, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Les `k` lignes les plus proches et leurs distances (croissantes).
+        Le rayon de recherche part d'une cellule et double jusqu'à contenir
+        k points : tous les points plus proches que le k-ième sont alors vus.
+        """
+        k = min(k, len(self))
+        radius = self.cell_size * KM_PER_DEGREE
+        while True:
+            rows, distances = self.within_radius(lat, lon, radius, sort=False)
+            if len(rows) >= k or radius >= np.pi * EARTH_RADIUS_KM:
+                break
+            radius *= 2
+
+        nearest = np.argpartition(distances, k - 1)[:k] if 0 < k < len(rows) else np.arange(len(rows))
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")][:k]
+        return rows[nearest], distances[nearest]